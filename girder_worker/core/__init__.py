@@ -176,6 +176,65 @@ def _job_status(mgr, status):
         mgr.updateStatus(status)
 
 
+def push_output(name, output_spec, outputs, auto_convert=True, validate=True,
+                status=None, **kwargs):
+    """
+    Validate, convert, and push a single task output whose ``script_data``
+    has been set by an executor. This is normally called by :py:func:`run`
+    once the executor returns, but executors that finish some outputs early
+    (e.g. while a subprocess is still running) may call it themselves, in
+    which case they should set ``'_pushed'`` on the output binding so that
+    :py:func:`run` does not push it again.
+
+    :param name: The name of the output.
+    :type name: str
+    :param output_spec: The task output specification.
+    :type output_spec: dict
+    :param outputs: The output bindings of the task. ``outputs[name]`` is
+        replaced with the pushed binding.
+    :type outputs: dict
+    :param status: Job status the task is running under.
+    :type status: girder_worker.utils.JobStatus
+    """
+    job_mgr = kwargs.get('_job_manager')
+    d = outputs[name]
+    script_output = {'data': d['script_data'],
+                     'format': output_spec.get('format')}
+
+    # Validate the output
+    if validate and not isvalid(
+            output_spec['type'], script_output,
+            **dict({'task_output': output_spec}, **kwargs)):
+        raise Exception(
+            'Output %s (%s) is not in the expected type (%s) and '
+            'format (%s).' % (
+                name, type(script_output['data']), output_spec['type'],
+                d['format'])
+            )
+
+    # We should consider refactoring the logic below, reasoning about
+    # the paths through this code is difficult, since this logic is
+    # entered by 'run', 'isvalid', and 'convert'.
+    if auto_convert:
+        outputs[name] = convert(
+            output_spec['type'], script_output, d,
+            status=JobStatus.CONVERTING_OUTPUT,
+            **dict({'task_output': output_spec}, **kwargs))
+    elif not validate or d['format'] == output_spec['format']:
+        data = d['script_data']
+
+        if status == JobStatus.RUNNING:
+            _job_status(job_mgr, JobStatus.PUSHING_OUTPUT)
+        io.push(
+            data, d, **dict({'task_output': output_spec}, **kwargs))
+    else:
+        raise Exception('Expected exact format match but %s != %s.' % (
+            d['format'], output_spec['format']))
+
+    if 'script_data' in outputs[name]:
+        del outputs[name]['script_data']
+
+
 @utils.with_tmpdir  # noqa
 def run(task, inputs=None, outputs=None, auto_convert=True, validate=True,
         fetch=True, status=None, **kwargs):
@@ -322,42 +381,11 @@ def run(task, inputs=None, outputs=None, auto_convert=True, validate=True,
             if task_output.get('stream'):
                 continue  # this output has already been sent as a stream
 
-            d = outputs[name]
-            script_output = {'data': d['script_data'],
-                             'format': task_output.get('format')}
-
-            # Validate the output
-            if validate and not isvalid(
-                    task_output['type'], script_output,
-                    **dict({'task_output': task_output}, **kwargs)):
-                raise Exception(
-                    'Output %s (%s) is not in the expected type (%s) and '
-                    'format (%s).' % (
-                        name, type(script_output['data']), task_output['type'],
-                        d['format'])
-                    )
-
-            # We should consider refactoring the logic below, reasoning about
-            # the paths through this code is difficult, since this logic is
-            # entered by 'run', 'isvalid', and 'convert'.
-            if auto_convert:
-                outputs[name] = convert(
-                    task_output['type'], script_output, d,
-                    status=JobStatus.CONVERTING_OUTPUT,
-                    **dict({'task_output': task_output}, **kwargs))
-            elif not validate or d['format'] == task_output['format']:
-                data = d['script_data']
-
-                if status == JobStatus.RUNNING:
-                    _job_status(job_mgr, JobStatus.PUSHING_OUTPUT)
-                io.push(
-                    data, d, **dict({'task_output': task_output}, **kwargs))
-            else:
-                raise Exception('Expected exact format match but %s != %s.' % (
-                    d['format'], task_output['format']))
+            if outputs[name].pop('_pushed', False):
+                continue  # the executor already pushed this output itself
 
-            if 'script_data' in outputs[name]:
-                del outputs[name]['script_data']
+            push_output(name, task_output, outputs, auto_convert=auto_convert,
+                        validate=validate, status=status, **kwargs)
 
         events.trigger('run.after', info)
 
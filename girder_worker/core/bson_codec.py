@@ -0,0 +1,136 @@
+"""
+Incremental BSON decoding and encoding for the ``objectlist.bson`` format and
+the ``mongodb`` IO mode.
+
+The ``objectlist.bson`` format is a concatenation of BSON documents, each
+starting with its size. :py:func:`iter_decode` decodes them lazily from a
+string, a buffer such as a ``memoryview`` or memory-mapped file, or a
+file-like object, in batches of about ``CHUNK_SIZE`` bytes that are each
+decoded by one call to the C extension of ``bson``. Only a batch is copied
+out of a buffer at a time. :py:func:`iter_encode` generates the encoding of
+documents a chunk at a time, for streamed outputs.
+"""
+import bson
+import collections
+import struct
+
+from bson.codec_options import CodecOptions
+from bson.errors import InvalidBSON
+from bson.raw_bson import RawBSONDocument
+
+# Approximate size of the batches of documents decoded at once and of the
+# chunks generated by iter_encode
+CHUNK_SIZE = 65536
+
+# Documents are decoded as ordered dicts, to keep the order of their fields
+CODEC_OPTIONS = CodecOptions(collections.OrderedDict)
+
+RAW_CODEC_OPTIONS = CodecOptions(RawBSONDocument)
+
+_SIZE = struct.Struct('<i')
+
+
+def document_ends(data, pos=0):
+    """
+    Generate the offset after each complete BSON document in a buffer,
+    starting with the document at ``pos``. This stops at the first document
+    that is cut off by the end of the buffer.
+
+    :param data: A string or any object supporting the buffer protocol.
+    :param pos: The offset of the first document.
+    :type pos: int
+    """
+    size = len(data)
+    while pos + 4 <= size:
+        length = _SIZE.unpack_from(data, pos)[0]
+        if length < 5:
+            raise InvalidBSON('Invalid BSON document size %d.' % length)
+        if pos + length > size:
+            return
+        pos += length
+        yield pos
+
+
+def _slice(data, start, end):
+    if isinstance(data, memoryview):
+        return data[start:end].tobytes()
+    return bytes(data[start:end])
+
+
+def _buffer_batches(data):
+    start = end = 0
+    for end in document_ends(data):
+        if end - start >= CHUNK_SIZE:
+            yield _slice(data, start, end)
+            start = end
+    if end != len(data):
+        raise InvalidBSON('Truncated BSON document.')
+    if end > start:
+        yield _slice(data, start, end)
+
+
+def _file_batches(file):
+    batch, size = [], 0
+    while True:
+        head = file.read(4)
+        if not head:
+            break
+        length = _SIZE.unpack(head)[0] if len(head) == 4 else 0
+        body = file.read(length - 4) if length >= 5 else b''
+        if len(body) != length - 4:
+            raise InvalidBSON('Truncated BSON document.')
+        batch += (head, body)
+        size += length
+        if size >= CHUNK_SIZE:
+            yield b''.join(batch)
+            batch, size = [], 0
+    if batch:
+        yield b''.join(batch)
+
+
+def iter_batches(input):
+    """
+    Generate strings that each hold a whole number of the BSON documents of
+    the input, of about ``CHUNK_SIZE`` bytes.
+
+    :param input: A string, a buffer or a file-like object.
+    """
+    if hasattr(input, 'read'):
+        return _file_batches(input)
+    return _buffer_batches(input)
+
+
+def iter_decode(input, codec_options=CODEC_OPTIONS):
+    """
+    Lazily decode concatenated BSON documents, like ``bson.decode_file_iter``
+    but a batch of documents at a time.
+
+    :param input: A string, a buffer or a file-like object.
+    :param codec_options: The options to decode with. The default decodes
+        documents as ordered dicts.
+    :type codec_options: bson.codec_options.CodecOptions
+    """
+    for batch in iter_batches(input):
+        for document in bson.decode_all(batch, codec_options):
+            yield document
+
+
+def iter_encode(documents):
+    """
+    Lazily encode documents as concatenated BSON, for streamed outputs.
+    Documents that are already encoded, such as ``RawBSONDocument`` objects,
+    are written as they are.
+
+    :param documents: An iterable of documents.
+    :returns: A generator of chunks of BSON.
+    """
+    chunk, size = [], 0
+    for document in documents:
+        data = bson.BSON.encode(document)
+        chunk.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            yield b''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b''.join(chunk)
@@ -0,0 +1,84 @@
+"""
+Binary files for exchanging list data with executors that run code in another
+language, such as the ``julia`` and ``scala`` modes. Embedding a large list in
+the generated script as a literal makes the interpreter or compiler parse it
+as source code; instead it is written once as a raw array that the script
+reads natively.
+
+Each file is a one byte type code, the number of elements as a little-endian
+64-bit integer, and then the elements themselves as raw little-endian values:
+
+* ``d``: 64-bit floats
+* ``q``: 64-bit signed integers
+* ``?``: booleans, one byte each
+"""
+import six
+import struct
+
+_HEADER = struct.Struct('<cq')
+_INT64_MAX = 2 ** 63 - 1
+
+# Element format by type code, and the list formats that map to each type code
+_ELEMENTS = {b'd': 'd', b'q': 'q', b'?': '?'}
+LIST_FORMATS = {'number_list': b'd', 'integer_list': b'q'}
+
+
+def array_type(value):
+    """
+    Returns the type code to use for exchanging ``value``, or None if it is not
+    a non-empty list of numbers or booleans that can be exchanged losslessly.
+    """
+    if not isinstance(value, (list, tuple)) or not value:
+        return None
+
+    if all(isinstance(v, bool) for v in value):
+        return b'?'
+    if any(isinstance(v, bool) for v in value):
+        return None
+    if all(isinstance(v, six.integer_types) for v in value):
+        return b'q' if all(abs(v) <= _INT64_MAX for v in value) else None
+    if all(isinstance(v, (float,) + six.integer_types) for v in value):
+        return b'd'
+    return None
+
+
+def write_array(path, value, typecode=None):
+    """
+    Write a list to a binary exchange file.
+
+    :param path: The file to write.
+    :type path: str
+    :param value: The list of values.
+    :type value: list
+    :param typecode: The type code to use, defaults to ``array_type(value)``.
+    """
+    typecode = typecode or array_type(value)
+    if typecode not in _ELEMENTS:
+        raise Exception('Cannot write binary array of type: %r' % typecode)
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(typecode, len(value)))
+        f.write(struct.pack('<%d%s' % (len(value), _ELEMENTS[typecode]),
+                            *value))
+
+
+def read_array(path):
+    """
+    Read a list from a binary exchange file.
+
+    :param path: The file to read.
+    :type path: str
+    :returns: The list of values.
+    """
+    with open(path, 'rb') as f:
+        typecode, count = _HEADER.unpack(f.read(_HEADER.size))
+        if typecode not in _ELEMENTS:
+            raise Exception('Invalid binary array type in %s: %r' % (
+                path, typecode))
+
+        fmt = '<%d%s' % (count, _ELEMENTS[typecode])
+        data = f.read(struct.calcsize(fmt))
+        if len(data) != struct.calcsize(fmt):
+            raise Exception('Truncated binary array in %s.' % path)
+
+    return list(struct.unpack(fmt, data))
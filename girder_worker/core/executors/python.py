@@ -1,18 +1,200 @@
+import girder_worker
 import imp
+import importlib
+import io
 import json
+import six
 import sys
 import tempfile
+import threading
 
+from girder_worker.core import utils
+from girder_worker.core.format import iterators
+from girder_worker.core.io import (make_stream_fetch_adapter,
+                                   make_stream_push_adapter)
+from . import sandbox
+
+# Size of the chunks read from streamed inputs and file-like outputs
+STREAM_BUF_LEN = 65536
+
+_forkserver = None
+_forkserver_lock = threading.Lock()
+
+# Callables of function tasks, by their "module:callable" name
+_functions = {}
+
+
+def _read_from_config(key, default):
+    """
+    Helper to read python mode specific config values from the worker config.
+    """
+    if girder_worker.config.has_option('python', key):
+        return girder_worker.config.get('python', key)
+    else:
+        return default
+
+
+def _get_forkserver():
+    """
+    Returns the fork server used for sandboxed tasks in this worker process.
+    """
+    global _forkserver
+
+    with _forkserver_lock:
+        if _forkserver is None:
+            preload = _read_from_config('sandbox_preload', '').split(',')
+            limit = int(_read_from_config('sandbox_memory_limit', 0))
+            _forkserver = sandbox.ForkServer(
+                preload=[m.strip() for m in preload if m.strip()],
+                memory_limit=limit * 1024 * 1024)
+        return _forkserver
+
+
+def _open_stream(input):
+    """
+    Returns a buffered binary file object reading from a streamed input.
+    """
+    return io.BufferedReader(
+        utils.FetchAdapterReader(make_stream_fetch_adapter(input)),
+        STREAM_BUF_LEN)
+
+
+def _push_stream(output, value):
+    """
+    Send the value of a streamed output chunk by chunk. The value may be a
+    string, a file-like object, or any iterable of strings such as a generator.
+    Unicode strings are sent encoded as UTF-8.
+    """
+    if isinstance(value, (six.binary_type, six.text_type)):
+        chunks = (value,)
+    elif hasattr(value, 'read'):
+        chunks = iter(lambda: value.read(STREAM_BUF_LEN), b'')
+    else:
+        chunks = value
+
+    adapter = make_stream_push_adapter(output)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, six.text_type):
+                chunk = chunk.encode('utf-8')
+            if chunk:  # an empty chunk would end the stream
+                adapter.write(chunk)
+    finally:
+        adapter.close()
+
+
+def _stream_conversion(task_spec, binding):
+    """
+    Returns the format of a streamed input or output binding if its data must
+    be converted lazily to or from the iterator format of the task's spec,
+    e.g. from ``csv`` to ``rows.iter``, otherwise ``None``.
+    """
+    format = binding.get('format', task_spec['format'])
+    if task_spec['format'].endswith('.iter') and format != task_spec['format']:
+        return format
 
-def run(task, inputs, outputs, task_inputs, task_outputs, **kwargs):
-    custom = imp.new_module('__girder_worker__')
 
-    custom.__dict__['_job_manager'] = kwargs.get('_job_manager')
-    custom.__dict__['_tempdir'] = kwargs.get('_tempdir')
+def _load_function(name):
+    """
+    Import the callable named by a ``"module:callable"`` string, where the
+    callable may be a dotted attribute path within the module.
+    """
+    if name not in _functions:
+        module, _, attr = name.partition(':')
+        if not module or not attr:
+            raise Exception('Python task functions must be given as '
+                            '"module:callable", got "%s".' % name)
 
+        func = importlib.import_module(module)
+        for part in attr.split('.'):
+            func = getattr(func, part)
+        _functions[name] = func
+
+    return _functions[name]
+
+
+def _run_sandboxed(task, inputs, outputs, task_inputs, task_outputs,
+                   **kwargs):
+    if 'function' in task:
+        raise Exception('Sandboxed python tasks must be given as a script.')
+    for spec in list(task_inputs.values()) + list(task_outputs.values()):
+        if spec.get('stream'):
+            raise Exception('Sandboxed python tasks do not support streams.')
+
+    results = _get_forkserver().run(
+        task['script'], {name: inputs[name]['script_data'] for name in inputs},
+        list(task_outputs), kwargs.get('_tempdir'))
+
+    for name in task_outputs:
+        outputs[name]['script_data'] = results[name]
+
+
+def run(task, inputs, outputs, task_inputs, task_outputs, **kwargs):
+    if task.get('sandbox'):
+        return _run_sandboxed(
+            task, inputs, outputs, task_inputs, task_outputs, **kwargs)
+
+    values = {}
+    streams = []
     for name in inputs:
-        custom.__dict__[name] = inputs[name]['script_data']
+        if task_inputs[name].get('stream'):
+            streams.append(_open_stream(inputs[name]))
+            values[name] = streams[-1]
+            format = _stream_conversion(task_inputs[name], inputs[name])
+            if format:
+                values[name] = iterators.decode_stream(
+                    task_inputs[name]['type'], format,
+                    task_inputs[name]['format'], values[name])
+        else:
+            values[name] = inputs[name]['script_data']
 
+    try:
+        if 'function' in task:
+            results = _run_function(task, values, task_outputs)
+        else:
+            # Keep a reference to the module, whose globals are cleared when
+            # it is garbage collected
+            custom = imp.new_module('__girder_worker__')
+            custom.__dict__['_job_manager'] = kwargs.get('_job_manager')
+            custom.__dict__['_tempdir'] = kwargs.get('_tempdir')
+            custom.__dict__.update(values)
+
+            _run_script(task, custom, **kwargs)
+            results = custom.__dict__
+
+        for name, task_output in task_outputs.iteritems():
+            if task_output.get('stream'):
+                value = results[name]
+                format = _stream_conversion(task_output, outputs[name])
+                if format:
+                    value = iterators.encode_stream(
+                        task_output['type'], task_output['format'], format,
+                        value)
+                _push_stream(outputs[name], value)
+            else:
+                outputs[name]['script_data'] = results[name]
+    finally:
+        for stream in streams:
+            stream.close()
+
+
+def _run_function(task, values, task_outputs):
+    """
+    Call the task's function with its inputs as keyword arguments. The return
+    value is the output of a task with a single output, and must be a dict of
+    the outputs by name otherwise.
+    """
+    result = _load_function(task['function'])(**values)
+
+    if len(task_outputs) == 1:
+        return {name: result for name in task_outputs}
+    if task_outputs and not isinstance(result, dict):
+        raise Exception('Python task function "%s" must return a dict of its '
+                        'outputs, got %s.' % (task['function'], type(result)))
+    return result
+
+
+def _run_script(task, custom, **kwargs):
     if task.get('write_script', kwargs.get('write_script', False)):
         debug_path = tempfile.mktemp()
         with open(debug_path, 'wb') as fh:
@@ -33,6 +215,3 @@ def run(task, inputs, outputs, task_inputs, task_outputs, **kwargs):
                 '\nTask:\n' + json.dumps(task, indent=4)
             )
             raise Exception(error), None, trace
-
-    for name, task_output in task_outputs.iteritems():
-        outputs[name]['script_data'] = custom.__dict__[name]
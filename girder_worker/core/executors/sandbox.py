@@ -0,0 +1,224 @@
+"""
+Fork server that runs python mode tasks in sandboxed child processes.
+
+The server is a separate, fresh Python process that imports a configurable
+list of modules once, and then forks a child for each task, so that the
+children share the imported modules copy-on-write. Each child runs a single
+task script with an optional address space limit, and sends the outputs back
+pickled, so that a script that crashes or leaks memory cannot harm the worker.
+
+This file is also run directly as the server's main script, so it must only
+import modules from the standard library.
+"""
+import imp
+import os
+import pickle
+import resource
+import select
+import shutil
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import traceback
+
+_LENGTH = struct.Struct('<Q')
+
+
+def _send(conn, obj):
+    data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    conn.sendall(_LENGTH.pack(len(data)) + data)
+
+
+def _recv_exactly(conn, n):
+    chunks = []
+    while n:
+        chunk = conn.recv(min(n, 1 << 20))
+        if not chunk:
+            raise EOFError()
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv(conn):
+    length, = _LENGTH.unpack(_recv_exactly(conn, _LENGTH.size))
+    return pickle.loads(_recv_exactly(conn, length))
+
+
+class ForkServer(object):
+    """
+    Client side of the fork server. The server process is started on first
+    use, and restarted if it has died.
+    """
+    def __init__(self, preload=(), memory_limit=0):
+        """
+        :param preload: Names of the modules the server imports once.
+        :type preload: list of str
+        :param memory_limit: Address space limit for each task in bytes, or
+            0 for no limit.
+        :type memory_limit: int
+        """
+        self.preload = list(preload)
+        self.memory_limit = memory_limit
+        self._process = None
+        self._dir = None
+        self._lock = threading.Lock()
+
+    @property
+    def _path(self):
+        return os.path.join(self._dir, 'forkserver.sock')
+
+    def _start(self):
+        self._dir = tempfile.mkdtemp()
+
+        # Listen before starting the server so that tasks can connect while
+        # it is still importing the preloaded modules.
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            listener.bind(self._path)
+            listener.listen(16)
+
+            command = [
+                sys.executable, os.path.abspath(__file__).replace('.pyc', '.py'),
+                str(listener.fileno()), ','.join(self.preload)]
+            print('Starting python fork server: "%s"' % ' '.join(command))
+
+            # The server exits once its stdin is closed, i.e. with this process
+            self._process = subprocess.Popen(
+                command, stdin=subprocess.PIPE, close_fds=False)
+        finally:
+            listener.close()
+
+    def stop(self):
+        """
+        Stop the server process, if it is running.
+        """
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process = None
+        if self._dir is not None:
+            shutil.rmtree(self._dir)
+            self._dir = None
+
+    def run(self, script, inputs, output_names, tempdir=None):
+        """
+        Run a script in a new sandboxed child process.
+
+        :param script: The Python code to run.
+        :type script: str
+        :param inputs: Dict mapping variable names to their values, which
+            must be picklable.
+        :type inputs: dict
+        :param output_names: Names of the variables to return.
+        :type output_names: list of str
+        :param tempdir: Exposed to the script as ``_tempdir``.
+        :returns: Dict mapping the output names to their values.
+        """
+        with self._lock:
+            if self._process is not None and self._process.poll() is not None:
+                self.stop()
+            if self._process is None:
+                self._start()
+            path = self._path
+
+        try:
+            request = pickle.dumps({
+                'script': script,
+                'inputs': inputs,
+                'outputs': output_names,
+                'tempdir': tempdir,
+                'memory_limit': self.memory_limit
+            }, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            raise Exception('Inputs of sandboxed python tasks must be '
+                            'picklable: %s' % e)
+
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(path)
+            conn.sendall(_LENGTH.pack(len(request)) + request)
+            result = _recv(conn)
+        except (EOFError, socket.error):
+            raise Exception(
+                'Sandboxed python task exited unexpectedly. It may have '
+                'crashed or exceeded its memory limit.')
+        finally:
+            conn.close()
+
+        if 'error' in result:
+            raise Exception(result['error'])
+        return result['outputs']
+
+
+def _run_task(conn):
+    """
+    Runs in a forked child: run the task sent over ``conn`` and reply with
+    its outputs or error.
+    """
+    try:
+        request = _recv(conn)
+        if request['memory_limit']:
+            resource.setrlimit(resource.RLIMIT_AS, (
+                request['memory_limit'], request['memory_limit']))
+
+        custom = imp.new_module('__girder_worker__')
+        custom.__dict__['_job_manager'] = None
+        custom.__dict__['_tempdir'] = request['tempdir']
+        custom.__dict__.update(request['inputs'])
+
+        exec request['script'] in custom.__dict__
+
+        result = {'outputs': {
+            name: custom.__dict__[name] for name in request['outputs']}}
+    except BaseException:
+        result = {'error': traceback.format_exc()}
+
+    try:
+        _send(conn, result)
+    except Exception:
+        _send(conn, {'error': 'Could not send outputs of sandboxed python '
+                              'task:\n' + traceback.format_exc()})
+
+
+def _serve(fd, preload):
+    listener = socket.fromfd(fd, socket.AF_UNIX, socket.SOCK_STREAM)
+    os.close(fd)
+
+    for name in preload:
+        __import__(name)
+
+    # Let the kernel reap the children
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    stdin = sys.stdin.fileno()
+    while True:
+        ready, _, _ = select.select([listener, stdin], [], [])
+        if stdin in ready and not os.read(stdin, 4096):
+            return
+
+        if listener in ready:
+            conn, _ = listener.accept()
+            if os.fork() == 0:
+                status = 0
+                try:
+                    listener.close()
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    _run_task(conn)
+                except BaseException:
+                    traceback.print_exc()
+                    status = 1
+                finally:
+                    os._exit(status)
+            conn.close()
+
+
+if __name__ == '__main__':
+    # Don't let scripts import modules from this directory by accident
+    del sys.path[0]
+    _serve(int(sys.argv[1]), [m.strip() for m in sys.argv[2].split(',')
+                              if m.strip()])
@@ -2,9 +2,11 @@ import csv
 import json
 import glob
 import os
-import math
 from girder_worker.core.io import fetch
 import networkx as nx
+from . import builtin, compact, iterators, jsonlines_engine  # noqa: imported for the function tasks
+from . import csv_engine
+from .csv_engine import get_csv_dialect
 from collections import namedtuple
 from networkx.algorithms.shortest_paths.generic import all_shortest_paths
 from networkx.algorithms.shortest_paths.unweighted import (
@@ -47,51 +49,11 @@ def get_csv_reader(input):
     # csv package does not support unicode
     input = str(input)
 
-    # Special case: detect single-column files.
-    # This check assumes that our only valid delimiters are commas and tabs.
-    firstLine = input.split('\n')[0]
-    if not ('\t' in firstLine or ',' in firstLine) \
-            or len(input.splitlines()) == 1:
-        dialect = 'excel'
-
-    else:
-        # Take a data sample to determine dialect, but
-        # don't include incomplete last line
-        sample = ''
-        sampleSize = 0
-        while len(sample) == 0:
-            sampleSize += 5000
-            sample = '\n'.join(input[:sampleSize].splitlines()[:-1])
-        dialect = csv.Sniffer().sniff(sample)
-        dialect.skipinitialspace = True
-    return csv.DictReader(input.splitlines(), dialect=dialect)
+    return csv.DictReader(input.splitlines(), dialect=get_csv_dialect(input))
 
 
 def csv_to_rows(input):
-    reader = get_csv_reader(input)
-    rows = [d for d in reader]
-    fields = reader.fieldnames
-
-    output = {'fields': fields, 'rows': rows}
-
-    # Attempt numeric conversion
-    for row in output['rows']:
-        for col in row:
-            try:
-                row[col] = int(row[col])
-            except Exception:
-                try:
-                    orig = row[col]
-                    row[col] = float(row[col])
-
-                    # Disallow NaN, Inf, -Inf since this does not
-                    # pass through JSON converters cleanly
-                    if math.isnan(row[col]) or math.isinf(row[col]):
-                        row[col] = orig
-                except Exception:
-                    pass
-
-    return output
+    return csv_engine.read_rows(input)
 
 
 def converter_path(source, target):
@@ -113,8 +75,8 @@ def converter_path(source, target):
 
     # We sort and pick the first of the shortest paths just to produce a stable
     # conversion path. This is stable in regards to which plugins are loaded at
-    # the time.
-    paths = all_shortest_paths(conv_graph, source, target)
+    # the time. Converters count as one step unless they specify a cost.
+    paths = all_shortest_paths(conv_graph, source, target, weight='cost')
     path = sorted(paths)[0]
     path = zip(path[:-1], path[1:])
 
@@ -205,6 +167,17 @@ def import_converters(search_paths):
     output named ``"output"``. The input and output should have matching
     type but should be of different formats.
 
+    A converter may set a ``"cost"`` other than the default of 1, which
+    :py:func:`converter_path` adds up to pick the cheapest conversion path.
+    For example, converters to and from the NumPy-backed
+    ``table/columns`` format cost more, so that other table conversions do
+    not go through it.
+
+    Converters and validators that are ``python`` mode tasks may name a
+    ``"function"`` to call instead of a script, which avoids executing code
+    for each conversion; :py:mod:`girder_worker.core.format.builtin` holds the
+    functions used by the built-in formats.
+
     :param search_paths: A list of search paths relative to the current
         working directory. Passing a single path as a string also works.
     :type search_paths: str or list of str
@@ -217,7 +190,7 @@ def import_converters(search_paths):
         with open(filename) as f:
             analysis = json.load(f)
 
-            if 'script' not in analysis:
+            if 'script' not in analysis and 'function' not in analysis:
                 analysis['script'] = fetch({
                     'mode': analysis.get('script_fetch_mode', 'auto'),
                     'url': analysis['script_uri']
@@ -0,0 +1,93 @@
+"""
+Built-in converters and validators that are run as ``python`` mode function
+tasks. Each function takes the task input as its ``input`` keyword argument
+and returns the value of the task output.
+"""
+import base64
+import six
+
+from girder_worker.core import bson_codec, json_codec
+from six.moves import cPickle
+
+
+def identity(input):
+    return input
+
+
+def json_loads(input):
+    return json_codec.loads(input)
+
+
+def json_dumps(input):
+    return json_codec.dumps(input)
+
+
+def extended_json_loads(input):
+    return json_codec.loads(input, extended=True)
+
+
+def extended_json_dumps(input):
+    return json_codec.dumps(input, extended=True)
+
+
+def bson_loads(input):
+    return list(bson_codec.iter_decode(input))
+
+
+def bson_dumps(input):
+    return b''.join(bson_codec.iter_encode(input))
+
+
+def pickle_loads(input):
+    return cPickle.loads(input)
+
+
+def pickle_dumps(input):
+    return cPickle.dumps(input)
+
+
+def base64_decode(input):
+    return base64.b64decode(input)
+
+
+def base64_encode(input):
+    return base64.b64encode(input)
+
+
+def is_anything(input):
+    return True
+
+
+def is_str(input):
+    return isinstance(input, str)
+
+
+def is_string(input):
+    return isinstance(input, six.string_types)
+
+
+def is_boolean(input):
+    return isinstance(input, bool)
+
+
+def is_integer(input):
+    return isinstance(input, int)
+
+
+def is_number(input):
+    return isinstance(input, (int, float))
+
+
+def is_integer_list(input):
+    return isinstance(input, list) and all(
+        isinstance(elm, int) for elm in input)
+
+
+def is_number_list(input):
+    return isinstance(input, list) and all(
+        isinstance(elm, (int, float)) for elm in input)
+
+
+def is_string_list(input):
+    return isinstance(input, list) and all(
+        isinstance(elm, six.string_types) for elm in input)
@@ -0,0 +1,226 @@
+"""
+Converters and validators of the ``table/columns`` format, which holds a table
+as a dict with a ``"fields"`` list of column names and a ``"columns"`` dict
+that maps each name to a one-dimensional NumPy array. Columns of numbers are
+stored as ``int64``, ``float64`` or ``bool`` arrays, and all other columns as
+arrays of Python objects. This takes several times less memory than the list
+of per-row dicts of the ``table/rows`` format, and lets converters parse and
+format whole columns at once.
+
+Like the other functions in :py:mod:`girder_worker.core.format`, these are
+run as ``python`` mode function tasks. They require NumPy.
+"""
+import csv
+import numpy
+import six
+
+from girder_worker.core.format.csv_engine import CsvSource
+
+
+def _object_array(values):
+    # Filling element by element keeps nested lists as single elements
+    array = numpy.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+def to_array(values):
+    """
+    Convert a list of Python values to a column. Lists of numbers or booleans
+    become typed arrays, and any other list an object array.
+    """
+    if values:
+        try:
+            array = numpy.array(values)
+        except (ValueError, OverflowError):
+            array = None
+        if array is not None and array.ndim == 1 and \
+                array.dtype.kind in 'biuf':
+            return array
+    return _object_array(values)
+
+
+def dicts_to_columns(dicts):
+    """
+    Returns a dict mapping each key of any of the dicts to the column of its
+    values, with ``None`` where a dict does not have the key.
+    """
+    fields = set()
+    for d in dicts:
+        fields.update(d)
+    return {f: to_array([d.get(f) for d in dicts]) for f in fields}
+
+
+def columns_to_dicts(columns, count):
+    """
+    Returns the ``count`` dicts of the values of each row of a dict of columns,
+    without the ``None`` values. This is the inverse of
+    :py:func:`dicts_to_columns`, reading the columns a whole column at a time.
+    """
+    dicts = [{} for _ in six.moves.range(count)]
+    for field, column in six.iteritems(columns):
+        for d, value in six.moves.zip(dicts, column.tolist()):
+            if value is not None:
+                d[field] = value
+    return dicts
+
+
+def parse_column(values):
+    """
+    Infer the type of a column of strings parsed from CSV or TSV text, and
+    convert it. The column becomes an ``int64`` array if all of its values are
+    integers, a ``float64`` array if all of them are finite numbers, and an
+    array of the original strings otherwise.
+    """
+    if values:
+        strings = numpy.array(values)
+        try:
+            return strings.astype(numpy.int64)
+        except (ValueError, OverflowError):
+            pass
+        try:
+            floats = strings.astype(numpy.float64)
+        except ValueError:
+            pass
+        else:
+            # NaN and infinity would not pass through JSON cleanly
+            if numpy.isfinite(floats).all():
+                return floats
+    return _object_array(values)
+
+
+def string_columns_chunk(fields, records):
+    """
+    Chunk parser of :py:class:`girder_worker.core.format.csv_engine.CsvSource`
+    that returns the columns of a chunk as lists of strings. Short records
+    are padded with empty strings, and extra values are dropped.
+    """
+    width = len(fields)
+    rows = [row[:width] + [''] * (width - len(row)) for row in records if row]
+    return [list(column) for column in zip(*rows)] if rows else [[]] * width
+
+
+def columns_chunk(fields, records):
+    """
+    Chunk parser that returns the columns of a chunk parsed with
+    :py:func:`parse_column`.
+    """
+    return [parse_column(column)
+            for column in string_columns_chunk(fields, records)]
+
+
+def read_columns(data=None, path=None, **kwargs):
+    """
+    Parse a CSV or TSV table into the ``table/columns`` format, using
+    :py:mod:`girder_worker.core.format.csv_engine`. Columns are parsed a chunk
+    at a time, and are numeric only if they are numeric in every chunk.
+
+    :param data: The CSV text.
+    :type data: str
+    :param path: The path of a CSV file, used instead of ``data``.
+    :type path: str
+    """
+    processes = kwargs.get('processes')
+    with CsvSource(data, path, kwargs.get('chunk_size')) as source:
+        if source.fields is None:
+            return {'fields': [], 'columns': {}}
+
+        chunks = source.map(columns_chunk, processes=processes)
+
+        # A column that is numeric in some chunks only is a column of
+        # strings, so its numeric chunks need to be parsed again.
+        mixed, reparse = [], set()
+        for i in range(len(source.fields)):
+            parts = [chunk[i] for chunk in chunks]
+            numeric = [j for j, part in enumerate(parts)
+                       if part.dtype != object]
+            if numeric and any(part.dtype == object and len(part)
+                               for part in parts):
+                mixed.append(i)
+                reparse.update(numeric)
+
+        reparse = sorted(reparse)
+        strings = dict(zip(reparse, source.map(
+            string_columns_chunk, chunks=reparse, processes=processes)))
+
+        columns = {}
+        for i, field in enumerate(source.fields):
+            parts = [chunk[i] for chunk in chunks]
+            if i in mixed:
+                parts = [_object_array(strings[j][i])
+                         if part.dtype != object else part
+                         for j, part in enumerate(parts)]
+            else:
+                # Drop empty chunks, which are object arrays
+                parts = [part for part in parts if len(part)] or parts[:1]
+            columns[field] = numpy.concatenate(parts)
+
+        return {'fields': source.fields, 'columns': columns}
+
+
+def _columns_to_text(input, delimiter):
+    output = six.StringIO()
+    writer = csv.writer(output, delimiter=delimiter)
+    writer.writerow(input['fields'])
+    writer.writerows(
+        zip(*[input['columns'][field].tolist() for field in input['fields']]))
+    return output.getvalue()
+
+
+def csv_to_columns(input):
+    return read_columns(input)
+
+
+def tsv_to_columns(input):
+    return read_columns(input)
+
+
+def columns_to_csv(input):
+    return _columns_to_text(input, ',')
+
+
+def columns_to_tsv(input):
+    return _columns_to_text(input, '\t')
+
+
+def rows_to_columns(input):
+    fields = input['fields']
+    return {
+        'fields': list(fields),
+        'columns': {
+            field: to_array([row.get(field) for row in input['rows']])
+            for field in fields}
+    }
+
+
+def columns_to_rows(input):
+    fields = input['fields']
+    values = [input['columns'][field].tolist() for field in fields]
+    return {
+        'fields': list(fields),
+        'rows': [dict(zip(fields, row)) for row in zip(*values)]
+    }
+
+
+def columns_to_column_names(input):
+    return list(input['fields'])
+
+
+def is_columns(input):
+    """
+    Check the schema of a table: its column names, and that each column is a
+    one-dimensional array of the same length. The values are not inspected.
+    """
+    if not isinstance(input, dict) or \
+            not isinstance(input.get('fields'), list) or \
+            not isinstance(input.get('columns'), dict) or \
+            set(input['fields']) != set(input['columns']):
+        return False
+
+    lengths = set()
+    for column in input['columns'].values():
+        if not isinstance(column, numpy.ndarray) or column.ndim != 1:
+            return False
+        lengths.add(len(column))
+    return len(lengths) <= 1
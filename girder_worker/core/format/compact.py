@@ -0,0 +1,240 @@
+"""
+Converters and validators of the ``table/rows.compact`` format, a memory
+compact version of ``table/rows``. It is a dict with the same ``"fields"``
+list, but its ``"rows"`` is a :py:class:`CompactRows` that stores each row as
+a tuple of values in the order of the fields, with a single field index shared
+by all rows, instead of as a dict. Repeated strings in a column are stored
+once, and columns of mostly distinct strings are left as they are.
+
+A :py:class:`CompactRows` behaves like a read-only list of read-only dicts, so
+code written for ``table/rows`` that does not modify the table, such as the
+``rows`` to ``column.names`` converters, also works on this format.
+Converting to and from ``table/rows`` only rebuilds the rows.
+
+Like the other functions in :py:mod:`girder_worker.core.format`, these are
+run as ``python`` mode function tasks.
+"""
+import collections
+import csv
+import six
+
+from girder_worker.core.format.csv_engine import CsvSource, convert_value
+
+# A column stops being dictionary-encoded once it has more than this many
+# distinct strings, and they are more than half of its values.
+MIN_DISTINCT_STRINGS = 1024
+
+
+class CompactRow(collections.Mapping):
+    """
+    A read-only view of a row of a :py:class:`CompactRows` as a dict from the
+    field names to the values.
+    """
+    __slots__ = ('_table', '_values')
+
+    def __init__(self, table, values):
+        self._table = table
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._table.index[key]]
+
+    def __iter__(self):
+        return iter(self._table.fields)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return key in self._table.index
+
+    def iteritems(self):
+        return six.moves.zip(self._table.fields, self._values)
+
+    def items(self):
+        return list(self.iteritems())
+
+    def values(self):
+        return list(self._values)
+
+    def __repr__(self):
+        return repr(dict(self.iteritems()))
+
+
+class CompactRows(collections.Sequence):
+    """
+    A list of rows stored as tuples of values.
+
+    .. py:attribute:: fields
+
+        The list of field names, in the order of the values of the records.
+
+    .. py:attribute:: index
+
+        Dict mapping each field name to its position in the records.
+
+    .. py:attribute:: records
+
+        The list of rows as tuples of values.
+    """
+    def __init__(self, fields, records=()):
+        """
+        :param fields: The field names.
+        :type fields: list of str
+        :param records: Tuples of values to add with :py:meth:`extend`.
+        """
+        self.fields = list(fields)
+        self.index = {field: i for i, field in enumerate(self.fields)}
+        self.records = []
+        self._strings = [{} for _ in self.fields]
+        self._count = 0
+        self.extend(records)
+
+    def _prune(self):
+        """
+        Stop encoding columns of mostly distinct strings, whose dictionaries
+        would take more memory than they save. Returns the positions of the
+        columns that are still encoded.
+        """
+        limit = max(MIN_DISTINCT_STRINGS, self._count // 2)
+        for i, strings in enumerate(self._strings):
+            if strings is not None and len(strings) > limit:
+                self._strings[i] = None
+        return [i for i, s in enumerate(self._strings) if s is not None]
+
+    def _encode(self, records):
+        """
+        Generate the records with repeated strings replaced by a single
+        shared copy, per column.
+        """
+        strings = self._strings
+        encoded = self._prune()
+        for values in records:
+            if encoded:
+                values = list(values)
+                for i in encoded:
+                    value = values[i]
+                    if isinstance(value, six.string_types):
+                        values[i] = strings[i].setdefault(value, value)
+                self._count += 1
+                if self._count % MIN_DISTINCT_STRINGS == 0:
+                    encoded = self._prune()
+            yield tuple(values)
+
+    def extend(self, records):
+        """
+        Add rows given as sequences of values in the order of the fields.
+        """
+        self.records.extend(self._encode(records))
+
+    def append(self, row):
+        """
+        Add a row given as a dict. Missing fields are ``None``, and keys that
+        are not fields are dropped.
+        """
+        self.extend([[row.get(field) for field in self.fields]])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [CompactRow(self, values) for values in self.records[i]]
+        return CompactRow(self, self.records[i])
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        for values in self.records:
+            yield CompactRow(self, values)
+
+    def column(self, field):
+        """
+        Returns the list of values of a field.
+        """
+        i = self.index[field]
+        return [values[i] for values in self.records]
+
+    def to_dicts(self):
+        """
+        Returns the rows as a list of dicts.
+        """
+        fields = self.fields
+        return [dict(zip(fields, values)) for values in self.records]
+
+    def __getstate__(self):
+        return {'fields': self.fields, 'records': self.records}
+
+    def __setstate__(self, state):
+        self.__init__(state['fields'])
+        self.records = state['records']
+
+
+def compact_chunk(fields, records):
+    """
+    Chunk parser of :py:class:`girder_worker.core.format.csv_engine.CsvSource`
+    that returns records as tuples of converted values. Short records are
+    padded with ``None``, and extra values are dropped.
+    """
+    width = len(fields)
+    padding = (None,) * width
+    return [tuple([convert_value(v) for v in record[:width]]) +
+            padding[len(record):]
+            for record in records if record]
+
+
+def read_compact(data=None, path=None, **kwargs):
+    """
+    Parse a CSV or TSV table into the ``table/rows.compact`` format with
+    :py:mod:`girder_worker.core.format.csv_engine`.
+
+    :param data: The CSV text.
+    :type data: str
+    :param path: The path of a CSV file, used instead of ``data``.
+    :type path: str
+    """
+    with CsvSource(data, path, kwargs.get('chunk_size')) as source:
+        rows = CompactRows(source.fields or [])
+        for chunk in source.map(compact_chunk,
+                                processes=kwargs.get('processes')):
+            rows.extend(chunk)
+        return {'fields': rows.fields, 'rows': rows}
+
+
+def _compact_to_text(input, delimiter):
+    output = six.StringIO()
+    writer = csv.writer(output, delimiter=delimiter)
+    writer.writerow(input['fields'])
+    writer.writerows(input['rows'].records)
+    return output.getvalue()
+
+
+def csv_to_compact(input):
+    return read_compact(input)
+
+
+def tsv_to_compact(input):
+    return read_compact(input)
+
+
+def compact_to_csv(input):
+    return _compact_to_text(input, ',')
+
+
+def compact_to_tsv(input):
+    return _compact_to_text(input, '\t')
+
+
+def rows_to_compact(input):
+    rows = CompactRows(input['fields'])
+    rows.extend([row.get(field) for field in rows.fields]
+                for row in input['rows'])
+    return {'fields': rows.fields, 'rows': rows}
+
+
+def compact_to_rows(input):
+    return {'fields': list(input['fields']), 'rows': input['rows'].to_dicts()}
+
+
+def is_compact_rows(input):
+    return isinstance(input, dict) and \
+        isinstance(input.get('rows'), CompactRows) and \
+        input.get('fields') == input['rows'].fields
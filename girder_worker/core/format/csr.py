@@ -0,0 +1,501 @@
+"""
+Converters and validators of the ``graph/csr`` format, which holds a graph in
+compressed sparse row form as a dict of NumPy arrays:
+
+* ``"nodes"``: the node identifiers, in the order of the node indices.
+* ``"indptr"``: an ``int64`` array of length ``len(nodes) + 1``, where the
+  edges of node ``i`` are ``indptr[i]`` to ``indptr[i + 1]``.
+* ``"indices"``: an ``int64`` array of the index of the target of each edge.
+* ``"node_data"`` and ``"edge_data"``: dicts that map each attribute name to a
+  column of its values for every node or edge, as in the ``table/columns``
+  format, with ``None`` where a node or edge does not have the attribute.
+* ``"directed"`` and ``"multigraph"``: the kind of graph, as in networkx.
+
+Each edge is stored once, under its source, so the edges of an undirected
+graph are not repeated under their targets.
+
+The converters to and from text and ``networkx`` graphs work on whole arrays
+rather than per-node Python objects, so that graphs with tens of millions of
+edges can be converted. :py:func:`networkx_view` wraps a graph in a read-only
+networkx graph that reads the arrays as it is used, rather than copying them.
+
+Like the other functions in :py:mod:`girder_worker.core.format`, these are
+run as ``python`` mode function tasks. They require NumPy.
+"""
+import binascii
+import collections
+import itertools
+import networkx as nx
+import numpy
+import os
+import six
+import time
+
+from girder_worker.core import json_codec
+from girder_worker.core.utils import gc_paused
+from girder_worker.core.format.columns import (
+    columns_to_dicts, dicts_to_columns, to_array)
+
+# Number of ObjectIds that share a timestamp in _object_ids
+_COUNTER_SIZE = 2 ** 24
+
+
+def _attributes(columns, i):
+    attributes = {}
+    for field, column in six.iteritems(columns):
+        value = column[i]
+        if value is not None:
+            attributes[field] = value.item() \
+                if isinstance(value, numpy.generic) else value
+    return attributes
+
+
+def from_edges(nodes, sources, targets, directed=True, multigraph=False,
+               node_data=None, edge_data=None):
+    """
+    Build a graph in the ``graph/csr`` format from its edges.
+
+    :param nodes: The node identifiers.
+    :param sources: The indices of the sources of the edges.
+    :param targets: The indices of the targets of the edges.
+    :param directed: Whether the graph is directed.
+    :param multigraph: Whether there may be several edges between two nodes.
+    :param node_data: Attribute columns of the nodes.
+    :type node_data: dict
+    :param edge_data: Attribute columns of the edges, in the order of
+        ``sources`` and ``targets``.
+    :type edge_data: dict
+    """
+    if not isinstance(nodes, numpy.ndarray):
+        nodes = to_array(list(nodes))
+    sources = numpy.asarray(sources, dtype=numpy.int64)
+    targets = numpy.asarray(targets, dtype=numpy.int64)
+
+    # A stable sort keeps the edges of each node in input order
+    order = numpy.argsort(sources, kind='mergesort')
+    indptr = numpy.zeros(len(nodes) + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(sources, minlength=len(nodes)),
+                 out=indptr[1:])
+
+    return {
+        'nodes': nodes,
+        'indptr': indptr,
+        'indices': targets[order],
+        'node_data': dict(node_data or {}),
+        'edge_data': {field: numpy.asarray(column)[order]
+                      for field, column in six.iteritems(edge_data or {})},
+        'directed': directed,
+        'multigraph': multigraph
+    }
+
+
+def edge_sources(graph):
+    """
+    Returns the array of the indices of the sources of the edges, in the
+    order of ``graph["indices"]``.
+    """
+    indptr = graph['indptr']
+    return numpy.repeat(numpy.arange(len(indptr) - 1), numpy.diff(indptr))
+
+
+def _unique_edges(sources, targets, directed, count):
+    """
+    Drop repeated edges, which a graph that is not a multigraph merges,
+    keeping the first of each.
+    """
+    lower, upper = sources, targets
+    if not directed:
+        lower, upper = (numpy.minimum(sources, targets),
+                        numpy.maximum(sources, targets))
+    _, first = numpy.unique(lower * count + upper, return_index=True)
+    first.sort()
+    return sources[first], targets[first]
+
+
+def _node_names(graph):
+    return [n if isinstance(n, six.string_types) else str(n)
+            for n in graph['nodes'].tolist()]
+
+
+def _tokenized_lines(input):
+    """
+    Split text into lists of whitespace separated tokens, ignoring comments
+    that start with ``#`` and blank lines, like networkx's text readers.
+    """
+    for line in input.splitlines():
+        if '#' in line:
+            line = line[:line.index('#')]
+        tokens = line.split()
+        if tokens:
+            yield tokens
+
+
+def _from_tokens(lines):
+    """
+    Returns the node identifiers, and the node indices of all tokens of the
+    lines with the number of tokens of each line.
+    """
+    counts = numpy.array([len(tokens) for tokens in lines], dtype=numpy.int64)
+    tokens = list(itertools.chain.from_iterable(lines))
+    if not tokens:
+        return to_array([]), numpy.zeros(0, numpy.int64), counts
+    nodes, inverse = numpy.unique(numpy.array(tokens), return_inverse=True)
+    return nodes.astype(object), inverse.astype(numpy.int64), counts
+
+
+def adjacencylist_to_csr(input):
+    """
+    Parse an adjacency list, whose lines each hold a node followed by its
+    neighbors, into an undirected graph like ``networkx.read_adjlist``.
+    """
+    lines = list(_tokenized_lines(input))
+    nodes, indices, counts = _from_tokens(lines)
+    starts = numpy.cumsum(counts) - counts
+    heads = numpy.ones(len(indices), dtype=bool)
+    heads[starts] = False
+
+    sources, targets = _unique_edges(
+        numpy.repeat(indices[starts], counts - 1), indices[heads],
+        False, len(nodes))
+    return from_edges(nodes, sources, targets, directed=False)
+
+
+def csr_to_adjacencylist(input):
+    names = _node_names(input)
+    targets = numpy.array(names, dtype=object)[input['indices']].tolist()
+    indptr = input['indptr'].tolist()
+    return '\n'.join(' '.join([name] + targets[start:end]) for name, start, end
+                     in six.moves.zip(names, indptr[:-1], indptr[1:]))
+
+
+def edgelist_to_csr(input):
+    """
+    Parse an edge list, whose lines each hold the source and target of an
+    edge, into an undirected graph like ``networkx.read_edgelist``.
+    """
+    lines = list(_tokenized_lines(input))
+    nodes, indices, counts = _from_tokens(lines)
+    if (counts != 2).any():
+        raise Exception('Each line of an edge list must hold two nodes.')
+
+    sources, targets = _unique_edges(
+        indices[0::2], indices[1::2], False, len(nodes))
+    return from_edges(nodes, sources, targets, directed=False)
+
+
+def csr_to_edgelist(input):
+    names = numpy.array(_node_names(input), dtype=object)
+    return '\n'.join(
+        '%s %s' % edge for edge in six.moves.zip(
+            names[edge_sources(input)].tolist(),
+            names[input['indices']].tolist()))
+
+
+def clique_json_to_csr(input):
+    """
+    Parse the nodes and links of a Clique graph into a directed graph, like
+    the ``clique.json`` to ``networkx`` converter.
+    """
+    with gc_paused():
+        items = json_codec.loads(input)
+    nodes = [item for item in items if item['type'] == 'node']
+    links = [item for item in items if item['type'] == 'link']
+
+    ids = [node['_id']['$oid'] for node in nodes]
+    node_data = [node.get('data', {}) for node in nodes]
+    index = {oid: i for i, oid in enumerate(ids)}
+
+    def node_index(ref):
+        oid = ref['$oid']
+        if oid not in index:
+            index[oid] = len(ids)
+            ids.append(oid)
+            node_data.append({})
+        return index[oid]
+
+    sources = numpy.array([node_index(link['source']) for link in links],
+                          dtype=numpy.int64)
+    targets = numpy.array([node_index(link['target']) for link in links],
+                          dtype=numpy.int64)
+
+    # If there is more than one edge with the same src/target, it's a
+    # multigraph
+    pairs = numpy.unique(sources * len(ids) + targets)
+    return from_edges(
+        ids, sources, targets, directed=True,
+        multigraph=len(pairs) < len(links),
+        node_data=dicts_to_columns(node_data),
+        edge_data=dicts_to_columns([link.get('data', {}) for link in links]))
+
+
+def _object_ids(count):
+    """
+    Returns the hex strings of ``count`` distinct ObjectIds, generated at
+    once. They share a random process identifier and take consecutive
+    counter values, and every ``_COUNTER_SIZE`` ids the timestamp is
+    advanced by a second so that the counter never wraps around.
+    """
+    i = numpy.arange(count, dtype=numpy.int64)
+    ids = numpy.empty((count, 12), dtype=numpy.uint8)
+    seconds = int(time.time()) + i // _COUNTER_SIZE
+    ids[:, 0:4] = (seconds[:, None] >> [24, 16, 8, 0]) & 0xff
+    ids[:, 4:9] = numpy.frombuffer(os.urandom(5), dtype=numpy.uint8)
+    ids[:, 9:12] = ((i % _COUNTER_SIZE)[:, None] >> [16, 8, 0]) & 0xff
+    text = binascii.hexlify(ids.tobytes())
+    return [text[j:j + 24] for j in range(0, len(text), 24)]
+
+
+def csr_to_clique_json(input):
+    count = len(input['nodes'])
+    sources = edge_sources(input).tolist()
+    ids = _object_ids(count + len(sources))
+
+    with gc_paused():
+        output = []
+        for oid, data in six.moves.zip(
+                ids, columns_to_dicts(input['node_data'], count)):
+            node = {'_id': {'$oid': oid}, 'type': 'node'}
+            if data:
+                node['data'] = data
+            output.append(node)
+
+        for oid, u, v, data in six.moves.zip(
+                ids[count:], sources, input['indices'].tolist(),
+                columns_to_dicts(input['edge_data'], len(sources))):
+            link = {'_id': {'$oid': oid},
+                    'source': {'$oid': ids[u]},
+                    'target': {'$oid': ids[v]},
+                    'type': 'link'}
+            if data:
+                link['data'] = data
+            output.append(link)
+
+        return json_codec.dumps(output)
+
+
+def networkx_to_csr(input):
+    nodes = input.nodes()
+    index = {node: i for i, node in enumerate(nodes)}
+    if input.is_multigraph():
+        edges = input.edges(data=True, keys=False)
+    else:
+        edges = input.edges(data=True)
+
+    return from_edges(
+        nodes,
+        numpy.fromiter((index[e[0]] for e in edges), numpy.int64, len(edges)),
+        numpy.fromiter((index[e[1]] for e in edges), numpy.int64, len(edges)),
+        directed=input.is_directed(), multigraph=input.is_multigraph(),
+        node_data=dicts_to_columns([input.node[node] for node in nodes]),
+        edge_data=dicts_to_columns([e[2] for e in edges]))
+
+
+def _networkx_class(graph):
+    if graph['multigraph']:
+        return nx.MultiDiGraph if graph['directed'] else nx.MultiGraph
+    return nx.DiGraph if graph['directed'] else nx.Graph
+
+
+def csr_to_networkx(input):
+    """
+    Copy the graph into a networkx graph that can be modified. See
+    :py:func:`networkx_view` for a read-only graph that shares the arrays.
+    """
+    nodes = input['nodes'].tolist()
+    sources = edge_sources(input).tolist()
+    output = _networkx_class(input)()
+    with gc_paused():
+        output.add_nodes_from(six.moves.zip(
+            nodes, columns_to_dicts(input['node_data'], len(nodes))))
+        output.add_edges_from(
+            (nodes[u], nodes[v], data) for u, v, data in six.moves.zip(
+                sources, input['indices'].tolist(),
+                columns_to_dicts(input['edge_data'], len(sources))))
+    return output
+
+
+def is_csr(input):
+    return isinstance(input, dict) and \
+        all(isinstance(input.get(k), numpy.ndarray)
+            for k in ('nodes', 'indptr', 'indices')) and \
+        len(input['indptr']) == len(input['nodes']) + 1
+
+
+class _Adjacency(object):
+    """
+    The neighbors of each node of a networkx view, as the indices of the
+    neighbors and of the edges to them, in compressed sparse row form.
+    """
+    def __init__(self, sources, targets, edges, count):
+        order = numpy.argsort(sources, kind='mergesort')
+        self.indptr = numpy.zeros(count + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(sources, minlength=count),
+                     out=self.indptr[1:])
+        self.neighbors = targets[order]
+        self.edges = edges[order]
+
+
+class _Neighbors(collections.Mapping):
+    """
+    Maps the neighbors of a node of a networkx view to the attributes of the
+    edge to them, or for multigraphs to a dict of the attributes of the edges
+    to them by key.
+    """
+    def __init__(self, view, adjacency, i):
+        start, end = adjacency.indptr[i], adjacency.indptr[i + 1]
+        self._view = view
+        self._neighbors = adjacency.neighbors[start:end]
+        self._edges = adjacency.edges[start:end]
+
+    def _value(self, edges):
+        data = self._view._graph['edge_data']
+        if not self._view.is_multigraph():
+            return _attributes(data, edges[0])
+        return {key: _attributes(data, e) for key, e in enumerate(edges)}
+
+    def iteritems(self):
+        nodes = self._view._nodes
+        if not self._view.is_multigraph():
+            for j, e in six.moves.zip(self._neighbors, self._edges):
+                yield nodes[j], self._value([e])
+        else:
+            edges = collections.OrderedDict()
+            for j, e in six.moves.zip(self._neighbors, self._edges):
+                edges.setdefault(j, []).append(e)
+            for j, es in six.iteritems(edges):
+                yield nodes[j], self._value(sorted(es))
+
+    def items(self):
+        return list(self.iteritems())
+
+    def itervalues(self):
+        return (value for _, value in self.iteritems())
+
+    def values(self):
+        return list(self.itervalues())
+
+    def __iter__(self):
+        nodes = self._view._nodes
+        if self._view.is_multigraph():
+            neighbors = collections.OrderedDict.fromkeys(self._neighbors)
+        else:
+            neighbors = self._neighbors
+        return (nodes[j] for j in neighbors)
+
+    def __len__(self):
+        if self._view.is_multigraph():
+            return len(numpy.unique(self._neighbors))
+        return len(self._neighbors)
+
+    def __getitem__(self, node):
+        j = self._view._index().get(node)
+        edges = self._edges[self._neighbors == j] if j is not None else ()
+        if not len(edges):
+            raise KeyError(node)
+        return self._value(sorted(edges))
+
+    def __contains__(self, node):
+        j = self._view._index().get(node)
+        return j is not None and bool((self._neighbors == j).any())
+
+
+class _AdjacencyMapping(collections.Mapping):
+    """
+    Maps each node of a networkx view to its :py:class:`_Neighbors`.
+    """
+    def __init__(self, view, adjacency):
+        self._view = view
+        self._adjacency = adjacency
+
+    def __getitem__(self, node):
+        i = self._view._index().get(node)
+        if i is None:
+            raise KeyError(node)
+        return _Neighbors(self._view, self._adjacency, i)
+
+    def iteritems(self):
+        for i, node in enumerate(self._view._nodes):
+            yield node, _Neighbors(self._view, self._adjacency, i)
+
+    def items(self):
+        return list(self.iteritems())
+
+    def __iter__(self):
+        return iter(self._view._nodes)
+
+    def __len__(self):
+        return len(self._view._nodes)
+
+    def __contains__(self, node):
+        return node in self._view._index()
+
+
+class _NodeMapping(collections.Mapping):
+    """
+    Maps each node of a networkx view to its attributes.
+    """
+    def __init__(self, view):
+        self._view = view
+
+    def __getitem__(self, node):
+        i = self._view._index().get(node)
+        if i is None:
+            raise KeyError(node)
+        return _attributes(self._view._graph['node_data'], i)
+
+    def __iter__(self):
+        return iter(self._view._nodes)
+
+    def __len__(self):
+        return len(self._view._nodes)
+
+    def __contains__(self, node):
+        return node in self._view._index()
+
+
+class _ViewMixin(object):
+    def _index(self):
+        if self._node_index is None:
+            self._node_index = {n: i for i, n in enumerate(self._nodes)}
+        return self._node_index
+
+
+_view_classes = {}
+
+
+def networkx_view(graph):
+    """
+    Returns a read-only networkx graph of the right class for the graph, which
+    reads its nodes, edges and attributes from the arrays as it is used,
+    rather than holding them as Python dicts. The attribute dicts are built
+    on access, so changing them does not change the graph.
+
+    :param graph: A graph in the ``graph/csr`` format.
+    """
+    base = _networkx_class(graph)
+    if base not in _view_classes:
+        _view_classes[base] = type(
+            'Csr' + base.__name__ + 'View', (_ViewMixin, base), {})
+    view = _view_classes[base]()
+    view._graph = graph
+    view._nodes = graph['nodes'].tolist()
+    view._node_index = None
+    view.node = _NodeMapping(view)
+
+    count = len(view._nodes)
+    sources, targets = edge_sources(graph), graph['indices']
+    edges = numpy.arange(len(targets), dtype=numpy.int64)
+    if graph['directed']:
+        view.succ = view.adj = view.edge = _AdjacencyMapping(
+            view, _Adjacency(sources, targets, edges, count))
+        view.pred = _AdjacencyMapping(
+            view, _Adjacency(targets, sources, edges, count))
+    else:
+        # Each edge is a neighbor of both of its nodes, and self-loops of
+        # their node once
+        loops = sources == targets
+        view.adj = view.edge = _AdjacencyMapping(view, _Adjacency(
+            numpy.concatenate([sources, targets[~loops]]),
+            numpy.concatenate([targets, sources[~loops]]),
+            numpy.concatenate([edges, edges[~loops]]), count))
+    return view
@@ -0,0 +1,264 @@
+"""
+Parser for large CSV and TSV tables. The dialect is detected once from the
+head of the input, and the records after the header are split into chunks
+that each end on a record boundary. The chunks can be parsed in a pool of
+processes, and the results are returned in input order.
+
+The input may be a string, or a file that is memory-mapped rather than read,
+so that it never needs to be held as a Python string. This lets tasks with a
+``"filepath"`` target input parse it with, for example,
+``read_rows(path=input)``.
+
+Parallel parsing is configured in the ``[csv]`` section of the worker config:
+``processes`` is the size of the pool, 1 (the default) parsing in the calling
+process and 0 meaning one process per CPU, and ``chunk_size`` is the size of
+the chunks in bytes. The pool is kept for the life of the worker process.
+Inputs that fit in a single chunk are always parsed in the calling process.
+"""
+import csv
+import girder_worker
+import math
+import mmap
+import re
+
+from girder_worker.core.utils import parallel_map
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+_LINE_BREAK = re.compile(r'\r\n|\r|\n')
+_DIALECT_ATTRS = ('delimiter', 'doublequote', 'escapechar', 'lineterminator',
+                  'quotechar', 'quoting', 'skipinitialspace')
+
+
+def _read_from_config(key, default):
+    if girder_worker.config.has_option('csv', key):
+        return girder_worker.config.get('csv', key)
+    else:
+        return default
+
+
+def get_csv_dialect(input):
+    """Detect the dialect of CSV or TSV text from its first lines.
+
+    :param input: The text, which must be a ``str`` or a memory-mapped file.
+    :returns: A dialect for the readers of the ``csv`` package.
+    """
+
+    # Special case: detect single-column files.
+    # This check assumes that our only valid delimiters are commas and tabs.
+    firstBreak = _LINE_BREAK.search(input)
+    firstLine = input[:firstBreak.start() if firstBreak else len(input)]
+    if not ('\t' in firstLine or ',' in firstLine) \
+            or firstBreak is None or firstBreak.end() == len(input):
+        dialect = 'excel'
+
+    else:
+        # Take a data sample to determine dialect, but
+        # don't include incomplete last line
+        sample = ''
+        sampleSize = firstBreak.start() // 5000 * 5000
+        while len(sample) == 0:
+            sampleSize += 5000
+            sample = '\n'.join(input[:sampleSize].splitlines()[:-1])
+        dialect = csv.Sniffer().sniff(sample)
+        dialect.skipinitialspace = True
+    return dialect
+
+
+def convert_value(value):
+    """
+    Convert a CSV value to an int or a float if possible. NaN and infinity
+    are left as strings, since they do not pass through JSON cleanly.
+    """
+    try:
+        return int(value)
+    except Exception:
+        try:
+            number = float(value)
+        except Exception:
+            return value
+        if math.isnan(number) or math.isinf(number):
+            return value
+        return number
+
+
+def iter_rows(fields, records):
+    """
+    Generate records as dicts of converted values, like ``csv.DictReader``:
+    extra values are stored under the ``None`` key, and missing values are
+    ``None``.
+    """
+    width = len(fields)
+    for record in records:
+        if not record:
+            continue
+        row = dict(zip(fields, [convert_value(v) for v in record]))
+        if len(record) > width:
+            row[None] = record[width:]
+        elif len(record) < width:
+            for field in fields[len(record):]:
+                row[field] = None
+        yield row
+
+
+def rows_chunk(fields, records):
+    """
+    Chunk parser that returns the list of rows of :py:func:`iter_rows`.
+    """
+    return list(iter_rows(fields, records))
+
+
+def _parse_chunk(job):
+    source, start, end, dialect, fields, func = job
+    if isinstance(source, tuple):
+        with open(source[0], 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+    else:
+        data = source
+
+    reader = csv.reader(data.splitlines(), **dialect)
+    if start == 0:
+        next(reader, None)  # the header
+    return func(fields, reader)
+
+
+class CsvSource(object):
+    """
+    A CSV or TSV input split into chunks. Use as a context manager, or call
+    :py:meth:`close` to release the mapped file.
+    """
+    def __init__(self, data=None, path=None, chunk_size=None):
+        """
+        :param data: The CSV text.
+        :type data: str
+        :param path: The path of a CSV file, used instead of ``data``.
+        :type path: str
+        :param chunk_size: Approximate size of the chunks in bytes, defaults
+            to the ``chunk_size`` config option.
+        :type chunk_size: int
+        """
+        self.path = path
+        self._file = None
+        if path is not None:
+            self._file = open(path, 'rb')
+            try:
+                self.data = mmap.mmap(
+                    self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # an empty file cannot be mapped
+                self.data = b''
+        else:
+            # csv package does not support unicode
+            self.data = str(data)
+
+        if chunk_size is None:
+            chunk_size = int(_read_from_config(
+                'chunk_size', DEFAULT_CHUNK_SIZE))
+
+        dialect = get_csv_dialect(self.data)
+        if not isinstance(dialect, str):
+            dialect = {k: getattr(dialect, k) for k in _DIALECT_ATTRS}
+        else:
+            dialect = {'dialect': dialect}
+        self.dialect = dialect
+
+        head = self.data[:self._record_end(0) or len(self.data)]
+        self.fields = next(csv.reader(head.splitlines(), **dialect), None)
+        self.chunks = self._split(max(chunk_size, 1))
+
+    def close(self):
+        if self._file is not None:
+            if isinstance(self.data, mmap.mmap):
+                self.data.close()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _record_end(self, pos, quotes=0):
+        """
+        Return the position after the first line break at or after ``pos``
+        that is not inside a quoted value, given the number of quote
+        characters since the start of the record, or 0 at the end of input.
+        """
+        quotechar = self.dialect.get('quotechar', '"')
+        while True:
+            newline = self.data.find(b'\n', pos)
+            if newline < 0:
+                return 0
+            if quotechar:
+                quotes += self.data[pos:newline].count(quotechar)
+            pos = newline + 1
+            if quotes % 2 == 0:
+                return pos
+
+    def _split(self, chunk_size):
+        """
+        Split the input into ``(start, end)`` ranges that each end on a
+        record boundary. The first range includes the header.
+        """
+        chunks = []
+        start, size = 0, len(self.data)
+        while start < size:
+            end = min(start + chunk_size, size)
+            if end < size:
+                # Count quotes from the start of the chunk, which is also the
+                # start of a record.
+                quotechar = self.dialect.get('quotechar', '"')
+                quotes = self.data[start:end].count(quotechar) \
+                    if quotechar else 0
+                end = self._record_end(end, quotes) or size
+            chunks.append((start, end))
+            start = end
+        return chunks
+
+    def map(self, func, chunks=None, processes=None):
+        """
+        Parse chunks of the input, in parallel if there is more than one.
+
+        :param func: Called with the header fields and an iterator over the
+            records of a chunk, each a list of strings, and returns the
+            result for the chunk. It must be a module-level function, so that
+            it can be sent to the pool processes.
+        :param chunks: Indices of the chunks to parse, defaults to all.
+        :type chunks: list of int
+        :param processes: Size of the pool, defaults to the ``processes``
+            config option, see :py:func:`girder_worker.core.utils.parallel_map`.
+        :type processes: int
+        :returns: The list of results, in the order of the chunks.
+        """
+        if chunks is None:
+            chunks = range(len(self.chunks))
+        if processes is None:
+            processes = int(_read_from_config('processes', 1))
+
+        jobs = (self._job(i, func) for i in chunks)
+        return parallel_map(_parse_chunk, jobs, len(chunks), processes)
+
+    def _job(self, i, func):
+        start, end = self.chunks[i]
+        if self.path is not None:
+            source = (self.path,)
+        else:
+            source = self.data[start:end]
+        return source, start, end, self.dialect, self.fields, func
+
+
+def read_rows(data=None, path=None, **kwargs):
+    """
+    Parse a CSV or TSV table into the ``table/rows`` format, converting
+    values to numbers where possible.
+
+    :param data: The CSV text.
+    :type data: str
+    :param path: The path of a CSV file, used instead of ``data``.
+    :type path: str
+    """
+    with CsvSource(data, path, kwargs.get('chunk_size')) as source:
+        rows = []
+        for chunk in source.map(rows_chunk, processes=kwargs.get('processes')):
+            rows.extend(chunk)
+        return {'fields': source.fields, 'rows': rows}
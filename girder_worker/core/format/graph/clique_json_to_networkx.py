@@ -1,7 +1,7 @@
-import json
+from girder_worker.core import json_codec
 import networkx as nx
 
-input = json.loads(input)
+input = json_codec.loads(input)
 
 nodes = [data for data in input if data['type'] == 'node']
 edges = [data for data in input if data['type'] == 'link']
@@ -1,4 +1,4 @@
-import json
+from girder_worker.core import json_codec
 from networkx.readwrite.json_graph import node_link_graph
 
-output = node_link_graph(json.loads(input))
+output = node_link_graph(json_codec.loads(input))
@@ -1,5 +1,5 @@
-from bson.json_util import dumps
 from bson.objectid import ObjectId
+from girder_worker.core import json_codec
 
 output = []
 node_oids = {}
@@ -34,4 +34,4 @@ for (u, v, edge_data) in input.edges(data=True):
 
     output.append(clique_edge)
 
-output = dumps(output)
+output = json_codec.dumps(output, extended=True)
@@ -1,4 +1,4 @@
-import json
+from girder_worker.core import json_codec
 from networkx.readwrite.json_graph import node_link_data
 
-output = json.dumps(node_link_data(input))
+output = json_codec.dumps(node_link_data(input))
@@ -1,2 +0,0 @@
-import json
-output = json.dumps(input)
@@ -0,0 +1,344 @@
+"""
+Converters and validators of the lazy ``table/objectlist.iter`` and
+``table/rows.iter`` formats, which hold the records of a table in an iterator,
+such as a generator, rather than in a list. The converters between these
+formats, and from ``jsonlines``, ``objectlist.json``, ``csv``, ``tsv`` and
+``objectlist.bson``, are generator stages that process one record at a time
+when the result is iterated over, so that a chain of them runs in constant
+memory. Converting to ``objectlist`` or ``rows`` materializes the records.
+
+The readers also accept a file-like object, and the text readers any iterable
+of lines, instead of a string. This is how streamed inputs of python mode tasks are read
+lazily, see :py:func:`decode_stream` and :py:func:`encode_stream`.
+
+Like the other functions in :py:mod:`girder_worker.core.format`, these are
+run as ``python`` mode function tasks.
+"""
+import collections
+import csv
+import itertools
+import six
+
+from girder_worker.core import bson_codec, json_codec
+from girder_worker.core.format import jsonlines_engine
+from girder_worker.core.format.csv_engine import get_csv_dialect, iter_rows
+
+# Minimum size of the head of a CSV or TSV stream that its dialect is detected
+# from, and size of the chunks of text generated for streamed outputs
+HEAD_SIZE = 65536
+CHUNK_SIZE = 65536
+
+# Number of objects that objectlist_to_rows reads ahead to find the fields of
+# the rows
+FIELDS_HEAD = 1000
+
+
+def _lines(input):
+    if isinstance(input, six.string_types):
+        return iter(input.splitlines())
+    return (line.rstrip('\r\n') for line in input)
+
+
+def _join_chunks(strings):
+    chunk, size = [], 0
+    for string in strings:
+        chunk.append(string)
+        size += len(string)
+        if size >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    yield ''.join(chunk)
+
+
+def flatten_object(obj):
+    """
+    Flatten the nested dicts of an object into a row whose field names are
+    the dot-separated paths of the values, like the ``objectlist`` to
+    ``rows`` converter. Keys that are not strings are skipped.
+    """
+    row = collections.OrderedDict()
+
+    def subkeys(path, value):
+        if isinstance(value, dict):
+            for k in value:
+                if isinstance(k, six.string_types):
+                    subkeys(path + [k], value[k])
+        elif path:
+            row['.'.join(path)] = value
+
+    subkeys([], obj)
+    return row
+
+
+def unflatten_row(row):
+    """
+    The opposite of :py:func:`flatten_object`: nest the values of a row
+    according to the dot-separated paths of their field names.
+    """
+    obj = {}
+    for field, value in six.iteritems(row):
+        path = field.split('.')
+        item = obj
+        for key in path[:-1]:
+            item = item.setdefault(key, {})
+        item[path[-1]] = value
+    return obj
+
+
+def csv_to_rows(input):
+    """
+    Lazily parse CSV or TSV text, converting values to numbers where
+    possible like :py:func:`girder_worker.core.format.csv_to_rows`. The
+    dialect is detected from the first ``HEAD_SIZE`` bytes of a stream.
+    """
+    if isinstance(input, six.string_types):
+        # csv package does not support unicode
+        head = input = str(input)
+        lines = _lines(input)
+    else:
+        input = iter(input)
+        head_lines, size = [], 0
+        for line in input:
+            head_lines.append(line)
+            size += len(line)
+            if size >= HEAD_SIZE and len(head_lines) > 1:
+                break
+        head = ''.join(head_lines)
+        lines = _lines(itertools.chain(head_lines, input))
+
+    reader = csv.reader(lines, get_csv_dialect(head))
+    fields = next(reader, None) or []
+    return {'fields': fields, 'rows': iter_rows(fields, reader)}
+
+
+def tsv_to_rows(input):
+    return csv_to_rows(input)
+
+
+def _text_chunks(input, delimiter):
+    output = six.StringIO()
+    writer = csv.DictWriter(output, input['fields'], delimiter=delimiter)
+    writer.writerow({d: d for d in input['fields']})
+    for row in input['rows']:
+        writer.writerow(row)
+        if output.tell() >= CHUNK_SIZE:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
+
+def rows_to_csv_chunks(input):
+    """
+    Generate CSV text a chunk at a time, for streamed outputs.
+    """
+    return _text_chunks(input, ',')
+
+
+def rows_to_tsv_chunks(input):
+    """
+    Generate TSV text a chunk at a time, for streamed outputs.
+    """
+    return _text_chunks(input, '\t')
+
+
+def rows_to_csv(input):
+    return ''.join(rows_to_csv_chunks(input))
+
+
+def rows_to_tsv(input):
+    return ''.join(rows_to_tsv_chunks(input))
+
+
+def jsonlines_to_objectlist(input):
+    return jsonlines_engine.iter_objects(_lines(input))
+
+
+def objectlist_to_jsonlines_chunks(input):
+    """
+    Generate JSON lines text a chunk at a time, for streamed outputs.
+    """
+    return _join_chunks(
+        json_codec.dumps(obj, extended=True) + '\n' for obj in input)
+
+
+def objectlist_to_jsonlines(input):
+    return ''.join(objectlist_to_jsonlines_chunks(input))
+
+
+def objectlist_json_to_objectlist(input):
+    return json_codec.iter_array(input, extended=True)
+
+
+def objectlist_to_objectlist_json_chunks(input):
+    """
+    Generate the JSON array of the objects a chunk at a time, for streamed
+    outputs.
+    """
+    return json_codec.iter_dumps_array(input, extended=True)
+
+
+def objectlist_to_objectlist_json(input):
+    return ''.join(objectlist_to_objectlist_json_chunks(input))
+
+
+def objectlist_bson_to_objectlist(input):
+    return bson_codec.iter_decode(input)
+
+
+def objectlist_to_objectlist_bson_chunks(input):
+    """
+    Generate the BSON documents of the objects a chunk at a time, for
+    streamed outputs.
+    """
+    return bson_codec.iter_encode(input)
+
+
+def objectlist_to_objectlist_bson(input):
+    return b''.join(objectlist_to_objectlist_bson_chunks(input))
+
+
+def _checked_rows(fields, rows, start):
+    """
+    Generate the rows, raising an exception for the first one that has a
+    field that is not in ``fields``, before it is used.
+    """
+    known = frozenset(fields)
+    for number, row in enumerate(rows, start):
+        if not known.issuperset(row):
+            field = next(f for f in row if f not in known)
+            raise Exception(
+                'Object %d has the field "%s", which is not in the first %d '
+                'objects that the fields of the rows were taken from.' % (
+                    number, field, start - 1))
+        yield row
+
+
+def objectlist_to_rows(input):
+    """
+    Lazily flatten objects into rows with :py:func:`flatten_object`. Since the
+    fields must be known before the first row is used, they are collected
+    from the first ``FIELDS_HEAD`` objects, which are read ahead. Any object
+    after them with a field that none of them have raises an exception when
+    its row is reached.
+    """
+    objects = iter(input)
+    head = [flatten_object(obj)
+            for obj in itertools.islice(objects, FIELDS_HEAD)]
+
+    fields = collections.OrderedDict()
+    for row in head:
+        fields.update((field, True) for field in row)
+    fields = list(fields)
+
+    return {
+        'fields': fields,
+        'rows': itertools.chain(head, _checked_rows(
+            fields, six.moves.map(flatten_object, objects), len(head) + 1))
+    }
+
+
+def rows_to_objectlist(input):
+    return six.moves.map(unflatten_row, input['rows'])
+
+
+def iterate_objectlist(input):
+    return iter(input)
+
+
+def materialize_objectlist(input):
+    return list(input)
+
+
+def iterate_rows(input):
+    return {'fields': list(input['fields']), 'rows': iter(input['rows'])}
+
+
+def materialize_rows(input):
+    return {'fields': list(input['fields']), 'rows': list(input['rows'])}
+
+
+def is_objectlist_iter(input):
+    """
+    Check that the input is iterable. The records are not inspected, since
+    that would consume them.
+    """
+    return isinstance(input, collections.Iterable) and \
+        not isinstance(input, (dict,) + six.string_types)
+
+
+def is_rows_iter(input):
+    return isinstance(input, dict) and \
+        isinstance(input.get('fields'), list) and \
+        is_objectlist_iter(input.get('rows'))
+
+
+# The text formats that streams can be read from and written to, by type and
+# format, with the iterator format they are parsed to or generated from.
+_DECODERS = {
+    ('table', 'csv'): ('rows.iter', csv_to_rows),
+    ('table', 'tsv'): ('rows.iter', tsv_to_rows),
+    ('table', 'jsonlines'): ('objectlist.iter', jsonlines_to_objectlist),
+    ('table', 'objectlist.json'): (
+        'objectlist.iter', objectlist_json_to_objectlist),
+    ('table', 'objectlist.bson'): (
+        'objectlist.iter', objectlist_bson_to_objectlist)
+}
+
+_ENCODERS = {
+    ('table', 'csv'): ('rows.iter', rows_to_csv_chunks),
+    ('table', 'tsv'): ('rows.iter', rows_to_tsv_chunks),
+    ('table', 'jsonlines'): ('objectlist.iter', objectlist_to_jsonlines_chunks),
+    ('table', 'objectlist.json'): (
+        'objectlist.iter', objectlist_to_objectlist_json_chunks),
+    ('table', 'objectlist.bson'): (
+        'objectlist.iter', objectlist_to_objectlist_bson_chunks)
+}
+
+
+def decode_stream(type, format, target_format, stream):
+    """
+    Lazily read a stream of text in the given format as data in an iterator
+    format, converting it through the conversion graph if needed.
+
+    :param type: The type of the data, like ``table``.
+    :param format: The text format of the stream, like ``csv``.
+    :param target_format: The iterator format to read, like ``rows.iter``.
+    :param stream: A file-like object or iterable of lines.
+    """
+    from girder_worker.core import convert
+
+    if (type, format) not in _DECODERS:
+        raise Exception('Cannot read a %s/%s stream as %s/%s.' % (
+            type, format, type, target_format))
+
+    iter_format, decode = _DECODERS[(type, format)]
+    data = decode(stream)
+    if iter_format != target_format:
+        data = convert(type, {'format': iter_format, 'data': data},
+                       {'format': target_format})['data']
+    return data
+
+
+def encode_stream(type, format, target_format, data):
+    """
+    Lazily write data in an iterator format as text in the given format,
+    converting it through the conversion graph if needed.
+
+    :param type: The type of the data, like ``table``.
+    :param format: The iterator format of the data, like ``rows.iter``.
+    :param target_format: The text format to write, like ``csv``.
+    :param data: The data to write.
+    :returns: A generator of chunks of text.
+    """
+    from girder_worker.core import convert
+
+    if (type, target_format) not in _ENCODERS:
+        raise Exception('Cannot write %s/%s as a %s/%s stream.' % (
+            type, format, type, target_format))
+
+    iter_format, encode = _ENCODERS[(type, target_format)]
+    if iter_format != format:
+        data = convert(type, {'format': format, 'data': data},
+                       {'format': iter_format})['data']
+    return encode(data)
@@ -0,0 +1,178 @@
+"""
+Parser for large JSON lines tables, such as logs of events. Since JSON text
+cannot contain a raw line break, every line break ends a record, so the input
+is split into chunks at the first line break after each multiple of the chunk
+size. The chunks can be parsed in a pool of processes, and the objects are
+returned in input order.
+
+Each chunk is decoded as a single JSON array by one call to the decoder, and
+the ``object_hook`` that converts MongoDB extended JSON such as
+``{"$oid": "..."}`` is only used for the chunks that contain ``"$``, so that
+plain JSON is decoded entirely by the decoder's C scanner.
+
+Like :py:mod:`girder_worker.core.format.csv_engine`, the input may be a
+string, or a file that is memory-mapped rather than read, so that tasks with a
+``"filepath"`` target input can parse it with ``read_objects(path=input)``.
+Streams are decoded lazily a batch of lines at a time with
+:py:func:`iter_objects`.
+
+Parallel parsing is configured in the ``[jsonlines]`` section of the worker
+config: ``processes`` is the size of the pool, 1 (the default) parsing in the
+calling process and 0 meaning one process per CPU, and ``chunk_size`` is the
+size of the chunks in bytes. The pool is shared with the CSV parser through
+:py:func:`girder_worker.core.utils.parallel_map`. Inputs that fit in a single
+chunk are always parsed in the calling process.
+"""
+import contextlib
+import gc
+import girder_worker
+import itertools
+import mmap
+
+from girder_worker.core import json_codec
+from girder_worker.core.utils import parallel_map
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Size in characters of the batches of lines decoded by iter_objects
+BATCH_SIZE = 65536
+
+
+def _read_from_config(key, default):
+    if girder_worker.config.has_option('jsonlines', key):
+        return girder_worker.config.get('jsonlines', key)
+    else:
+        return default
+
+
+def loads_lines(lines, extended=True):
+    """
+    Decode a list of JSON lines, each holding a single JSON value.
+
+    :param lines: The lines, without their line breaks.
+    :type lines: list of str
+    :param extended: Whether to decode MongoDB extended JSON. The lines are
+        only checked for it if this is set.
+    :type extended: bool
+    :returns: The list of decoded values.
+    """
+    if not lines:
+        return []
+    text = '[%s]' % ','.join(lines)
+    # The cyclic garbage collector would otherwise run many times over the
+    # objects as they are created, and none of them can be garbage yet.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        values = json_codec.loads(text, extended=extended and '"$' in text)
+    finally:
+        if enabled:
+            gc.enable()
+    if len(values) != len(lines):
+        raise ValueError('Each line of JSON lines must hold one JSON value.')
+    return values
+
+
+def iter_objects(lines, extended=True):
+    """
+    Lazily decode an iterable of JSON lines, a batch of ``BATCH_SIZE``
+    characters at a time.
+
+    :param lines: The lines, without their line breaks.
+    :param extended: Whether to decode MongoDB extended JSON.
+    :type extended: bool
+    """
+    batch, size = [], 0
+    for line in lines:
+        batch.append(line)
+        size += len(line)
+        if size >= BATCH_SIZE:
+            for obj in loads_lines(batch, extended):
+                yield obj
+            batch, size = [], 0
+    for obj in loads_lines(batch, extended):
+        yield obj
+
+
+def _parse_chunk(job):
+    source, start, end, extended = job
+    if isinstance(source, tuple):
+        with open(source[0], 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+    else:
+        data = source
+    return loads_lines(data.splitlines(), extended)
+
+
+def _split(data, chunk_size):
+    """
+    Split the input into ``(start, end)`` ranges that each end after a line
+    break, or at the end of the input.
+    """
+    chunks = []
+    start, size = 0, len(data)
+    while start < size:
+        end = min(start + chunk_size, size)
+        if end < size:
+            end = data.find(b'\n', end - 1) + 1 or size
+        chunks.append((start, end))
+        start = end
+    return chunks
+
+
+@contextlib.contextmanager
+def _mapped(path):
+    with open(path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file cannot be mapped
+            yield b''
+            return
+        try:
+            yield data
+        finally:
+            data.close()
+
+
+def read_objects(data=None, path=None, extended=True, **kwargs):
+    """
+    Parse JSON lines into the ``table/objectlist`` format.
+
+    :param data: The JSON lines text.
+    :type data: str
+    :param path: The path of a JSON lines file, used instead of ``data``.
+    :type path: str
+    :param extended: Whether to decode MongoDB extended JSON.
+    :type extended: bool
+    :param chunk_size: Approximate size of the chunks in bytes, defaults to
+        the ``chunk_size`` config option.
+    :type chunk_size: int
+    :param processes: Size of the pool, defaults to the ``processes`` config
+        option.
+    :type processes: int
+    """
+    chunk_size = kwargs.get('chunk_size')
+    if chunk_size is None:
+        chunk_size = int(_read_from_config('chunk_size', DEFAULT_CHUNK_SIZE))
+    chunk_size = max(chunk_size, 1)
+
+    if path is None:
+        chunks = _split(data, chunk_size)
+        jobs = ((data[start:end], start, end, extended)
+                for start, end in chunks)
+    else:
+        # The chunks are read from the file by the process that parses them
+        with _mapped(path) as mapped:
+            chunks = _split(mapped, chunk_size)
+        jobs = (((path,), start, end, extended) for start, end in chunks)
+
+    processes = kwargs.get('processes')
+    if processes is None:
+        processes = int(_read_from_config('processes', 1))
+    results = parallel_map(_parse_chunk, jobs, len(chunks), processes)
+    return list(itertools.chain.from_iterable(results))
+
+
+def jsonlines_to_objectlist(input):
+    return read_objects(input)
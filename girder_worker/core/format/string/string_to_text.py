@@ -1 +0,0 @@
-output = input
@@ -1,2 +0,0 @@
-import bson.json_util
-output = bson.json_util.loads(input)
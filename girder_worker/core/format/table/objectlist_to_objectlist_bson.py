@@ -1,3 +0,0 @@
-import bson
-
-output = ''.join([bson.BSON.encode(row) for row in input])
@@ -0,0 +1,244 @@
+"""
+Converters of the ``tree`` formats that walk trees with an explicit stack
+rather than recursion, so that trees of any depth, such as caterpillar shaped
+phylogenies with tens of thousands of levels, can be converted without hitting
+the recursion limit.
+
+It also defines the ``tree/parent_index`` format, which holds a tree as a dict
+of flat arrays rather than nested dicts:
+
+* ``"parents"``: an ``int64`` array of the index of the parent of each node,
+  ``-1`` for the root. The converters list nodes in depth-first order, with
+  the root first and each node before its children, and the children of a
+  node are in the order of their indices.
+* ``"node_data"`` and ``"edge_data"``: dicts that map each attribute name to a
+  column of its values for every node, as in the ``table/columns`` format,
+  with ``None`` where a node does not have the attribute. The edge attributes
+  of a node are those of the edge from its parent, so they are ``None`` for
+  the root. Nodes without any edge attributes have no ``"edge_data"`` in the
+  ``nested`` format.
+* ``"node_fields"`` and ``"edge_fields"``: the attribute names in order, like
+  in the ``nested`` format.
+
+Like the other functions in :py:mod:`girder_worker.core.format`, these are
+run as ``python`` mode function tasks. The ``parent_index`` format requires
+NumPy, which is only imported by its functions, so that writing ``nested``
+trees as newick does not.
+"""
+import re
+import six
+
+from girder_worker.core.utils import gc_paused
+
+# Approximate size of the chunks generated by iter_newick
+CHUNK_SIZE = 65536
+
+# Characters that ete3 replaces with underscores in newick names
+_ILLEGAL_NEWICK = re.compile(r'[:;(),\[\]\t\n\r=]')
+
+# Branch length of nodes without one, as in ete3
+DEFAULT_DIST = 1.0
+
+
+def _newick_label(name, dist):
+    """
+    Format the name and branch length of a node like ``ete3`` with newick
+    format 1.
+    """
+    if name is None:
+        name = ''
+    elif not isinstance(name, six.string_types):
+        name = str(name)
+    if dist is None:
+        dist = DEFAULT_DIST
+    try:
+        dist = '%0.6g' % float(dist)
+    except (TypeError, ValueError):
+        dist = '?'
+    return '%s:%s' % (_ILLEGAL_NEWICK.sub('_', name), dist)
+
+
+def _newick_parts(root, children, label):
+    """
+    Generate the parts of the newick string of a tree, walking it in
+    depth-first order with an explicit stack. As when the tree is built under
+    an unnamed ``ete3`` root, the root is only labeled if it is a leaf, and
+    then without a name or branch length.
+
+    :param root: The root node.
+    :param children: A function returning the list of children of a node.
+    :param label: A function returning the newick label of a node.
+    """
+    # Each entry is a node, whether its subtree is done, and whether it is
+    # the first child of its parent
+    stack = [(root, False, True)]
+    while stack:
+        node, done, first = stack.pop()
+        if done:
+            yield ')'
+            if node is not root:
+                yield label(node)
+            continue
+
+        if not first:
+            yield ','
+        nodes = children(node)
+        if not nodes:
+            yield label(node) if node is not root else _newick_label('', None)
+            continue
+
+        yield '('
+        stack.append((node, True, first))
+        stack.extend((child, False, i == 0)
+                     for i, child in reversed(list(enumerate(nodes))))
+    yield ';'
+
+
+def _chunks(parts):
+    chunk, size = [], 0
+    for part in parts:
+        chunk.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _nested_label(node):
+    return _newick_label(node.get('node_data', {}).get('node name', ''),
+                         node.get('edge_data', {}).get('weight'))
+
+
+def iter_newick(input):
+    """
+    Lazily write a tree in the ``nested`` format as newick, like ``ete3``
+    with newick format 1, for streamed outputs. Node names are the
+    ``"node name"`` attribute of the nodes and branch lengths the
+    ``"weight"`` attribute of their edges.
+
+    :param input: The ``nested`` tree.
+    :returns: A generator of chunks of about ``CHUNK_SIZE`` characters.
+    """
+    return _chunks(_newick_parts(
+        input, lambda node: node.get('children'), _nested_label))
+
+
+def nested_to_newick(input):
+    return ''.join(iter_newick(input))
+
+
+def _fields(fields, columns):
+    """
+    Returns the given field names followed by the names of any other columns,
+    so that attributes missing from the field list are not dropped.
+    """
+    fields = list(fields)
+    return fields + sorted(set(columns) - set(fields))
+
+
+def nested_to_parent_index(input):
+    import numpy
+    from girder_worker.core.format.columns import dicts_to_columns
+
+    parents, node_rows, edge_rows = [], [], []
+    stack = [(input, -1)]
+    while stack:
+        node, parent = stack.pop()
+        index = len(parents)
+        parents.append(parent)
+        node_rows.append(node.get('node_data', {}))
+        edge_rows.append(node.get('edge_data', {}) if parent >= 0 else {})
+        stack.extend((child, index)
+                     for child in reversed(node.get('children', ())))
+
+    node_data = dicts_to_columns(node_rows)
+    edge_data = dicts_to_columns(edge_rows)
+    return {
+        'parents': numpy.array(parents, dtype=numpy.int64),
+        'node_data': node_data,
+        'edge_data': edge_data,
+        'node_fields': _fields(input.get('node_fields', []), node_data),
+        'edge_fields': _fields(input.get('edge_fields', []), edge_data)
+    }
+
+
+def parent_index_to_nested(input):
+    from girder_worker.core.format.columns import columns_to_dicts
+
+    parents = input['parents'].tolist()
+    count = len(parents)
+    root = None
+    with gc_paused():
+        nodes = [{'node_data': data}
+                 for data in columns_to_dicts(input['node_data'], count)]
+        edges = columns_to_dicts(input['edge_data'], count)
+
+        for node, parent, edge_data in six.moves.zip(nodes, parents, edges):
+            if parent < 0:
+                root = node
+                continue
+            if edge_data:
+                node['edge_data'] = edge_data
+            siblings = nodes[parent].get('children')
+            if siblings is None:
+                siblings = nodes[parent]['children'] = []
+            siblings.append(node)
+
+    root['node_fields'] = list(input.get('node_fields', []))
+    root['edge_fields'] = list(input.get('edge_fields', []))
+    return root
+
+
+def children(input):
+    """
+    Returns the children of every node of a ``parent_index`` tree in
+    compressed sparse row form, as arrays ``indptr`` and ``indices`` where
+    the children of node ``i`` are ``indices[indptr[i]:indptr[i + 1]]``, in
+    the order of their indices. The root is not the child of any node.
+    """
+    import numpy
+
+    parents = input['parents']
+    nonroot = numpy.flatnonzero(parents >= 0)
+    order = numpy.argsort(parents[nonroot], kind='mergesort')
+    indptr = numpy.zeros(len(parents) + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(parents[nonroot], minlength=len(parents)),
+                 out=indptr[1:])
+    return indptr, nonroot[order]
+
+
+def iter_parent_index_newick(input):
+    """
+    Lazily write a ``parent_index`` tree as newick, like
+    :py:func:`iter_newick` for the ``nested`` format.
+
+    :param input: The ``parent_index`` tree.
+    :returns: A generator of chunks of about ``CHUNK_SIZE`` characters.
+    """
+    indptr, indices = children(input)
+    indptr, indices = indptr.tolist(), indices.tolist()
+    count = len(indptr) - 1
+    names = input['node_data'].get('node name')
+    names = names.tolist() if names is not None else [''] * count
+    weights = input['edge_data'].get('weight')
+    weights = weights.tolist() if weights is not None else [None] * count
+
+    root = input['parents'].tolist().index(-1)
+    return _chunks(_newick_parts(
+        root, lambda i: indices[indptr[i]:indptr[i + 1]],
+        lambda i: _newick_label(names[i], weights[i])))
+
+
+def parent_index_to_newick(input):
+    return ''.join(iter_parent_index_newick(input))
+
+
+def is_parent_index(input):
+    import numpy
+
+    return isinstance(input, dict) and \
+        isinstance(input.get('parents'), numpy.ndarray) and \
+        isinstance(input.get('node_data'), dict) and \
+        isinstance(input.get('edge_data'), dict)
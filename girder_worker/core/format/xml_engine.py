@@ -0,0 +1,408 @@
+"""
+Incremental readers and writers for the XML graph and tree formats.
+
+GraphML and PhyloXML documents are parsed with ``iterparse``, and each node,
+edge or clade element is cleared and dropped from the document as soon as it
+has been added to the graph or tree, so that only the graph or tree being
+built is held in memory rather than the whole element tree as well. The
+readers take the text of a document, a file-like object such as a streamed
+input, or the path of a file, so that tasks with a ``"filepath"`` target input
+can parse it with, for example, ``read_graphml(path=input)``.
+
+GraphML is read like ``networkx.read_graphml``, and written like
+``networkx.write_graphml`` by :py:func:`iter_graphml` a chunk at a time
+instead of building the whole document first. PhyloXML is read into the
+documents of the ``treestore`` format by :py:func:`iter_treestore`.
+"""
+import contextlib
+import networkx as nx
+import re
+import six
+
+from bson.objectid import ObjectId
+from networkx.readwrite.graphml import GraphML, GraphMLReader
+from xml.sax.saxutils import escape
+
+from girder_worker.core import bson_codec
+from girder_worker.core.utils import gc_paused
+
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+
+# Approximate size of the chunks generated by iter_graphml
+CHUNK_SIZE = 65536
+
+_GRAPHML = '{%s}' % GraphML.NS_GRAPHML
+
+# Characters that are escaped in text and attribute values
+_SPECIAL = re.compile(r'[&<>"\n\r\t]')
+_ATTRIBUTE_ENTITIES = {'"': '&quot;', '\n': '&#10;', '\r': '&#13;',
+                       '\t': '&#9;'}
+
+# PhyloXML elements and attributes whose values are numbers
+_NUMBERS = frozenset(['branch_length', 'confidence', 'width'])
+
+
+@contextlib.contextmanager
+def _source(data, path):
+    """
+    Returns a file-like object to parse the text, file-like object or file
+    path given.
+    """
+    if path is not None:
+        with open(path, 'rb') as file:
+            yield file
+    elif hasattr(data, 'read'):
+        yield data
+    else:
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+        yield six.BytesIO(data)
+
+
+def _text(value):
+    text = value if isinstance(value, six.string_types) else str(value)
+    return escape(text) if _SPECIAL.search(text) else text
+
+
+def _quote(value):
+    text = value if isinstance(value, six.string_types) else str(value)
+    if _SPECIAL.search(text):
+        text = escape(text, _ATTRIBUTE_ENTITIES)
+    return '"%s"' % text
+
+
+def _new_graph(graph_element, keys, defaults):
+    if graph_element.get('edgedefault') == 'directed':
+        graph = nx.MultiDiGraph()
+    else:
+        graph = nx.MultiGraph()
+
+    graph.graph['node_default'] = {}
+    graph.graph['edge_default'] = {}
+    for key_id, value in six.iteritems(defaults):
+        key = keys[key_id]
+        if key['for'] in ('node', 'edge'):
+            graph.graph[key['for'] + '_default'][key['name']] = \
+                key['type'](value)
+    return graph
+
+
+def read_graphml(data=None, path=None):
+    """
+    Read the first graph of a GraphML document, like
+    ``networkx.read_graphml``. The graph is a ``MultiGraph`` or
+    ``MultiDiGraph`` if it has parallel edges, and a ``Graph`` or ``DiGraph``
+    otherwise. The ``key`` elements must come before the graph, as the
+    GraphML schema requires.
+
+    :param data: The text of the document, or a file-like object to read it
+        from.
+    :param path: The path of a file to read instead.
+    """
+    reader = GraphMLReader()
+    graph = graph_element = root = keys = None
+    depth = 0
+
+    with _source(data, path) as source, gc_paused():
+        for event, element in ElementTree.iterparse(
+                source, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if depth == 1:
+                    root = element
+                elif depth == 2 and graph is None and \
+                        element.tag == _GRAPHML + 'graph':
+                    keys, defaults = reader.find_graphml_keys(root)
+                    graph = _new_graph(element, keys, defaults)
+                    graph_element = element
+                continue
+
+            depth -= 1
+            if element is graph_element:
+                graph.graph.update(
+                    reader.decode_data_elements(keys, element))
+                break
+            if graph is None or depth != 2:
+                continue
+
+            if element.tag == _GRAPHML + 'node':
+                reader.add_node(graph, element, keys)
+            elif element.tag == _GRAPHML + 'edge':
+                reader.add_edge(graph, element, keys)
+            elif element.tag == _GRAPHML + 'hyperedge':
+                raise nx.NetworkXError(
+                    'GraphML reader does not support hyperedges')
+            else:
+                # Keep the data elements of the graph until its end
+                continue
+            # The node or edge follows the graph's data elements at most, so
+            # it is found at once
+            graph_element.remove(element)
+            element.clear()
+
+    if graph is None:
+        raise Exception('The GraphML document has no graph.')
+
+    # switch to Graph or DiGraph if no parallel edges were found.
+    if not reader.multigraph:
+        return _simple_graph(graph)
+    return graph
+
+
+def _simple_graph(graph):
+    """
+    Returns a ``Graph`` or ``DiGraph`` of a multigraph without parallel
+    edges. Unlike the graph constructors, this does not copy the attribute
+    dicts, which are shared with the multigraph.
+    """
+    def single(adjacency):
+        return {u: {v: next(six.itervalues(edges))
+                    for v, edges in six.iteritems(neighbors)}
+                for u, neighbors in six.iteritems(adjacency)}
+
+    if graph.is_directed():
+        output = nx.DiGraph()
+        output.succ = output.adj = output.edge = single(graph.succ)
+        output.pred = single(graph.pred)
+    else:
+        output = nx.Graph()
+        output.adj = output.edge = single(graph.adj)
+    output.graph = graph.graph
+    output.node = graph.node
+    return output
+
+
+class _GraphMLKeys(object):
+    """
+    The ``key`` elements of the attributes of a graph, by name, type and
+    scope, numbered in the order they are first found.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.elements = []
+
+    def add(self, scope, data, defaults):
+        for name, value in six.iteritems(data):
+            value_type = type(value)
+            if value_type not in GraphML.xml_type:
+                raise nx.NetworkXError(
+                    'GraphML writer does not support %s as data values.' %
+                    value_type)
+            key = (name, GraphML.xml_type[value_type], scope)
+            if key not in self.ids:
+                self.ids[key] = 'd%d' % len(self.ids)
+                self.elements.append(
+                    self._element(key, self.ids[key], defaults.get(name)))
+
+    def _element(self, key, key_id, default):
+        name, value_type, scope = key
+        tag = '<key attr.name=%s attr.type=%s for=%s id=%s' % (
+            _quote(name), _quote(value_type), _quote(scope), _quote(key_id))
+        if default is None:
+            return '  %s />\n' % tag
+        return '  %s>\n    <default>%s</default>\n  </key>\n' % (
+            tag, _text(default))
+
+    def data(self, scope, data, indent):
+        return ''.join(
+            '%s<data key="%s">%s</data>\n' % (
+                indent,
+                self.ids[(name, GraphML.xml_type[type(value)], scope)],
+                _text(value))
+            for name, value in six.iteritems(data))
+
+
+def _edges(graph):
+    if graph.is_multigraph():
+        for u, v, key, data in graph.edges_iter(data=True, keys=True):
+            data = dict(data)
+            data['key'] = key
+            yield u, v, data
+    else:
+        for u, v, data in graph.edges_iter(data=True):
+            yield u, v, data
+
+
+def _attributes(attributes):
+    return ' '.join('%s=%s' % (name, _quote(value))
+                    for name, value in attributes)
+
+
+def _element(tag, attributes, content, indent):
+    attributes = _attributes(attributes)
+    if not content:
+        return '%s<%s %s />\n' % (indent, tag, attributes)
+    return '%s<%s %s>\n%s%s</%s>\n' % (
+        indent, tag, attributes, content, indent, tag)
+
+
+def _graphml_parts(graph):
+    node_defaults = graph.graph.get('node_default', {})
+    edge_defaults = graph.graph.get('edge_default', {})
+    graph_data = {k: v for k, v in six.iteritems(graph.graph)
+                  if k not in ('id', 'node_default', 'edge_default')}
+
+    # The keys must come before the graph, so find them all first
+    keys = _GraphMLKeys()
+    keys.add('graph', graph_data, {})
+    for _, data in graph.nodes_iter(data=True):
+        keys.add('node', data, node_defaults)
+    for _, _, data in _edges(graph):
+        keys.add('edge', data, edge_defaults)
+
+    yield "<?xml version='1.0' encoding='utf-8'?>\n"
+    yield '<graphml xmlns=%s xmlns:xsi=%s xsi:schemaLocation=%s>\n' % (
+        _quote(GraphML.NS_GRAPHML), _quote(GraphML.NS_XSI),
+        _quote(GraphML.SCHEMALOCATION))
+    for element in keys.elements:
+        yield element
+
+    attributes = [('edgedefault',
+                   'directed' if graph.is_directed() else 'undirected')]
+    if graph.graph.get('id') is not None:
+        attributes.append(('id', graph.graph['id']))
+    yield '  <graph %s>\n' % _attributes(attributes)
+    yield keys.data('graph', graph_data, '    ')
+
+    for node, data in graph.nodes_iter(data=True):
+        yield _element('node', [('id', node)],
+                       keys.data('node', data, '      '), '    ')
+    for u, v, data in _edges(graph):
+        yield _element('edge', [('source', u), ('target', v)],
+                       keys.data('edge', data, '      '), '    ')
+
+    yield '  </graph>\n</graphml>\n'
+
+
+def iter_graphml(graph):
+    """
+    Lazily write a networkx graph as a GraphML document, like
+    ``networkx.write_graphml``, for streamed outputs.
+
+    :param graph: The networkx graph.
+    :returns: A generator of UTF-8 encoded chunks of about ``CHUNK_SIZE``
+        bytes.
+    """
+    chunk, size = [], 0
+    for part in _graphml_parts(graph):
+        if isinstance(part, six.text_type):
+            part = part.encode('utf-8')
+        chunk.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield b''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def graphml_to_networkx(input):
+    return read_graphml(input)
+
+
+def networkx_to_graphml(input):
+    return b''.join(iter_graphml(input))
+
+
+def _tag(element):
+    return element.tag.rpartition('}')[2]
+
+
+def _value(name, text):
+    if name in _NUMBERS:
+        try:
+            return float(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _fields(element):
+    """
+    Returns the attributes and the child elements other than clades of a
+    PhyloXML element as a dict. Elements with text and no attributes or
+    children become values, and repeated elements become lists.
+    """
+    fields = {name: _value(name, value)
+              for name, value in six.iteritems(element.attrib)}
+    for child in element:
+        name = _tag(child)
+        if name == 'clade':
+            continue
+        if len(child) or child.attrib:
+            value = _fields(child)
+        else:
+            value = _value(name, (child.text or '').strip())
+
+        if name not in fields:
+            fields[name] = value
+        elif isinstance(fields[name], list):
+            fields[name].append(value)
+        else:
+            fields[name] = [fields[name], value]
+
+    text = (element.text or '').strip()
+    if text and (len(element) or element.attrib):
+        fields['value'] = _value(_tag(element), text)
+    return fields
+
+
+def iter_treestore(data=None, path=None):
+    """
+    Lazily read a PhyloXML document into the documents of the ``treestore``
+    format, in one pass with an explicit stack of the open clades rather than
+    recursion, so that the depth of a tree is not limited. Each clade is a
+    document with an ``ObjectId``, its PhyloXML attributes and elements such
+    as ``name`` and ``branch_length``, and a ``clades`` list of the ids of
+    its children, and is generated once its children have been. Each
+    phylogeny is then a document with ``rooted`` and ``clades`` holding the
+    id of its root clade.
+
+    :param data: The text of the document, or a file-like object to read it
+        from.
+    :param path: The path of a file to read instead.
+    """
+    # The ids of the child clades read so far of each open clade, and of
+    # the root clades of the phylogeny
+    children = [[]]
+    # The open elements, since an element does not refer to its parent
+    elements = []
+
+    with _source(data, path) as source:
+        for event, element in ElementTree.iterparse(
+                source, events=('start', 'end')):
+            tag = _tag(element)
+            if event == 'start':
+                elements.append(element)
+                if tag == 'clade':
+                    children.append([])
+                continue
+
+            elements.pop()
+            if tag == 'clade':
+                document = _fields(element)
+                document['_id'] = ObjectId()
+                document['clades'] = children.pop()
+                children[-1].append(document['_id'])
+            elif tag == 'phylogeny':
+                document = _fields(element)
+                document['_id'] = ObjectId()
+                document['rooted'] = element.get('rooted') == 'true'
+                document['clades'] = children[-1]
+                children = [[]]
+            else:
+                continue
+
+            # Clearing the element alone would leave it in its parent, so that
+            # every clade of a wide tree would be kept until its end
+            if elements:
+                elements[-1].remove(element)
+            element.clear()
+            yield document
+
+
+def phyloxml_to_treestore(input):
+    return b''.join(bson_codec.iter_encode(iter_treestore(input)))
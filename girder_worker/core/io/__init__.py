@@ -187,3 +187,5 @@ register_push_handler('inline', _inline_push)
 
 register_stream_push_adapter('http', http.HttpStreamPushAdapter)
 register_stream_fetch_adapter('http', http.HttpStreamFetchAdapter)
+register_stream_push_adapter('mongodb', mongodb.MongoStreamPushAdapter)
+register_stream_fetch_adapter('mongodb', mongodb.MongoStreamFetchAdapter)
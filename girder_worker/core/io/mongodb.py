@@ -1,25 +1,137 @@
-def fetch(spec, **kwargs):
+import girder_worker
+import os
+import tempfile
+
+from girder_worker.core.utils import StreamFetchAdapter, StreamPushAdapter
+
+# Default number of documents inserted at once by push and
+# MongoStreamPushAdapter, set by insert_batch_size in the [mongodb] section of
+# the worker config
+INSERT_BATCH_SIZE = 1000
+
+
+def _read_from_config(key, default):
+    if girder_worker.config.has_option('mongodb', key):
+        return girder_worker.config.get('mongodb', key)
+    else:
+        return default
+
+
+def _collection(spec, **kwargs):
     import pymongo
-    import bson
-    db = spec['db']
-    collection = spec['collection']
     host = spec.get('host', 'localhost')
-    data = ''.join([bson.BSON.encode(d) for d in
-                    pymongo.MongoClient(host)[db][collection].find()])
-    return data
+    return pymongo.MongoClient(host)[spec['db']][spec['collection']] \
+        .with_options(**kwargs)
+
+
+def _raw_documents(spec):
+    """
+    Generate the BSON of the documents of a collection as it is received from
+    the server, without decoding it.
+    """
+    from girder_worker.core import bson_codec
+    collection = _collection(
+        spec, codec_options=bson_codec.RAW_CODEC_OPTIONS)
+    for document in collection.find():
+        yield document.raw
+
+
+def _insert_raw(collection, data):
+    """
+    Insert the BSON documents in a string, without decoding them, with
+    ordered bulk inserts of ``insert_batch_size`` documents.
+    """
+    from bson.raw_bson import RawBSONDocument
+    from girder_worker.core import bson_codec
+
+    batch_size = max(1, int(_read_from_config(
+        'insert_batch_size', INSERT_BATCH_SIZE)))
+    documents, start = [], 0
+    for end in bson_codec.document_ends(data):
+        documents.append(RawBSONDocument(data[start:end]))
+        start = end
+        if len(documents) >= batch_size:
+            collection.insert_many(documents)
+            documents = []
+    if documents:
+        collection.insert_many(documents)
+    return start
+
+
+def fetch(spec, **kwargs):
+    """
+    Fetch the documents of a collection as concatenated BSON. When the input
+    has a ``"filepath"`` target, the documents are written to the file as they
+    are received, so they are never all in memory.
+    """
+    task_input = kwargs.get('task_input', {})
+    if task_input.get('target') == 'filepath':
+        with tempfile.NamedTemporaryFile(
+                'wb', prefix=os.path.join(kwargs['_tempdir'], ''),
+                delete=False) as out:
+            for data in _raw_documents(spec):
+                out.write(data)
+            return out.name
+
+    return b''.join(_raw_documents(spec))
 
 
 def push(data, spec, **kwargs):
-    import pymongo
-    import bson
-    db = spec['db']
-    collection = spec['collection']
-    host = spec.get('host', 'localhost')
-    bson_data = bson.decode_all(data)
+    """
+    Replace the documents of a collection by the concatenated BSON documents
+    of the data. They are inserted in batches without being decoded.
+    """
+    from bson.errors import InvalidBSON
 
-    c = pymongo.MongoClient(host)[db][collection]
+    c = _collection(spec)
     # TODO is this really what we want? Dropping the whole collection?
     # Seems dangerous, might be unexpected.
     c.drop()
-    if len(bson_data) > 0:
-        c.insert(bson_data)
+    if _insert_raw(c, data) != len(data):
+        raise InvalidBSON('Truncated BSON document.')
+
+
+class MongoStreamFetchAdapter(StreamFetchAdapter):
+    """
+    Streams the documents of a collection as concatenated BSON, reading them
+    from the server as they are requested.
+    """
+    def __init__(self, input_spec):
+        super(MongoStreamFetchAdapter, self).__init__(input_spec)
+        self._documents = _raw_documents(input_spec)
+        self._buf = b''
+
+    def read(self, buf_len):
+        parts, size = [self._buf], len(self._buf)
+        while size < buf_len:
+            data = next(self._documents, None)
+            if data is None:
+                break
+            parts.append(data)
+            size += len(data)
+
+        data = b''.join(parts)
+        self._buf = data[buf_len:]
+        return data[:buf_len]
+
+
+class MongoStreamPushAdapter(StreamPushAdapter):
+    """
+    Replaces the documents of a collection by a stream of concatenated BSON
+    documents, inserting each complete document of the chunks written so far.
+    """
+    def __init__(self, output_spec):
+        super(MongoStreamPushAdapter, self).__init__(output_spec)
+        self._collection = _collection(output_spec)
+        self._collection.drop()
+        self._buf = b''
+
+    def write(self, buf):
+        data = self._buf + buf
+        self._buf = data[_insert_raw(self._collection, data):]
+
+    def close(self):
+        from bson.errors import InvalidBSON
+
+        if self._buf:
+            raise InvalidBSON('Truncated BSON document.')
@@ -0,0 +1,322 @@
+"""
+JSON encoding and decoding for the converters, specs and executors.
+
+Decoding uses the fastest JSON package that is installed, in the order
+``ujson``, ``simplejson`` and the standard library's ``json``. Encoding uses
+``simplejson`` if it is installed and ``json`` otherwise, since they produce
+the same text, while ``ujson`` rounds floats to fewer digits than are needed to
+read them back exactly. ``ujson`` decodes floats with its ``precise_float``
+option, since its default, faster parsing is off by one in the last digit for
+many doubles. The ``backend`` option in the ``[json]`` section of the
+worker config selects one of these packages for both instead.
+
+The ``extended`` flag of the functions reads and writes MongoDB extended JSON
+like ``bson.json_util``, e.g. ``{"$oid": "..."}`` for ObjectIds, which is the
+JSON representation of the ``table`` and ``tree`` formats. Only the objects
+that need it are converted, rather than every value.
+
+Large top-level arrays can be decoded lazily, one element at a time, from a
+string or a stream with :py:func:`iter_array`, and encoded a chunk at a time
+with :py:func:`iter_dumps_array`.
+"""
+import bson.json_util
+import functools
+import girder_worker
+import importlib
+import json
+import re
+import six
+
+from bson.son import SON
+
+BACKENDS = ('ujson', 'simplejson', 'json')
+
+# Size of the chunks read by iter_array and generated by iter_dumps_array
+CHUNK_SIZE = 65536
+
+# Keys of the objects that bson.json_util converts to BSON types
+_EXTENDED_KEYS = frozenset([
+    '$binary', '$code', '$date', '$dbPointer', '$maxKey', '$minKey',
+    '$numberDecimal', '$numberDouble', '$numberInt', '$numberLong', '$oid',
+    '$ref', '$regex', '$regularExpression', '$symbol', '$timestamp',
+    '$undefined', '$uuid'])
+
+# Types that are written as they are in extended JSON
+_PLAIN_TYPES = frozenset([
+    bool, float, int, six.text_type, str, type(None)] + list(
+    six.integer_types))
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Text at the end of the buffer that may be the rest of a number cut by the
+# end of a chunk, e.g. the "." of "12." or the "e" of "1e"
+_NUMBER_TAIL = re.compile(r'[0-9.eE+\-]*\Z')
+
+# The selected decoder and encoder modules
+_backends = {}
+
+
+def _read_from_config(key, default):
+    if girder_worker.config.has_option('json', key):
+        return girder_worker.config.get('json', key)
+    else:
+        return default
+
+
+def _select(names):
+    """
+    Import the first of the named JSON packages that is installed, or the
+    one set in the worker config.
+    """
+    name = _read_from_config('backend', '').strip()
+    if name:
+        if name not in BACKENDS:
+            raise Exception('Unknown JSON backend "%s", must be one of %s.' % (
+                name, ', '.join(BACKENDS)))
+        names = (name,)
+
+    for name in names:
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            pass
+    raise Exception('JSON backend "%s" is not installed.' % names[-1])
+
+
+def decoder():
+    """
+    Returns the module used to decode JSON.
+    """
+    if 'decoder' not in _backends:
+        _backends['decoder'] = _select(BACKENDS)
+    return _backends['decoder']
+
+
+def encoder():
+    """
+    Returns the module used to encode JSON.
+    """
+    if 'encoder' not in _backends:
+        _backends['encoder'] = _select(('simplejson', 'json'))
+    return _backends['encoder']
+
+
+def _decode_extended(obj):
+    """
+    Convert the objects of decoded JSON that represent BSON types, from the
+    innermost outwards like the ``object_hook`` of ``bson.json_util``. This
+    is for backends that have no ``object_hook`` option.
+    """
+    if type(obj) is dict:
+        for key, value in six.iteritems(obj):
+            if type(value) in (dict, list):
+                obj[key] = _decode_extended(value)
+        return _object_hook(obj)
+    elif type(obj) is list:
+        for i, value in enumerate(obj):
+            if type(value) in (dict, list):
+                obj[i] = _decode_extended(value)
+    return obj
+
+
+def _object_hook(obj):
+    if _EXTENDED_KEYS.isdisjoint(obj):
+        return obj
+    return bson.json_util.object_hook(obj)
+
+
+def _encode_extended(obj):
+    """
+    Convert BSON types to their extended JSON objects, like
+    ``bson.json_util.dumps`` does, but only visiting the values that are not
+    written as they are, and without copying the dicts and lists that do not
+    contain any.
+    """
+    t = type(obj)
+    if t in _PLAIN_TYPES:
+        return obj
+    if t is dict or t is list:
+        items = six.iteritems(obj) if t is dict else enumerate(obj)
+        changed = {}
+        for key, value in items:
+            if type(value) not in _PLAIN_TYPES:
+                new = _encode_extended(value)
+                if new is not value:
+                    changed[key] = new
+        if not changed:
+            return obj
+        if t is list:
+            return [changed[i] if i in changed else v
+                    for i, v in enumerate(obj)]
+        return SON((k, changed[k] if k in changed else v)
+                   for k, v in six.iteritems(obj))
+    if hasattr(obj, 'iteritems') or hasattr(obj, 'items'):
+        return SON((k, _encode_extended(v)) for k, v in six.iteritems(obj))
+    if hasattr(obj, '__iter__') and \
+            not isinstance(obj, (six.text_type, bytes)):
+        return [_encode_extended(v) for v in obj]
+    try:
+        return bson.json_util.default(obj)
+    except TypeError:
+        return obj
+
+
+def loads(s, extended=False):
+    """
+    Decode a JSON string.
+
+    :param s: The JSON text.
+    :type s: str
+    :param extended: Whether to decode MongoDB extended JSON.
+    :type extended: bool
+    """
+    module = decoder()
+    if module.__name__ in ('json', 'simplejson'):
+        if not extended:
+            return module.loads(s)
+        return module.loads(s, object_hook=_object_hook)
+
+    value = module.loads(s, precise_float=True)
+    return _decode_extended(value) if extended else value
+
+
+def dumps(obj, extended=False, **kwargs):
+    """
+    Encode a value as a JSON string.
+
+    :param obj: The value to encode.
+    :param extended: Whether to encode BSON types as MongoDB extended JSON.
+    :type extended: bool
+    :param kwargs: Options of :py:func:`json.dumps`, such as ``indent`` or
+        ``default``. They are only supported by the ``json`` and
+        ``simplejson`` backends, so ``json`` is used instead of ``ujson`` if
+        any are given.
+    """
+    module = encoder()
+    if kwargs and module.__name__ not in ('json', 'simplejson'):
+        module = json
+    if extended:
+        obj = _encode_extended(obj)
+    return module.dumps(obj, **kwargs)
+
+
+def _chunks(input):
+    if isinstance(input, six.string_types):
+        return iter((input,))
+    if hasattr(input, 'read'):
+        return iter(functools.partial(input.read, CHUNK_SIZE), b'')
+    return iter(input)
+
+
+class _Reader(object):
+    """
+    Buffer of JSON text read a chunk at a time.
+    """
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buf, self.pos, self.eof = '', 0, False
+
+    def fill(self):
+        """
+        Read at least as much again as is buffered, so that a large value is
+        not decoded again for every chunk. Returns whether anything was read.
+        """
+        parts = [self.buf[self.pos:]]
+        size = len(parts[0])
+        need = max(2 * size, CHUNK_SIZE)
+        read = False
+        while not self.eof and size < need:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.eof = True
+            else:
+                parts.append(chunk)
+                size += len(chunk)
+                read = True
+        self.buf, self.pos = ''.join(parts), 0
+        return read
+
+    def next_char(self):
+        """
+        Skip whitespace, and return and consume the next character.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                self.pos += 1
+                return self.buf[self.pos - 1]
+            if not self.fill():
+                raise ValueError('Unexpected end of JSON array')
+
+    def decode(self, raw_decode):
+        """
+        Decode the next value.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            try:
+                value, end = raw_decode(self.buf, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            # A number cut by the end of the buffer is decoded without the
+            # rest of its digits, fraction or exponent, so decode it again
+            # with the next chunk
+            if _NUMBER_TAIL.match(self.buf, end) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array(input, extended=False):
+    """
+    Lazily decode the elements of a JSON array, so that the whole array is
+    never held as a list. Only the text of the element being decoded needs
+    to be in memory when reading from a stream.
+
+    :param input: The JSON text, a file-like object to read it from, or an
+        iterable of chunks of it.
+    :param extended: Whether to decode MongoDB extended JSON.
+    :type extended: bool
+    """
+    # Always use the standard library, which can decode from an offset
+    hook = _object_hook if extended else None
+    raw_decode = json.JSONDecoder(object_hook=hook).raw_decode
+
+    reader = _Reader(_chunks(input))
+    if reader.next_char() != '[':
+        raise ValueError('Expected a JSON array')
+    if reader.next_char() == ']':
+        return
+    reader.pos -= 1
+
+    while True:
+        yield reader.decode(raw_decode)
+        char = reader.next_char()
+        if char == ']':
+            return
+        if char != ',':
+            raise ValueError('Expected "," or "]" in JSON array')
+
+
+def iter_dumps_array(items, extended=False):
+    """
+    Lazily encode an iterable as a JSON array, for streamed outputs.
+
+    :param items: The elements of the array.
+    :param extended: Whether to encode BSON types as MongoDB extended JSON.
+    :type extended: bool
+    :returns: A generator of chunks of JSON text.
+    """
+    chunk, size, separator = ['['], 1, ''
+    for item in items:
+        text = separator + dumps(item, extended=extended)
+        separator = ', '
+        chunk.append(text)
+        size += len(text)
+        if size >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    chunk.append(']')
+    yield ''.join(chunk)
@@ -1,7 +1,7 @@
 """Define the common parent type for all json specs contained in the package."""
 
 import six
-import json
+from girder_worker.core import json_codec
 from collections import Mapping
 import copy
 
@@ -42,7 +42,7 @@ class SpecMixin(object):
         # process positional arguments
         for arg in args:
             if isinstance(arg, six.string_types):
-                arg = json.loads(arg)
+                arg = json_codec.loads(arg)
             d = dict(arg)
             self.update(d)
 
@@ -77,7 +77,7 @@ class SpecMixin(object):
 
         if newvalue is not None:
             try:
-                json.dumps(newvalue, default=self._serializer)
+                json_codec.dumps(newvalue, default=self._serializer)
             except Exception:
                 raise ValueError(
                     '"%s" is not valid json.' % repr(newvalue)
@@ -104,7 +104,7 @@ class SpecMixin(object):
         """
         kw.setdefault('default', self._serializer)
         self.check()
-        return json.dumps(self, **kw)
+        return json_codec.dumps(self, **kw)
 
     def __str__(self):
         """Serialize the object as json."""
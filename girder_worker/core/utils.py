@@ -1,7 +1,13 @@
+from __future__ import absolute_import
+
+import atexit
 import contextlib
 import errno
 import functools
+import gc
 import imp
+import io
+import multiprocessing
 import os
 import girder_worker
 import girder_worker.plugins
@@ -104,6 +110,65 @@ def tmpdir(cleanup=True):
             shutil.rmtree(path)
 
 
+@contextlib.contextmanager
+def gc_paused():
+    """
+    Pause the cyclic garbage collector, which would otherwise run many times
+    over the objects of a large graph or tree as they are created, while none
+    of them can be garbage yet.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+# The pool of parallel_map in this process, as the process id, the number of
+# processes and the pool
+_pool = None
+
+
+def _close_pool():
+    if _pool is not None and _pool[0] == os.getpid():
+        _pool[2].terminate()
+
+atexit.register(_close_pool)
+
+
+def parallel_map(func, jobs, count, processes):
+    """
+    Apply a function to jobs, in a pool of processes if more than one is
+    requested and there is more than one job. The pool is created on first
+    use and kept for the life of the process, rather than forking new
+    processes for every call, and is only replaced when a different size is
+    requested.
+
+    :param func: The function, which must be a module-level function so that
+        it can be sent to the pool processes.
+    :param jobs: An iterable of the arguments of each call.
+    :param count: The number of jobs.
+    :param processes: The size of the pool, 0 for one process per CPU, or 1
+        to run the jobs in this process.
+    :returns: The list of results, in the order of the jobs.
+    """
+    global _pool
+
+    processes = processes or multiprocessing.cpu_count()
+
+    # Daemonic processes, such as pool workers, cannot have children
+    if min(processes, count) < 2 or multiprocessing.current_process().daemon:
+        return [func(job) for job in jobs]
+
+    # A pool inherited by a forked process cannot be used in it
+    if _pool is None or _pool[:2] != (os.getpid(), processes):
+        _close_pool()
+        _pool = (os.getpid(), processes, multiprocessing.Pool(processes))
+    return list(_pool[2].imap(func, jobs))
+
+
 def with_tmpdir(fn):
     """
     This function is provided as a convenience to allow use as a decorator of
@@ -381,6 +446,33 @@ class MemoryFetchAdapter(StreamFetchAdapter):
         return self._stream.read(buf_len)
 
 
+class FetchAdapterReader(io.RawIOBase):
+    """
+    Exposes a stream fetch adapter as a read-only binary file object. Wrap it
+    in an ``io.BufferedReader`` to get ``readline`` and line iteration.
+    """
+    def __init__(self, adapter):
+        """
+        :param adapter: The fetch adapter to read from.
+        :type adapter: StreamFetchAdapter
+        """
+        super(FetchAdapterReader, self).__init__()
+        self.adapter = adapter
+        self._buf = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if not self._buf:
+            self._buf = self.adapter.read(len(b))
+
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
 class StreamPushAdapter(object):
     """
     This represents the interface that must be implemented by push adapters for
@@ -98,8 +98,14 @@ def task_cleanup(e):
 def load(params):
     from girder_worker.core import events, register_executor
     import executor
+    import prefetch
 
     events.bind('run.before', params['name'], before_run)
     events.bind('run.finally', params['name'], task_cleanup)
     events.bind('cleanup', params['name'], docker_gc)
     register_executor('docker', executor.run)
+
+    if prefetch.enabled():
+        from celery.signals import worker_ready, worker_shutdown
+        worker_ready.connect(prefetch.start, weak=False)
+        worker_shutdown.connect(prefetch.stop, weak=False)
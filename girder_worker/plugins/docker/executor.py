@@ -1,27 +1,84 @@
+import contextlib
+import fcntl
+import hashlib
 import os
 import re
 import subprocess
+import time
 
+from girder_worker import config
 from girder_worker.core import TaskSpecValidationError, utils
 from girder_worker.core.io import make_stream_fetch_adapter, make_stream_push_adapter
+from . import watcher
 
 DATA_VOLUME = '/mnt/girder_worker/data'
 
 
+def _pull_freshness():
+    """
+    Number of seconds after a pull during which an image is considered fresh
+    and will not be pulled again. Prefetching only pays off if the task does
+    not then pull the same image again, so it implies a default window.
+    """
+    from . import _read_from_config, prefetch
+    default = prefetch.DEFAULT_FRESHNESS if prefetch.enabled() else 0
+    return float(_read_from_config('pull_freshness', default))
+
+
+@contextlib.contextmanager
+def _image_lock(image):
+    """
+    Holds an exclusive lock for pulling the given image, shared across the
+    worker processes through a lock file in the ``tmp_root`` directory. Yields
+    the path to the stamp file that records when the image was last pulled.
+    """
+    stamp_dir = os.path.join(
+        config.get('girder_worker', 'tmp_root'), '.dockerpullstamps')
+    try:
+        os.makedirs(stamp_dir)
+    except OSError:
+        if not os.path.isdir(stamp_dir):
+            raise
+    stamp = os.path.join(stamp_dir, hashlib.sha1(image).hexdigest())
+
+    with open(stamp + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield stamp
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
 def _pull_image(image):
     """
-    Pulls the specified Docker image onto this worker.
+    Pulls the specified Docker image onto this worker, unless it was pulled
+    within the configured freshness window. If another process or thread is
+    already pulling the image, waits for that pull instead of starting another.
+
+    :returns: Whether a pull was actually performed.
     """
-    command = ('docker', 'pull', image)
-    p = subprocess.Popen(args=command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    stdout, stderr = p.communicate()
+    freshness = _pull_freshness()
 
-    if p.returncode != 0:
-        print('Error pulling Docker image %s:' % image)
-        print('STDOUT: ' + stdout)
-        print('STDERR: ' + stderr)
+    with _image_lock(image) as stamp:
+        if freshness > 0 and os.path.exists(stamp) and \
+                time.time() - os.path.getmtime(stamp) < freshness:
+            return False
+
+        command = ('docker', 'pull', image)
+        p = subprocess.Popen(args=command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, stderr = p.communicate()
+
+        if p.returncode != 0:
+            print('Error pulling Docker image %s:' % image)
+            print('STDOUT: ' + stdout)
+            print('STDERR: ' + stderr)
+
+            raise Exception('Docker pull returned code {}.'.format(p.returncode))
 
-        raise Exception('Docker pull returned code {}.'.format(p.returncode))
+        with open(stamp, 'w') as f:
+            f.write(image)
+
+    return True
 
 
 def _transform_path(inputs, taskInputs, inputId, tmpDir):
@@ -88,6 +145,10 @@ def validate_task_outputs(task_outputs):
                     'Docker filepath output paths must either start with '
                     '"%s/" or be specified relative to that directory.' %
                     DATA_VOLUME)
+            if spec.get('watch') and spec.get('stream'):
+                raise TaskSpecValidationError(
+                    'Docker output "%s" cannot be both a streaming and a '
+                    'watched output.' % name)
         elif name not in ('_stdout', '_stderr'):
             raise TaskSpecValidationError(
                 'Docker outputs must be either "_stdout", "_stderr", or '
@@ -155,12 +216,58 @@ def _setup_pipes(task_inputs, inputs, task_outputs, outputs, tempdir):
     return ipipes, opipes
 
 
+def _output_path(name, spec, tempdir):
+    """
+    Returns the location on the host of a non-streaming filepath output.
+    """
+    path = spec.get('path', name)
+    if not path.startswith('/'):
+        # Assume relative paths are relative to the data volume
+        path = os.path.join(DATA_VOLUME, path)
+
+    # Convert data volume refs to the temp dir on the host
+    return path.replace(DATA_VOLUME, tempdir, 1)
+
+
+def _setup_watcher(task_outputs, outputs, tempdir, **kwargs):
+    """
+    If any filepath outputs are marked with ``watch``, creates an
+    ``OutputWatcher`` that pushes each of them as soon as the container has
+    finished writing it, rather than waiting for the container to exit.
+    Returns None if there is nothing to watch or inotify is unsupported.
+    """
+    watched = {}
+    for name, spec in task_outputs.iteritems():
+        if (spec.get('watch') and spec.get('target') == 'filepath' and
+                not spec.get('stream') and name in outputs):
+            watched[_output_path(name, spec, tempdir)] = name
+
+    if not watched or not watcher.is_supported():
+        return None
+
+    # Job status updates are not threadsafe, so don't send them from here
+    kwargs = dict(kwargs, _job_manager=None)
+
+    def push(path):
+        from girder_worker.core import push_output
+        name = watched[path]
+        print('Pushing output %s while container is running.' % name)
+        outputs[name]['script_data'] = path
+        push_output(name, task_outputs[name], outputs, **kwargs)
+        outputs[name]['_pushed'] = True
+
+    return watcher.OutputWatcher(tempdir, {
+        path: task_outputs[name].get('marker')
+        for path, name in watched.iteritems()}, push)
+
+
 def run(task, inputs, outputs, task_inputs, task_outputs, **kwargs):
     image = task['docker_image']
 
     if task.get('pull_image', True):
         print('Pulling Docker image: ' + image)
-        _pull_image(image)
+        if not _pull_image(image):
+            print('Image %s was pulled recently, not pulling again.' % image)
 
     tempdir = kwargs.get('_tempdir')
     args = _expand_args(task.get('container_args', []), inputs, task_inputs, tempdir)
@@ -183,20 +290,28 @@ def run(task, inputs, outputs, task_inputs, task_outputs, **kwargs):
 
     print('Running container: %s' % repr(command))
 
-    p = utils.run_process(command, output_pipes=opipes, input_pipes=ipipes)
+    output_watcher = _setup_watcher(task_outputs, outputs, tempdir, **kwargs)
+    if output_watcher:
+        output_watcher.start()
+
+    try:
+        p = utils.run_process(command, output_pipes=opipes, input_pipes=ipipes)
+    finally:
+        if output_watcher:
+            output_watcher.stop()
+
+    if output_watcher:
+        output_watcher.raise_error()
 
     if p.returncode != 0:
         raise Exception('Error: docker run returned code %d.' % p.returncode)
 
     for name, spec in task_outputs.iteritems():
-        if spec.get('target') == 'filepath' and not spec.get('stream'):
-            path = spec.get('path', name)
-            if not path.startswith('/'):
-                # Assume relative paths are relative to the data volume
-                path = os.path.join(DATA_VOLUME, path)
+        if outputs.get(name, {}).get('_pushed'):
+            continue  # already pushed by the output watcher
 
-            # Convert data volume refs to the temp dir on the host
-            path = path.replace(DATA_VOLUME, tempdir, 1)
+        if spec.get('target') == 'filepath' and not spec.get('stream'):
+            path = _output_path(name, spec, tempdir)
             if not os.path.exists(path):
                 raise Exception('Output filepath %s does not exist.' % path)
             outputs[name]['script_data'] = path
@@ -0,0 +1,127 @@
+"""
+Lookahead that pulls the Docker images of queued tasks in the background.
+
+When prefetching is enabled, a thread in the main worker process watches the
+task requests that celery has reserved (i.e. prefetched from the broker but
+not yet started) for ``girder_worker.run`` tasks in ``docker`` mode, and pulls
+their images while the current task is still running. Pulls go through the
+same locking and freshness cache as the executor, so the task will not pull
+the image again once it starts.
+"""
+import threading
+import traceback
+
+# Pull freshness window (in seconds) used when prefetching is enabled but
+# docker.pull_freshness is not configured.
+DEFAULT_FRESHNESS = 600
+
+# Interval in seconds at which to look for newly reserved tasks
+DEFAULT_INTERVAL = 1.0
+
+_thread = None
+_stop = threading.Event()
+
+
+def enabled():
+    from . import _read_from_config
+    return str(_read_from_config('prefetch_images', 0)).lower() in (
+        '1', 'true', 'yes', 'on')
+
+
+def _docker_image(request):
+    """
+    Returns the image a reserved celery request will pull when it runs, or
+    None if it is not a docker task that pulls its image.
+    """
+    if getattr(request, 'name', None) != 'girder_worker.run':
+        return None
+
+    args = getattr(request, 'args', None) or ()
+    kwargs = getattr(request, 'kwargs', None) or {}
+    task = args[0] if args else kwargs.get('task')
+
+    if not isinstance(task, dict) or task.get('mode') != 'docker':
+        return None
+    if not task.get('pull_image', True):
+        return None
+
+    return task.get('docker_image')
+
+
+def queued_images(requests):
+    """
+    Returns the distinct images needed by the given reserved requests, in the
+    order the tasks were received.
+
+    :param requests: Reserved celery task requests.
+    :type requests: iterable
+    """
+    images = []
+    for request in requests:
+        image = _docker_image(request)
+        if image and image not in images:
+            images.append(image)
+    return images
+
+
+def prefetch(images):
+    """
+    Pull each of the given images unless it is fresh or already being pulled.
+    Errors are only printed, since the task will retry the pull itself.
+    """
+    from .executor import _pull_image
+
+    for image in images:
+        if _stop.is_set():
+            break
+        try:
+            if _pull_image(image):
+                print('Prefetched Docker image: ' + image)
+        except Exception:
+            print('Prefetching Docker image %s failed:' % image)
+            traceback.print_exc()
+
+
+def _lookahead(interval):
+    from celery.worker import state
+
+    seen = set()
+    while not _stop.wait(interval):
+        images = [
+            image for image in queued_images(list(state.reserved_requests))
+            if image not in seen]
+        seen.update(images)
+        prefetch(images)
+
+        # Forget images once no queued task needs them, so that they are
+        # prefetched again (subject to the freshness cache) when they return.
+        seen.intersection_update(
+            queued_images(list(state.reserved_requests)))
+
+
+def start(*args, **kwargs):
+    """
+    Start the lookahead thread. This is connected to celery's ``worker_ready``
+    signal so that it runs in the main worker process, which is where the
+    reserved requests live.
+    """
+    global _thread
+    from . import _read_from_config
+
+    if _thread is not None:
+        return
+
+    interval = float(_read_from_config('prefetch_interval', DEFAULT_INTERVAL))
+    _stop.clear()
+    _thread = threading.Thread(target=_lookahead, args=(interval,))
+    _thread.daemon = True
+    _thread.start()
+
+
+def stop(*args, **kwargs):
+    global _thread
+
+    if _thread is not None:
+        _stop.set()
+        _thread.join()
+        _thread = None
@@ -1,3 +1,4 @@
+import collections
 import ConfigParser
 import girder_worker
 import httmock
@@ -7,10 +8,13 @@ import shutil
 import six
 import stat
 import sys
+import time
 import unittest
 
 from girder_worker.core import cleanup, run, io, TaskSpecValidationError
+from girder_worker.plugins.docker import prefetch
 from girder_worker.plugins.docker.executor import DATA_VOLUME
+from tests import captureOutput
 
 _tmp = None
 OUT_FD, ERR_FD = 100, 200
@@ -311,3 +315,185 @@ class TestDockerMode(unittest.TestCase):
         pipe = os.path.join(tmp, 'named_pipe')
         self.assertTrue(os.path.exists(pipe))
         self.assertTrue(stat.S_ISFIFO(os.stat(pipe).st_mode))
+
+    @mock.patch('girder_worker.core.utils.run_process')
+    @mock.patch('subprocess.Popen')
+    def testWatchedOutputs(self, mockPopen, mockRunProcess):
+        mockPopen.return_value = processMock
+        pushed = []
+
+        def push(data, spec, **kwargs):
+            pushed.append((spec['name'], data))
+
+        def waitForPush(count):
+            for _ in range(100):
+                if len(pushed) >= count:
+                    return
+                time.sleep(0.05)
+
+        io.register_push_handler('test_watch', push)
+
+        tmp = os.path.join(_tmp, 'watched')
+        if not os.path.isdir(tmp):
+            os.makedirs(tmp)
+
+        # Simulate a container that writes its outputs one after the other
+        def container(*args, **kwargs):
+            with open(os.path.join(tmp, 'first.txt'), 'w') as f:
+                f.write('first')
+            waitForPush(1)
+            self.assertEqual(pushed, [
+                ('first', os.path.join(tmp, 'first.txt'))])
+
+            os.makedirs(os.path.join(tmp, 'sub'))
+            with open(os.path.join(tmp, 'sub', 'second.txt'), 'w') as f:
+                f.write('second')
+            time.sleep(0.3)
+            # This output waits for its marker file
+            self.assertEqual(len(pushed), 1)
+            with open(os.path.join(tmp, 'sub', 'second.txt.done'), 'w'):
+                pass
+            waitForPush(2)
+            self.assertEqual(len(pushed), 2)
+            return processMock
+
+        mockRunProcess.side_effect = container
+
+        task = {
+            'mode': 'docker',
+            'docker_image': 'test/test',
+            'pull_image': False,
+            'inputs': [],
+            'outputs': [{
+                'id': 'first',
+                'format': 'text',
+                'type': 'string',
+                'target': 'filepath',
+                'path': 'first.txt',
+                'watch': True
+            }, {
+                'id': 'second',
+                'format': 'text',
+                'type': 'string',
+                'target': 'filepath',
+                'path': '%s/sub/second.txt' % DATA_VOLUME,
+                'watch': True,
+                'marker': '.done'
+            }, {
+                'id': 'third',
+                'format': 'text',
+                'type': 'string',
+                'target': 'filepath'
+            }]
+        }
+
+        outputs = {
+            'first': {'mode': 'test_watch', 'name': 'first', 'format': 'text'},
+            'second': {'mode': 'test_watch', 'name': 'second', 'format': 'text'},
+            'third': {'mode': 'test_watch', 'name': 'third', 'format': 'text'}
+        }
+        with open(os.path.join(tmp, 'third'), 'w') as f:
+            f.write('third')
+
+        with captureOutput():
+            run(task, inputs={}, outputs=outputs, _tempdir=tmp, cleanup=False)
+
+        self.assertEqual(pushed, [
+            ('first', os.path.join(tmp, 'first.txt')),
+            ('second', os.path.join(tmp, 'sub', 'second.txt')),
+            ('third', os.path.join(tmp, 'third'))
+        ])
+        self.assertNotIn('_pushed', outputs['first'])
+
+        # Watched outputs that were never seen complete are pushed at the end
+        del pushed[:]
+        mockRunProcess.side_effect = None
+        mockRunProcess.return_value = processMock
+        os.remove(os.path.join(tmp, 'sub', 'second.txt.done'))
+        with captureOutput():
+            run(task, inputs={}, outputs=outputs, _tempdir=tmp, cleanup=False)
+        self.assertEqual(sorted(name for name, _ in pushed), ['first', 'second', 'third'])
+
+        task['outputs'][0]['stream'] = True
+        msg = r'^Docker output "first" cannot be both a streaming and a watched output\.$'
+        with self.assertRaisesRegexp(TaskSpecValidationError, msg):
+            run(task, inputs={}, outputs=outputs, _tempdir=tmp)
+
+    @mock.patch('subprocess.Popen')
+    def testPullFreshness(self, mockPopen):
+        mockPopen.return_value = processMock
+        girder_worker.config.set('docker', 'pull_freshness', '1000')
+
+        task = {
+            'mode': 'docker',
+            'docker_image': 'test/fresh:latest',
+            'inputs': [],
+            'outputs': []
+        }
+
+        try:
+            with captureOutput() as stdpipes:
+                run(task, inputs={})
+            self.assertEqual(mockPopen.call_count, 3)
+            cmd = mockPopen.call_args_list[0][1]['args']
+            self.assertEqual(cmd, ('docker', 'pull', 'test/fresh:latest'))
+
+            # The image is still fresh, so it should not be pulled again
+            mockPopen.reset_mock()
+            with captureOutput() as stdpipes:
+                run(task, inputs={})
+            self.assertEqual(mockPopen.call_count, 2)
+            self.assertIn('Image test/fresh:latest was pulled recently',
+                          stdpipes[0])
+            cmd = mockPopen.call_args_list[0][1]['args']
+            self.assertEqual(tuple(cmd[:2]), ('docker', 'run'))
+        finally:
+            girder_worker.config.remove_option('docker', 'pull_freshness')
+
+    @mock.patch('subprocess.Popen')
+    def testPrefetch(self, mockPopen):
+        mockPopen.return_value = processMock
+
+        Request = collections.namedtuple('Request', ['name', 'args', 'kwargs'])
+
+        def request(name, *args, **kwargs):
+            return Request(name, args, kwargs)
+
+        requests = [
+            request('girder_worker.run', {
+                'mode': 'docker', 'docker_image': 'test/a'}),
+            request('girder_worker.run', task={
+                'mode': 'docker', 'docker_image': 'test/b'}),
+            request('girder_worker.run', {
+                'mode': 'docker', 'docker_image': 'test/a'}),
+            request('girder_worker.run', {
+                'mode': 'docker', 'docker_image': 'test/c',
+                'pull_image': False}),
+            request('girder_worker.run', {'mode': 'python', 'script': ''}),
+            request('girder_worker.convert', 'string', {}, {})
+        ]
+        self.assertEqual(prefetch.queued_images(requests), ['test/a', 'test/b'])
+
+        girder_worker.config.set('docker', 'prefetch_images', 'true')
+        try:
+            self.assertTrue(prefetch.enabled())
+            with captureOutput() as stdpipes:
+                prefetch.prefetch(['test/prefetched'])
+            self.assertEqual(mockPopen.call_count, 1)
+            self.assertEqual(stdpipes[0], 'Prefetched Docker image: test/prefetched\n')
+
+            # Prefetching implies a freshness window, so the task won't pull
+            mockPopen.reset_mock()
+            with captureOutput():
+                run({
+                    'mode': 'docker',
+                    'docker_image': 'test/prefetched',
+                    'inputs': [],
+                    'outputs': []
+                }, inputs={})
+            self.assertEqual(mockPopen.call_count, 2)
+            cmd = mockPopen.call_args_list[0][1]['args']
+            self.assertEqual(tuple(cmd[:2]), ('docker', 'run'))
+        finally:
+            girder_worker.config.remove_option('docker', 'prefetch_images')
+        self.assertFalse(prefetch.enabled())
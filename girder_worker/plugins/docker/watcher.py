@@ -0,0 +1,189 @@
+import ctypes
+import ctypes.util
+import errno
+import io
+import os
+import select
+import six
+import struct
+import sys
+import threading
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct('iIII')
+_READ_LEN = 65536
+_POLL_INTERVAL = 100  # milliseconds
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+_libc = _load_libc()
+
+
+def is_supported():
+    """
+    Returns whether inotify is available on this system. Output watching is
+    only supported on Linux.
+    """
+    return _libc is not None
+
+
+class OutputWatcher(object):
+    """
+    Watches the task temp directory with inotify while a container is running,
+    and calls ``callback(path)`` in a background thread as soon as each of the
+    watched output files is complete. A file counts as complete when it is
+    closed after being written (or moved into place), or, if a marker suffix
+    was specified for it, when ``path + marker`` is written.
+
+    Files that were completed before the watcher could see them (e.g. inside a
+    directory that was created and written to very quickly) are simply left
+    in ``pending`` so the caller can handle them once the container exits.
+    """
+    def __init__(self, root, paths, callback):
+        """
+        :param root: The directory to watch, which must exist.
+        :type root: str
+        :param paths: Dict mapping absolute paths of the files to watch to
+            their marker suffix, or ``None`` to complete them on close.
+        :type paths: dict
+        :param callback: Called with each completed path.
+        :type callback: function
+        """
+        self.root = os.path.abspath(root)
+        self.pending = dict(paths)
+        self.callback = callback
+        self.error = None
+
+        self._markers = {
+            path + marker: path for path, marker in paths.items() if marker}
+        self._dirs = set()
+        for path in paths:
+            d = os.path.dirname(path)
+            while d.startswith(self.root) and d not in self._dirs:
+                self._dirs.add(d)
+                d = os.path.dirname(d)
+
+        self._wds = {}
+        self._fd = None
+        self._file = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, 'inotify_init1: ' + os.strerror(e))
+        self._fd = fd
+        self._file = io.open(fd, 'rb', buffering=0)
+        self._watch_tree(self.root)
+
+        self._thread = threading.Thread(target=self._loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop watching. Events that were already queued when the container
+        exited are still processed before this returns.
+        """
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+    def raise_error(self):
+        """
+        Re-raise any exception that was raised by the callback.
+        """
+        if self.error is not None:
+            six.reraise(*self.error)
+
+    def _watch_tree(self, path):
+        """
+        Add watches on ``path`` and any of its existing subdirectories that
+        lead to a watched output.
+        """
+        # Paths that are already bytes, such as non-ASCII str paths on
+        # Python 2, are passed as they are
+        if isinstance(path, six.text_type):
+            encoded = path.encode('utf8')
+        else:
+            encoded = path
+        wd = _libc.inotify_add_watch(
+            self._fd, encoded, IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+        if wd < 0:
+            e = ctypes.get_errno()
+            if e == errno.ENOENT:
+                return  # removed before we got to it
+            raise OSError(e, 'inotify_add_watch: ' + os.strerror(e))
+        self._wds[wd] = path
+
+        for d in self._dirs:
+            if os.path.dirname(d) == path and os.path.isdir(d):
+                self._watch_tree(d)
+
+    def _read_events(self):
+        buf = self._file.read(_READ_LEN)
+        if not buf:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(buf, offset)
+            offset += _EVENT_HEADER.size
+            name = buf[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if wd in self._wds:
+                events.append((mask, os.path.join(self._wds[wd], name)))
+        return events
+
+    def _handle(self, mask, path):
+        if mask & IN_ISDIR:
+            if path in self._dirs:
+                self._watch_tree(path)
+            return
+        if not mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            return
+
+        if path in self._markers:
+            path = self._markers[path]
+        elif self.pending.get(path) is not None:
+            return  # this file waits for its marker
+
+        if path in self.pending:
+            del self.pending[path]
+            self.callback(path)
+
+    def _loop(self):
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+
+        try:
+            while self.pending:
+                stopping = self._stopped.is_set()
+                if poller.poll(0 if stopping else _POLL_INTERVAL):
+                    for mask, path in self._read_events():
+                        self._handle(mask, path)
+                elif stopping:
+                    break
+        except Exception:
+            self.error = sys.exc_info()
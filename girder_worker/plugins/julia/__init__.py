@@ -1,3 +1,16 @@
+from girder_worker import config
+
+
+def _read_from_config(key, default):
+    """
+    Helper to read Julia specific config values from the worker config files.
+    """
+    if config.has_option('julia', key):
+        return config.get('julia', key)
+    else:
+        return default
+
+
 def load(params):
     from girder_worker.core import register_executor
     from . import executor
@@ -0,0 +1,39 @@
+# Long-lived Julia process used by the julia executor in daemon mode.
+#
+# Connects to the Unix socket given as the first argument, then repeatedly
+# reads the path of a task script, one per line, and runs it in a fresh
+# module. Replies with "ok" or "error <message>" on a single line. Anything
+# the scripts print goes to this process' own stdout and stderr.
+
+if VERSION >= v"0.7.0-"
+    using Sockets
+end
+
+function run_script(path)
+    m = Module(:GirderWorkerTask)
+    if VERSION >= v"0.7.0-"
+        Base.include(m, path)
+    else
+        eval(m, :(include($path)))
+    end
+end
+
+sock = connect(ARGS[1])
+
+while true
+    line = readline(sock)
+    if isempty(line)
+        break
+    end
+
+    reply = "ok"
+    try
+        run_script(chomp(line))
+    catch err
+        reply = "error " * join(split(sprint(showerror, err), '\n'), "\\n")
+    end
+
+    flush(VERSION >= v"0.7.0-" ? stdout : STDOUT)
+    flush(VERSION >= v"0.7.0-" ? stderr : STDERR)
+    write(sock, reply * "\n")
+end
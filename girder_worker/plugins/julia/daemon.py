@@ -0,0 +1,105 @@
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+
+_DAEMON_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'daemon.jl')
+
+
+class JuliaDaemon(object):
+    """
+    A long-lived ``julia`` process that runs task scripts, so that tasks do
+    not each pay for Julia startup and JIT compilation. Scripts are sent to the
+    process over a Unix socket and each one is run in a fresh module. The
+    process is restarted after ``max_tasks`` tasks, or if it dies.
+    """
+    def __init__(self, max_tasks=0, start_timeout=120):
+        """
+        :param max_tasks: Restart the process after it has run this many
+            tasks. Zero means never.
+        :type max_tasks: int
+        :param start_timeout: Seconds to wait for a new process to connect.
+        :type start_timeout: float
+        """
+        self.max_tasks = max_tasks
+        self.start_timeout = start_timeout
+        self._process = None
+        self._sock = None
+        self._file = None
+        self._tasks = 0
+        self._lock = threading.Lock()
+
+    def _start(self):
+        sock_dir = tempfile.mkdtemp()
+        sock_path = os.path.join(sock_dir, 'julia.sock')
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(sock_path)
+            server.listen(1)
+            server.settimeout(self.start_timeout)
+
+            command = ['julia', _DAEMON_SCRIPT, sock_path]
+            print('Starting julia daemon: "%s"' % ' '.join(command))
+            self._process = subprocess.Popen(command)
+
+            try:
+                self._sock, _ = server.accept()
+            except socket.timeout:
+                self.stop()
+                raise Exception('Error: julia daemon did not start within '
+                                '%s seconds.' % self.start_timeout)
+        finally:
+            server.close()
+            shutil.rmtree(sock_dir)
+
+        self._sock.settimeout(None)
+        self._file = self._sock.makefile('rb')
+        self._tasks = 0
+
+    def stop(self):
+        """
+        Stop the Julia process, if it is running.
+        """
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.terminate()
+            self._process.wait()
+            self._process = None
+
+    def run(self, script_fname):
+        """
+        Run the Julia script at the given path, starting the process first if
+        necessary.
+
+        :param script_fname: Path to the script to run.
+        :type script_fname: str
+        """
+        with self._lock:
+            if self._process is not None and self._process.poll() is not None:
+                self.stop()
+            if self._process is None:
+                self._start()
+
+            self._tasks += 1
+            try:
+                self._sock.sendall(script_fname.encode('utf8') + b'\n')
+                reply = self._file.readline().decode('utf8').rstrip('\n')
+            except socket.error:
+                reply = ''
+
+            if self.max_tasks and self._tasks >= self.max_tasks:
+                self.stop()
+
+            if not reply:
+                self.stop()
+                raise Exception('Error: julia daemon exited unexpectedly.')
+            if reply != 'ok':
+                raise Exception('Error: julia run failed: ' + reply[len(
+                    'error '):].replace('\\n', '\n'))
@@ -1,29 +1,91 @@
 import os
-import json
-
-from girder_worker.core import utils
+import threading
+
+from girder_worker.core import exchange, json_codec, utils
+from . import daemon
+
+# Readers and writers for girder_worker.core.exchange binary array files
+_EXCHANGE_FUNCTIONS = """
+function _gw_read_array(path)
+    open(path) do io
+        t = read(io, UInt8)
+        n = read(io, Int64)
+        T = t == UInt8('d') ? Float64 : t == UInt8('q') ? Int64 : Bool
+        read!(io, zeros(T, n))
+    end
+end
+
+function _gw_write_array(path, t, T, value)
+    open(path, "w") do io
+        write(io, t)
+        write(io, Int64(length(value)))
+        write(io, T[e for e in value])
+    end
+end
+"""
+
+_JULIA_TYPES = {b'd': 'Float64', b'q': 'Int64'}
+
+_daemon = None
+_daemon_lock = threading.Lock()
+
+
+def _get_daemon():
+    """
+    Returns the Julia daemon for this worker process if daemon mode is enabled
+    in the worker config, otherwise None.
+    """
+    global _daemon
+    from . import _read_from_config
+
+    if str(_read_from_config('daemon', 0)).lower() not in (
+            '1', 'true', 'yes', 'on'):
+        return None
+
+    with _daemon_lock:
+        if _daemon is None:
+            _daemon = daemon.JuliaDaemon(
+                max_tasks=int(_read_from_config('daemon_max_tasks', 0)))
+        return _daemon
 
 
 def _write_julia_script(script, inputs, task_outputs, tmp_dir):
     script_fname = os.path.join(tmp_dir, 'script.julia')
     with open(script_fname, 'w') as script_file:
-        # Send input values to the script
+        script_file.write(_EXCHANGE_FUNCTIONS)
+
+        # Send input values to the script. Lists of numbers are passed as
+        # binary files rather than as literals in the source.
         for name, binding in inputs.iteritems():
-            value = json.dumps(binding['script_data'])
-            script_file.write(name + ' = ' + value + '\n')
+            typecode = exchange.array_type(binding['script_data'])
+            if typecode:
+                fname = os.path.join(tmp_dir, name + '.bin')
+                exchange.write_array(fname, binding['script_data'], typecode)
+                script_file.write('{} = _gw_read_array({})\n'.format(
+                    name, json_codec.dumps(fname)))
+            else:
+                value = json_codec.dumps(binding['script_data'])
+                script_file.write(name + ' = ' + value + '\n')
 
         # Run the script
         script_file.write(script)
 
         # Write output values to temporary files
-        for name in task_outputs:
+        for name, task_output in task_outputs.iteritems():
             if name != '_stderr' and name != '_stdout':
                 fname = os.path.join(tmp_dir, name)
-                script_file.write("""
+                typecode = exchange.LIST_FORMATS.get(task_output.get('format'))
+                if typecode:
+                    script_file.write(
+                        '\n_gw_write_array({}, "{}", {}, {})\n'.format(
+                            json_codec.dumps(fname), typecode.decode(),
+                            _JULIA_TYPES[typecode], name))
+                else:
+                    script_file.write("""
 outfile = open({}, "w")
 write(outfile, "${}")
 close(outfile)
-""".format(json.dumps(fname), name))
+""".format(json_codec.dumps(fname), name))
 
     return script_fname
 
@@ -39,23 +101,35 @@ def run(task, inputs, outputs, task_inputs, task_outputs, **kwargs):
         if id in task_outputs and id in outputs:
             pipes[id] = utils.AccumulateDictAdapter(outputs[id], 'script_data')
 
-    command = ['julia', script_fname]
+    # The daemon shares its stdout and stderr between tasks, so tasks that
+    # capture them as outputs still get a process of their own.
+    julia = None if pipes else _get_daemon()
 
-    print('Running julia: "%s"' % ' '.join(command))
+    if julia is not None:
+        print('Running julia script in daemon: "%s"' % script_fname)
+        julia.run(script_fname)
+    else:
+        command = ['julia', script_fname]
 
-    p = utils.run_process(command, output_pipes=pipes)
+        print('Running julia: "%s"' % ' '.join(command))
 
-    if p.returncode != 0:
-        raise Exception('Error: julia run returned code {}.'.format(
-                        p.returncode))
+        p = utils.run_process(command, output_pipes=pipes)
+
+        if p.returncode != 0:
+            raise Exception('Error: julia run returned code {}.'.format(
+                            p.returncode))
 
     for name, task_output in task_outputs.iteritems():
         if name != '_stderr' and name != '_stdout':
             fname = os.path.join(tmp_dir, name)
+            if task_output.get('format') in exchange.LIST_FORMATS:
+                outputs[name]['script_data'] = exchange.read_array(fname)
+                continue
+
             with open(fname) as output_file:
                 outputs[name]['script_data'] = output_file.read()
 
             # Deal with converting from string - assume JSON
             if task_output['type'] in ('number', 'boolean'):
-                outputs[name]['script_data'] = json.loads(
+                outputs[name]['script_data'] = json_codec.loads(
                     outputs[name]['script_data'])
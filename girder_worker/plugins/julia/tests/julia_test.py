@@ -130,3 +130,69 @@ It was the worst of times
                 'format': 'boolean'
             }
         })
+
+    def testDaemonMode(self):
+        from girder_worker import config
+        from girder_worker.plugins.julia import executor
+
+        task = {
+            'mode': 'julia',
+            'script': 'y = x + 1\n',
+            'inputs': [{'id': 'x', 'format': 'number', 'type': 'number'}],
+            'outputs': [{'id': 'y', 'format': 'number', 'type': 'number'}]
+        }
+        bad_task = dict(task, script='y = undefined_variable\n')
+
+        if not config.has_section('julia'):
+            config.add_section('julia')
+        config.set('julia', 'daemon', 'true')
+        config.set('julia', 'daemon_max_tasks', '3')
+        try:
+            for x in range(5):
+                out = girder_worker.tasks.run(
+                    task, inputs={'x': {'format': 'number', 'data': x}})
+                self.assertEqual(out['y']['data'], x + 1)
+
+            with self.assertRaisesRegexp(Exception, 'undefined_variable'):
+                girder_worker.tasks.run(
+                    bad_task, inputs={'x': {'format': 'number', 'data': 1}})
+
+            # The daemon keeps serving tasks after an error
+            out = girder_worker.tasks.run(
+                task, inputs={'x': {'format': 'number', 'data': 7}})
+            self.assertEqual(out['y']['data'], 8)
+        finally:
+            config.remove_option('julia', 'daemon')
+            config.remove_option('julia', 'daemon_max_tasks')
+            if executor._daemon is not None:
+                executor._daemon.stop()
+                executor._daemon = None
+
+    def testListExchange(self):
+        task = {
+            'mode': 'julia',
+            'script': """
+total = sum(xs)
+doubled = 2 * xs
+counts = [length(xs), length(flags), sum(flags)]
+""",
+            'inputs': [
+                {'id': 'xs', 'format': 'number_list', 'type': 'number_list'},
+                {'id': 'flags', 'format': 'object', 'type': 'python'}
+            ],
+            'outputs': [
+                {'id': 'total', 'format': 'number', 'type': 'number'},
+                {'id': 'doubled', 'format': 'number_list',
+                 'type': 'number_list'},
+                {'id': 'counts', 'format': 'integer_list',
+                 'type': 'integer_list'}
+            ]
+        }
+
+        out = girder_worker.tasks.run(task, inputs={
+            'xs': {'format': 'number_list', 'data': [0.5, 1.5, 3]},
+            'flags': {'format': 'object', 'data': [True, False, True]}
+        })
+        self.assertEqual(out['total']['data'], 5.0)
+        self.assertEqual(out['doubled']['data'], [1.0, 3.0, 6.0])
+        self.assertEqual(out['counts']['data'], [3, 3, 2])
@@ -0,0 +1,118 @@
+"""
+Conversion of trees in the ``phylo`` format of the R package ``ape``. A
+``phylo`` tree is an R list whose elements are found by name, since they are
+not guaranteed to be in any particular order:
+
+* ``tip.label``: the names of the leaves, which are the nodes ``1`` to ``n``.
+* ``Nnode``: the number of internal nodes, numbered from ``n + 1``, where
+  ``n + 1`` is the root.
+* ``edge``: a two-column matrix of the parent and child node of each edge.
+* ``edge.length``: the optional branch length of each edge.
+* ``node.label``: the optional names of the internal nodes.
+
+The edge table is read once, a column at a time, rather than looking nodes up
+by name for every edge, and trees are walked with an explicit stack rather
+than recursion, so that their depth is not limited.
+"""
+import six
+
+from bson.objectid import ObjectId
+from girder_worker.core import bson_codec
+
+
+def _elements(tree):
+    """
+    Returns the elements of a ``phylo`` tree by name, checking that the
+    required ones are present.
+    """
+    elements = dict(six.moves.zip(tree.do_slot('names'), tree))
+    for name in ('tip.label', 'Nnode', 'edge'):
+        if name not in elements:
+            raise Exception('Element %s not found in the ape tree.' % name)
+    return elements
+
+
+def _edges(elements):
+    """
+    Returns the zero-based indices of the parent and child nodes of each edge,
+    and their branch lengths or ``None``.
+    """
+    edge = [int(node) - 1 for node in elements['edge']]
+    count = len(edge) // 2
+    lengths = elements.get('edge.length')
+    if lengths is not None:
+        lengths = [float(length) for length in lengths]
+    return edge[:count], edge[count:], lengths
+
+
+def apetree_to_treestore(tree):
+    """
+    Convert a ``phylo`` tree to the concatenated BSON documents of the
+    ``treestore`` format. The ``ObjectId`` of every node is assigned up front,
+    so that the documents are built in one pass over the edges, and are
+    written in node order followed by the handle document of the tree.
+
+    :param tree: The ``phylo`` tree, as an rpy2 R list.
+    """
+    elements = _elements(tree)
+    tips = list(elements['tip.label'])
+    count = len(tips) + int(elements['Nnode'][0])
+    ids = [ObjectId() for _ in six.moves.range(count + 1)]
+
+    documents = [{'_id': ids[i]} for i in six.moves.range(count)]
+    for document, name in six.moves.zip(documents, tips):
+        document['name'] = name
+    for document in documents[len(tips):]:
+        document['clades'] = []
+
+    parents, children, lengths = _edges(elements)
+    for parent, child in six.moves.zip(parents, children):
+        documents[parent]['clades'].append(ids[child])
+    if lengths is not None:
+        for child, length in six.moves.zip(children, lengths):
+            documents[child]['branch_length'] = length
+
+    # The handle document points to the root, which follows the leaves
+    documents.append({'_id': ids[count], 'rooted': True,
+                      'clades': [ids[len(tips)]]})
+    return b''.join(bson_codec.iter_encode(documents))
+
+
+def apetree_to_nested(tree):
+    """
+    Convert a ``phylo`` tree to the ``nested`` format. Each node has its
+    ``"node name"``, and a ``"node weight"`` that is the sum of the branch
+    lengths from the root, and the edge to each child has the ``"weight"`` of
+    its branch length.
+
+    :param tree: The ``phylo`` tree, as an rpy2 R list.
+    """
+    elements = _elements(tree)
+    tips = list(elements['tip.label'])
+    count = len(tips) + int(elements['Nnode'][0])
+    labels = elements.get('node.label')
+    labels = list(labels) if labels is not None else \
+        [''] * (count - len(tips))
+
+    nodes = [{'node_data': {'node name': name}} for name in tips + labels]
+    for node in nodes[len(tips):]:
+        node['children'] = []
+
+    parents, children, lengths = _edges(elements)
+    for parent, child in six.moves.zip(parents, children):
+        nodes[parent]['children'].append(nodes[child])
+    if lengths is not None:
+        for child, length in six.moves.zip(children, lengths):
+            nodes[child]['edge_data'] = {'weight': length}
+
+    root = nodes[len(tips)]
+    root['node_fields'] = ['node name', 'node weight']
+    root['edge_fields'] = ['weight']
+
+    stack = [(root, 0.0)]
+    while stack:
+        node, weight = stack.pop()
+        weight += node.get('edge_data', {}).get('weight', 0.0)
+        node['node_data']['node weight'] = weight
+        stack.extend((child, weight) for child in node.get('children', ()))
+    return root
@@ -0,0 +1,3 @@
+from girder_worker.plugins.r.dataframe import rows_to_dataframe
+
+output = rows_to_dataframe(input)
@@ -0,0 +1,110 @@
+"""
+Direct conversion between ``table/rows`` and R data frames. Columns are
+built as typed R vectors through rpy2, so tables never go through CSV text on
+their way into or out of R.
+"""
+import rpy2.rinterface
+import rpy2.robjects
+import six
+
+_NA_TYPES = tuple(type(na) for na in (
+    rpy2.rinterface.NA_Logical, rpy2.rinterface.NA_Integer,
+    rpy2.rinterface.NA_Real, rpy2.rinterface.NA_Character))
+
+# R integers are 32 bit, with the smallest value reserved for NA
+_R_INT_MAX = 2 ** 31 - 1
+
+# Mirrors the post-processing of csv_to_r_dataframe.R so that both routes
+# produce the same data frame.
+_MAKE_DATA_FRAME = """
+function (columns, names) {
+    names(columns) <- gsub("^$", "X", names)
+    output <- do.call(data.frame, c(columns, list(check.names = FALSE)))
+    if (ncol(output) > 0 && anyDuplicated(output[,1]) == 0) {
+        row.names(output) <- output[,1]
+    }
+    output
+}
+"""
+
+# Factors become character vectors, so that rows contain their labels
+_COLUMNS = """
+function (df) {
+    lapply(df, function (col) if (is.factor(col)) as.character(col) else col)
+}
+"""
+
+_r_functions = {}
+
+
+def _r_function(code):
+    if code not in _r_functions:
+        _r_functions[code] = rpy2.robjects.r(code)
+    return _r_functions[code]
+
+
+def _is_int(value):
+    return (isinstance(value, six.integer_types) and
+            not isinstance(value, bool) and abs(value) <= _R_INT_MAX)
+
+
+def _vector(values):
+    """
+    Build the narrowest R vector type that can hold all the values of a
+    column. ``None`` values become ``NA``.
+    """
+    present = [v for v in values if v is not None]
+
+    if all(isinstance(v, bool) for v in present):
+        na, cls = rpy2.rinterface.NA_Logical, rpy2.robjects.BoolVector
+    elif all(_is_int(v) for v in present):
+        na, cls = rpy2.rinterface.NA_Integer, rpy2.robjects.IntVector
+    elif all(isinstance(v, (float,) + six.integer_types) for v in present):
+        na, cls = rpy2.rinterface.NA_Real, rpy2.robjects.FloatVector
+    else:
+        na, cls = rpy2.rinterface.NA_Character, rpy2.robjects.StrVector
+        return cls([na if v is None else six.text_type(v) for v in values])
+
+    if len(present) < len(values):
+        values = [na if v is None else v for v in values]
+    return cls(values)
+
+
+def rows_to_dataframe(table):
+    """
+    Convert a ``table/rows`` object to an R data frame.
+
+    :param table: The table, with ``fields`` and ``rows`` keys.
+    :type table: dict
+    :returns: The R data frame.
+    """
+    fields = table['fields']
+    rows = table['rows']
+
+    columns = rpy2.robjects.r['list'](*[
+        _vector([row.get(field) for row in rows]) for field in fields])
+
+    return _r_function(_MAKE_DATA_FRAME)(
+        columns, rpy2.robjects.StrVector(fields))
+
+
+def _python_value(value):
+    return None if isinstance(value, _NA_TYPES) else value
+
+
+def dataframe_to_rows(df):
+    """
+    Convert an R data frame to a ``table/rows`` object. Factor columns are
+    converted to their labels, and ``NA`` values to ``None``.
+
+    :param df: The R data frame.
+    :returns: The table, with ``fields`` and ``rows`` keys.
+    """
+    fields = list(df.colnames)
+    columns = [
+        [_python_value(v) for v in col]
+        for col in _r_function(_COLUMNS)(df)]
+
+    rows = [dict(zip(fields, values)) for values in zip(*columns)]
+
+    return {'fields': fields, 'rows': rows}
@@ -1,29 +1,19 @@
-import rpy2.robjects
+from . import session
 
 
 def run(task, inputs, outputs, task_inputs, task_outputs, **kwargs):
-    env = rpy2.robjects.globalenv
+    if task.get('r_pool', True):
+        r = session.get_session()
+    else:
+        r = session.get_embedded_session()
 
-    # Clear out workspace variables and packages
-    rpy2.robjects.reval("""
-        rm(list = ls())
-        pkgs <- names(sessionInfo()$otherPkgs)
-        if (!is.null(pkgs)) {
-            pkgs <- paste('package:', pkgs, sep = '')
-            lapply(pkgs, detach, character.only = TRUE, unload = TRUE)
-        }
-        """, env)
-
-    env['tempdir'] = kwargs.get('_tempdir')
-
-    for name in inputs:
-        env[str(name)] = inputs[name]['script_data']
-
-    rpy2.robjects.reval(task['script'], env)
+    values = {name: inputs[name]['script_data'] for name in inputs}
+    results = r.run(
+        task['script'], values, list(task_outputs), kwargs.get('_tempdir'))
 
     for name, task_output in task_outputs.iteritems():
         d = outputs[name]
-        d['script_data'] = env[str(name)]
+        d['script_data'] = results[name]
 
         # Hack to detect scalar values from R.
         # The R value might not have a len() so wrap in a try/except.
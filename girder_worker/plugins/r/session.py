@@ -0,0 +1,223 @@
+import multiprocessing
+import re
+import rpy2.robjects
+import six
+import threading
+import traceback
+
+from girder_worker import config
+
+_PACKAGE_RE = re.compile(r'^[A-Za-z][A-Za-z0-9.]*$')
+
+# Detaches (and unloads) every entry on the search path that is not in the
+# given baseline, i.e. any package a task attached on its own.
+_DETACH_EXTRA = """
+function (baseline) {
+    extra <- setdiff(search(), baseline)
+    for (pkg in extra[grepl('^package:', extra)]) {
+        try(detach(pkg, character.only = TRUE, unload = TRUE), silent = TRUE)
+    }
+}
+"""
+
+_session = None
+_embedded = None
+_session_lock = threading.Lock()
+
+
+def _read_from_config(key, default):
+    """
+    Helper to read R specific config values from the worker config files.
+    """
+    if config.has_option('r', key):
+        return config.get('r', key)
+    else:
+        return default
+
+
+def _config_packages():
+    packages = _read_from_config('preload_packages', '').split(',')
+    return [p.strip() for p in packages if p.strip()]
+
+
+class RSession(object):
+    """
+    Runs R scripts in the embedded R interpreter. A configurable set of
+    packages is attached once and kept attached for the life of the worker,
+    so tasks do not pay their load time again. Each task runs in a fresh
+    environment whose parent is the global environment, and any package the
+    task attached itself is detached again when it is done.
+    """
+    def __init__(self, packages=()):
+        """
+        :param packages: Names of the R packages to preload.
+        :type packages: list of str
+        """
+        for pkg in packages:
+            if not _PACKAGE_RE.match(pkg):
+                raise Exception('Invalid R package name: "%s".' % pkg)
+
+        self.packages = list(packages)
+        self._baseline = None
+        self._detach_extra = None
+        # The embedded R interpreter is not threadsafe
+        self._lock = threading.Lock()
+
+    def _start(self):
+        for pkg in self.packages:
+            rpy2.robjects.reval(
+                'suppressPackageStartupMessages(library(%s))' % pkg)
+
+        self._baseline = rpy2.robjects.r('search()')
+        self._detach_extra = rpy2.robjects.r(_DETACH_EXTRA)
+
+    def run(self, script, inputs, output_names, tempdir=None):
+        """
+        Run an R script.
+
+        :param script: The R code to run.
+        :type script: str
+        :param inputs: Dict mapping variable names to the values to bind.
+        :type inputs: dict
+        :param output_names: Names of the variables to return.
+        :type output_names: list of str
+        :param tempdir: The task temp dir, exposed as ``tempdir`` to the script.
+        :returns: Dict mapping the output names to their R values.
+        """
+        with self._lock:
+            if self._baseline is None:
+                self._start()
+
+            env = rpy2.robjects.r['new.env'](parent=rpy2.robjects.globalenv)
+            try:
+                env['tempdir'] = tempdir
+
+                for name, value in six.iteritems(inputs):
+                    env[str(name)] = value
+
+                rpy2.robjects.reval(script, env)
+
+                return {name: env[str(name)] for name in output_names}
+            finally:
+                self._detach_extra(self._baseline)
+
+
+_serialize = None
+_unserialize = None
+
+
+def _marshal(value):
+    """
+    Make a value picklable so that it can be sent to or from an R subprocess.
+    R objects are sent as R's ASCII serialization.
+    """
+    global _serialize
+    if isinstance(value, rpy2.robjects.robject.RObjectMixin):
+        if _serialize is None:
+            _serialize = rpy2.robjects.r(
+                'function (x) rawToChar(serialize(x, NULL, ascii = TRUE))')
+        return ('r', _serialize(value)[0])
+    return ('python', value)
+
+
+def _unmarshal(value):
+    global _unserialize
+    kind, data = value
+    if kind == 'r':
+        if _unserialize is None:
+            _unserialize = rpy2.robjects.r(
+                'function (x) unserialize(charToRaw(x))')
+        return _unserialize(data)
+    return data
+
+
+_subprocess_session = None
+
+
+def _init_subprocess(packages):
+    global _subprocess_session
+    _subprocess_session = RSession(packages)
+    _subprocess_session._start()
+
+
+def _run_in_subprocess(script, inputs, output_names, tempdir):
+    try:
+        inputs = {name: _unmarshal(v) for name, v in six.iteritems(inputs)}
+        outputs = _subprocess_session.run(
+            script, inputs, output_names, tempdir)
+        return {name: _marshal(v) for name, v in six.iteritems(outputs)}
+    except Exception as e:
+        # R errors may not survive pickling, so send back plain text
+        raise Exception('%s\n%s' % (e, traceback.format_exc()))
+
+
+class RProcessPool(object):
+    """
+    Runs R scripts in a pool of subprocesses, each with its own R interpreter
+    and its own copy of the preloaded packages. Since the embedded R is single
+    threaded, this is what allows R tasks to run in parallel within a single
+    worker process. Inputs and outputs that are R objects are passed between
+    processes using R serialization.
+    """
+    def __init__(self, size, packages=(), maxtasksperchild=None):
+        """
+        :param size: Number of R subprocesses.
+        :type size: int
+        :param packages: Names of the R packages to preload in each subprocess.
+        :type packages: list of str
+        :param maxtasksperchild: Recycle each subprocess after this many tasks.
+        :type maxtasksperchild: int or None
+        """
+        self.packages = list(packages)
+        self._pool = multiprocessing.Pool(
+            size, initializer=_init_subprocess, initargs=(self.packages,),
+            maxtasksperchild=maxtasksperchild)
+
+    def run(self, script, inputs, output_names, tempdir=None):
+        """
+        Same as :py:meth:`RSession.run`, but in one of the subprocesses.
+        """
+        inputs = {name: _marshal(v) for name, v in six.iteritems(inputs)}
+        outputs = self._pool.apply(
+            _run_in_subprocess, (script, inputs, output_names, tempdir))
+        return {name: _unmarshal(v) for name, v in six.iteritems(outputs)}
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+
+def get_session():
+    """
+    Returns the R session manager for this worker process, creating it from
+    the ``r`` section of the worker config on first use. If ``pool_size`` is
+    set, this is a :py:class:`RProcessPool`, otherwise a :py:class:`RSession`
+    using the embedded interpreter.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            packages = _config_packages()
+            size = int(_read_from_config('pool_size', 0))
+            if size > 0:
+                recycle = int(_read_from_config('pool_recycle', 0)) or None
+                _session = RProcessPool(size, packages, recycle)
+            else:
+                _session = RSession(packages)
+        return _session
+
+
+def get_embedded_session():
+    """
+    Returns an :py:class:`RSession` for the embedded interpreter, regardless
+    of whether a subprocess pool is configured. This is used for tasks that
+    opt out of the pool, such as converters, whose R object outputs would
+    otherwise have to be serialized back to this process.
+    """
+    global _embedded
+    with _session_lock:
+        if isinstance(_session, RSession):
+            return _session
+        if _embedded is None:
+            _embedded = RSession(_config_packages())
+        return _embedded
@@ -0,0 +1,66 @@
+"""
+Compare converting a large ``table/rows`` object to and from an R data frame
+directly with going through CSV text, which is what happened before the
+direct converters existed.
+
+Run with ``python -m girder_worker.plugins.r.tests.dataframe_benchmark [rows]``
+with the ``r`` plugin enabled.
+"""
+import random
+import sys
+import time
+
+from girder_worker.core import format
+from girder_worker.tasks import convert
+
+
+def _table(n):
+    rng = random.Random(0)
+    return {
+        'fields': ['id', 'count', 'value', 'label'],
+        'rows': [{
+            'id': i,
+            'count': rng.randint(0, 1000),
+            'value': rng.random(),
+            'label': rng.choice(['a', 'b', 'c', 'd'])
+        } for i in range(n)]
+    }
+
+
+def _timed(fn):
+    start = time.time()
+    result = fn()
+    return time.time() - start, result
+
+
+def _via_csv(type, data, source, target):
+    csv = convert(type, {'format': source, 'data': data}, {'format': 'csv'})
+    return convert(type, csv, {'format': target})['data']
+
+
+def main(n):
+    table = _table(n)
+    print('Converting a %d row table' % n)
+
+    # Make sure both routes are compared, regardless of the shortest path
+    assert len(format.converter_path(
+        format.Validator('table', 'rows'),
+        format.Validator('table', 'r.dataframe'))) == 1
+
+    t, df = _timed(lambda: convert(
+        'table', {'format': 'rows', 'data': table},
+        {'format': 'r.dataframe'})['data'])
+    print('rows -> r.dataframe (direct):  %8.3fs' % t)
+    t, _ = _timed(lambda: _via_csv('table', table, 'rows', 'r.dataframe'))
+    print('rows -> r.dataframe (CSV):     %8.3fs' % t)
+
+    t, _ = _timed(lambda: convert(
+        'table', {'format': 'r.dataframe', 'data': df},
+        {'format': 'rows'}))
+    print('r.dataframe -> rows (direct):  %8.3fs' % t)
+    t, _ = _timed(lambda: _via_csv('table', df, 'r.dataframe', 'rows'))
+    print('r.dataframe -> rows (CSV):     %8.3fs' % t)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -1,4 +1,5 @@
-from girder_worker.tasks import run
+from girder_worker.plugins.r import session
+from girder_worker.tasks import convert, run
 import unittest
 
 
@@ -59,5 +60,59 @@ class TestR(unittest.TestCase):
             self.function_in, inputs={'input': outputs['output']})
         self.assertEqual(outputs['output']['data'], 16)
 
+    def test_rows_dataframe(self):
+        rows = {
+            'fields': ['id', 'count', 'value', 'flag', 'label'],
+            'rows': [
+                {'id': 'x', 'count': 1, 'value': 0.5, 'flag': True,
+                 'label': 'a'},
+                {'id': 'y', 'count': None, 'value': 2, 'flag': False,
+                 'label': None}
+            ]
+        }
+        df = convert('table', {'format': 'rows', 'data': rows},
+                     {'format': 'r.dataframe'})['data']
+        self.assertEqual(list(df.rownames), ['x', 'y'])
+        self.assertEqual(list(df.rx2('value')), [0.5, 2.0])
+
+        output = convert('table', {'format': 'r.dataframe', 'data': df},
+                         {'format': 'rows'})['data']
+        self.assertEqual(output['fields'], rows['fields'])
+        self.assertEqual(output['rows'][0], rows['rows'][0])
+        self.assertEqual(output['rows'][1], {
+            'id': 'y', 'count': None, 'value': 2.0, 'flag': False,
+            'label': None})
+
+    def test_session(self):
+        r = session.RSession(['tools'])
+
+        outputs = r.run('x <- 5\noutput <- "package:tools" %in% search()',
+                        {}, ['output'])
+        self.assertTrue(outputs['output'][0])
+
+        # Variables and packages from one task do not leak into the next,
+        # but the preloaded packages stay attached.
+        outputs = r.run(
+            'library(splines)\noutput <- c(exists("x"), '
+            '"package:tools" %in% search())', {}, ['output'])
+        self.assertEqual(list(outputs['output']), [False, True])
+        outputs = r.run('output <- "package:splines" %in% search()',
+                        {}, ['output'])
+        self.assertFalse(outputs['output'][0])
+
+        with self.assertRaises(Exception):
+            session.RSession(['tools); q(); ('])
+
+    def test_process_pool(self):
+        pool = session.RProcessPool(2, ['tools'])
+        try:
+            outputs = pool.run(
+                'output <- list(sum(input), "package:tools" %in% search())',
+                {'input': run(self.array_out)['output']['data']}, ['output'])
+            self.assertEqual(outputs['output'][0][0], 6)
+            self.assertTrue(outputs['output'][1][0])
+        finally:
+            pool.close()
+
 if __name__ == '__main__':
     unittest.main()
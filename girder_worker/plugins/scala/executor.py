@@ -1,17 +1,85 @@
 import os
-import json
-
-from girder_worker.core import utils
-
-
-def _write_scala_script(script, inputs, task_outputs, tmp_dir):
+import threading
+
+from girder_worker.core import exchange, json_codec, utils
+from . import session
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# Readers and writers for girder_worker.core.exchange binary array files
+_EXCHANGE_FUNCTIONS = """
+def _gwOpenArray(path: String) = {
+    val b = java.nio.ByteBuffer.wrap(
+        java.nio.file.Files.readAllBytes(java.nio.file.Paths.get(path)))
+    b.order(java.nio.ByteOrder.LITTLE_ENDIAN)
+    b.get()
+    b
+}
+def _gwWriteArray(path: String, t: Char, size: Int)(
+        fill: java.nio.ByteBuffer => Unit) = {
+    val b = java.nio.ByteBuffer.allocate(9 + size)
+    b.order(java.nio.ByteOrder.LITTLE_ENDIAN)
+    b.put(t.toByte)
+    fill(b)
+    java.nio.file.Files.write(java.nio.file.Paths.get(path), b.array())
+}
+"""
+
+_READ_ARRAY = {
+    b'd': ('{ val b = _gwOpenArray(%s); val a = new Array[Double]('
+           'b.getLong().toInt); b.asDoubleBuffer().get(a); a }'),
+    b'q': ('{ val b = _gwOpenArray(%s); val a = new Array[Long]('
+           'b.getLong().toInt); b.asLongBuffer().get(a); a }'),
+    b'?': ('{ val b = _gwOpenArray(%s); '
+           'Array.fill(b.getLong().toInt)(b.get() != 0) }')
+}
+
+_WRITE_ARRAY = {
+    b'd': ('{ val v = %s.toArray.map(_.toDouble); _gwWriteArray(%s, \'d\', '
+           '8 * v.length) { b => b.putLong(v.length); '
+           'b.asDoubleBuffer().put(v) } }'),
+    b'q': ('{ val v = %s.toArray.map(_.toLong); _gwWriteArray(%s, \'q\', '
+           '8 * v.length) { b => b.putLong(v.length); '
+           'b.asLongBuffer().put(v) } }')
+}
+
+
+def _get_session(spark):
+    """
+    Returns the scala or spark-shell session for this worker process if
+    session mode is enabled in the worker config, otherwise None.
+    """
+    from . import _read_from_config
+
+    if str(_read_from_config('session', 0)).lower() not in (
+            '1', 'true', 'yes', 'on'):
+        return None
+
+    with _sessions_lock:
+        if spark not in _sessions:
+            _sessions[spark] = session.ScalaSession(
+                ['spark-shell'] if spark else ['scala'],
+                max_tasks=int(_read_from_config('session_max_tasks', 0)))
+        return _sessions[spark]
+
+
+def _write_scala_script(script, inputs, task_outputs, tmp_dir, token=None):
     script_fname = os.path.join(tmp_dir, 'script.scala')
     with open(script_fname, 'w') as script_file:
         script_file.write('{\n')
+        script_file.write(_EXCHANGE_FUNCTIONS)
 
-        # Send input values to the script
+        # Send input values to the script. Lists of numbers are passed as
+        # binary files rather than as literals in the source.
         for name, binding in inputs.iteritems():
-            value = json.dumps(binding['script_data'])
+            typecode = exchange.array_type(binding['script_data'])
+            if typecode:
+                fname = os.path.join(tmp_dir, name + '.bin')
+                exchange.write_array(fname, binding['script_data'], typecode)
+                value = _READ_ARRAY[typecode] % json_codec.dumps(fname)
+            else:
+                value = json_codec.dumps(binding['script_data'])
             script_file.write('val ' + name + ' = ' + value + '\n')
 
         # Run the script
@@ -19,18 +87,29 @@ def _write_scala_script(script, inputs, task_outputs, tmp_dir):
 
         # Write output values to temporary files
         script_file.write('\nimport java.io._\n')
-        for name in task_outputs:
+        for name, task_output in task_outputs.iteritems():
             if name != '_stderr' and name != '_stdout':
                 fname = os.path.join(tmp_dir, name)
+                typecode = exchange.LIST_FORMATS.get(task_output.get('format'))
+                if typecode:
+                    script_file.write('\n' + _WRITE_ARRAY[typecode] % (
+                        name, json_codec.dumps(fname)) + '\n')
+                    continue
+
                 script_file.write("""
 new PrintWriter({}) {{
     write({}); close
 }}
-""".format(json.dumps(fname), name + '.toString()'))
+""".format(json_codec.dumps(fname), name + '.toString()'))
 
-        # Exit the interactive shell
-        script_file.write('}\n')
-        script_file.write('System.exit(0)\n')
+        if token:
+            # Signal success to the session, which keeps running
+            script_file.write(session.ScalaSession.sentinel(token, 'ok'))
+            script_file.write('\n}\n')
+        else:
+            # Exit the interactive shell
+            script_file.write('}\n')
+            script_file.write('System.exit(0)\n')
 
     return script_fname
 
@@ -38,36 +117,52 @@ new PrintWriter({}) {{
 def _run(spark, task, inputs, outputs, task_inputs, task_outputs, **kwargs):
     tmp_dir = kwargs.get('_tempdir')
 
-    script_fname = _write_scala_script(
-        task['script'], inputs, task_outputs, tmp_dir)
-
     pipes = {}
     for id in ('_stdout', '_stderr'):
         if id in task_outputs and id in outputs:
             pipes[id] = utils.AccumulateDictAdapter(outputs[id], 'script_data')
 
-    if spark:
-        command = ['spark-shell', '-i', script_fname]
+    # The session's output also contains the REPL's own messages, so tasks
+    # that capture stdout or stderr as outputs still get a process of their own.
+    repl = None if pipes else _get_session(spark)
+
+    if repl is not None:
+        token = session.new_token()
+        script_fname = _write_scala_script(
+            task['script'], inputs, task_outputs, tmp_dir, token)
+
+        print('Running scala script in session: "%s"' % script_fname)
+        repl.run(script_fname, token)
     else:
-        command = ['scala', script_fname]
+        script_fname = _write_scala_script(
+            task['script'], inputs, task_outputs, tmp_dir)
 
-    print('Running scala: "%s"' % ' '.join(command))
+        if spark:
+            command = ['spark-shell', '-i', script_fname]
+        else:
+            command = ['scala', script_fname]
 
-    p = utils.run_process(command, output_pipes=pipes)
+        print('Running scala: "%s"' % ' '.join(command))
 
-    if p.returncode != 0:
-        raise Exception('Error: scala run returned code {}.'.format(
-                        p.returncode))
+        p = utils.run_process(command, output_pipes=pipes)
+
+        if p.returncode != 0:
+            raise Exception('Error: scala run returned code {}.'.format(
+                            p.returncode))
 
     for name, task_output in task_outputs.iteritems():
         if name != '_stderr' and name != '_stdout':
             fname = os.path.join(tmp_dir, name)
+            if task_output.get('format') in exchange.LIST_FORMATS:
+                outputs[name]['script_data'] = exchange.read_array(fname)
+                continue
+
             with open(fname) as output_file:
                 outputs[name]['script_data'] = output_file.read()
 
             # Deal with converting from string - assume JSON
             if task_output['type'] in ('number', 'boolean'):
-                outputs[name]['script_data'] = json.loads(
+                outputs[name]['script_data'] = json_codec.loads(
                     outputs[name]['script_data'])
 
 
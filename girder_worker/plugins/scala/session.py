@@ -0,0 +1,106 @@
+import subprocess
+import sys
+import threading
+import uuid
+
+
+class ScalaSession(object):
+    """
+    A long-lived Scala REPL, either ``scala`` or ``spark-shell``, that task
+    scripts are loaded into with ``:load``. This way tasks do not each pay for
+    JVM startup and compiler warm-up, and in the Spark case for starting a new
+    Spark application. Scripts are isolated from each other by wrapping them
+    in a block. The REPL is restarted after ``max_tasks`` tasks, or if it dies.
+    """
+    def __init__(self, command, max_tasks=0):
+        """
+        :param command: The command that starts the REPL.
+        :type command: list of str
+        :param max_tasks: Restart the REPL after it has run this many tasks.
+            Zero means never.
+        :type max_tasks: int
+        """
+        self.command = command
+        self.max_tasks = max_tasks
+        self._process = None
+        self._tasks = 0
+        self._lock = threading.Lock()
+
+    def _start(self):
+        print('Starting scala session: "%s"' % ' '.join(self.command))
+        self._process = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT)
+        self._tasks = 0
+
+    def stop(self):
+        """
+        Stop the REPL, if it is running.
+        """
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.stdin.close()
+                self._process.terminate()
+            self._process.wait()
+            self._process = None
+
+    @staticmethod
+    def sentinel(token, status):
+        """
+        Returns Scala code that prints the line that marks ``status`` for the
+        task identified by ``token``. The line is assembled at runtime so that
+        the REPL echoing the code back does not look like the line itself.
+        """
+        return 'println("%s" + " %s")' % (token, status)
+
+    def run(self, script_fname, token):
+        """
+        Load the Scala script at the given path into the REPL, starting it
+        first if necessary. The script must end by printing
+        ``sentinel(token, 'ok')``, which is how its success is detected.
+
+        :param script_fname: Path to the script to run.
+        :type script_fname: str
+        :param token: Unique identifier of this task.
+        :type token: str
+        """
+        with self._lock:
+            if self._process is not None and self._process.poll() is not None:
+                self.stop()
+            if self._process is None:
+                self._start()
+
+            self._tasks += 1
+            ok, end = token + ' ok', token + ' end'
+            succeeded = False
+            lines = []
+            try:
+                self._process.stdin.write(':load %s\n%s\n' % (
+                    script_fname, self.sentinel(token, 'end')))
+                self._process.stdin.flush()
+
+                for line in iter(self._process.stdout.readline, ''):
+                    if end in line:
+                        break
+                    if ok in line:
+                        succeeded = True
+                    else:
+                        sys.stdout.write(line)
+                        lines.append(line)
+                else:
+                    self.stop()
+                    raise Exception('Error: scala session exited '
+                                    'unexpectedly.')
+            except IOError:
+                self.stop()
+                raise Exception('Error: scala session exited unexpectedly.')
+            finally:
+                if self.max_tasks and self._tasks >= self.max_tasks:
+                    self.stop()
+
+            if not succeeded:
+                raise Exception('Error: scala run failed:\n' + ''.join(lines))
+
+
+def new_token():
+    return 'girder_worker_' + uuid.uuid4().hex
@@ -124,6 +124,35 @@ for (line <- bufferedSource.getLines) {
             }
         })
 
+    def testListExchange(self):
+        task = {
+            'mode': 'scala',
+            'script': """
+val total = xs.sum
+val doubled = xs.map(_ * 2)
+val counts = Array(xs.length, flags.length, flags.count(f => f))
+""",
+            'inputs': [
+                {'id': 'xs', 'format': 'number_list', 'type': 'number_list'},
+                {'id': 'flags', 'format': 'object', 'type': 'python'}
+            ],
+            'outputs': [
+                {'id': 'total', 'format': 'number', 'type': 'number'},
+                {'id': 'doubled', 'format': 'number_list',
+                 'type': 'number_list'},
+                {'id': 'counts', 'format': 'integer_list',
+                 'type': 'integer_list'}
+            ]
+        }
+
+        out = run(task, inputs={
+            'xs': {'format': 'number_list', 'data': [0.5, 1.5, 3]},
+            'flags': {'format': 'object', 'data': [True, False, True]}
+        })
+        self.assertEqual(out['total']['data'], 5.0)
+        self.assertEqual(out['doubled']['data'], [1.0, 3.0, 6.0])
+        self.assertEqual(out['counts']['data'], [3, 3, 2])
+
     def testSparkScalaMode(self):
         task = {
             'mode': 'spark.scala',
@@ -277,3 +306,37 @@ println("Within Set Sum of Squared Errors = " + WSSSE)""",
 
         out = run(task, inputs=inputs)
         self.assertTrue(out['WSSSE']['data'] < 20)
+
+    def testSessionMode(self):
+        from girder_worker import config
+        from girder_worker.plugins.scala import executor
+
+        task = {
+            'mode': 'scala',
+            'script': 'val y = x + 1\n',
+            'inputs': [{'id': 'x', 'format': 'number', 'type': 'number'}],
+            'outputs': [{'id': 'y', 'format': 'number', 'type': 'number'}]
+        }
+
+        if not config.has_section('scala'):
+            config.add_section('scala')
+        config.set('scala', 'session', 'true')
+        config.set('scala', 'session_max_tasks', '3')
+        try:
+            for x in range(5):
+                out = run(task, inputs={'x': {'format': 'number', 'data': x}})
+                self.assertEqual(out['y']['data'], x + 1)
+
+            with self.assertRaisesRegexp(Exception, 'scala run failed'):
+                run(dict(task, script='val y = undefined_value\n'),
+                    inputs={'x': {'format': 'number', 'data': 1}})
+
+            # The session keeps serving tasks after an error
+            out = run(task, inputs={'x': {'format': 'number', 'data': 7}})
+            self.assertEqual(out['y']['data'], 8)
+        finally:
+            config.remove_option('scala', 'session')
+            config.remove_option('scala', 'session_max_tasks')
+            for repl in executor._sessions.values():
+                repl.stop()
+            executor._sessions.clear()
@@ -12,13 +12,21 @@ def setup_pyspark_task(event):
     info = event.info
     if info['mode'] == 'spark.python' and SC_KEY not in info['kwargs']:
         spark_conf = info['task'].get('spark_conf', {})
-        info['kwargs'][SC_KEY] = spark.create_spark_context(spark_conf)
-        info['cleanup_spark'] = True
+        if spark.reuse_context():
+            sc = spark.get_spark_context(spark_conf)
+            info['kwargs'][SC_KEY] = sc
+            info['spark_task'] = spark.begin_task(sc)
+        else:
+            info['kwargs'][SC_KEY] = spark.create_spark_context(spark_conf)
+            info['cleanup_spark'] = True
 
 
 def pyspark_run_cleanup(event):
+    from . import spark
     if event.info.get('cleanup_spark'):
         event.info['kwargs'][SC_KEY].stop()
+    elif 'spark_task' in event.info:
+        spark.end_task(event.info['kwargs'][SC_KEY], event.info['spark_task'])
 
 
 def load(params):
@@ -0,0 +1,6 @@
+# flake8: noqa
+import json
+
+# Only splitting the lines happens on the driver, parsing is distributed
+output = sc.parallelize(input.splitlines()).filter(
+    lambda line: line.strip()).map(json.loads)
@@ -0,0 +1,10 @@
+# flake8: noqa
+from pyspark.sql import SQLContext
+
+# SQLContext.getOrCreate reuses the context of the shared SparkContext, but
+# is only available from Spark 1.6
+sql_context = getattr(SQLContext, 'getOrCreate', SQLContext)(sc)
+
+fields = input['fields']
+output = sql_context.createDataFrame(
+    [[row.get(field) for field in fields] for row in input['rows']], fields)
@@ -0,0 +1,4 @@
+output = {
+    'fields': input.columns,
+    'rows': [row.asDict() for row in input.collect()]
+}
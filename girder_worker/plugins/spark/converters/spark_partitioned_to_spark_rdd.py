@@ -0,0 +1,4 @@
+# flake8: noqa
+from girder_worker.plugins.spark import files
+
+output = files.read_rdd(sc, input)
@@ -1,4 +1,5 @@
 import json
 
 
-output = json.dumps(input.collect())
+# Serialize the elements on the executors, only join them on the driver
+output = '[' + ', '.join(input.map(json.dumps).collect()) + ']'
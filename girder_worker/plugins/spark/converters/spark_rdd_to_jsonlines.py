@@ -0,0 +1,4 @@
+import json
+
+
+output = '\n'.join(input.map(json.dumps).collect())
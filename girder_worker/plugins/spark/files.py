@@ -0,0 +1,95 @@
+"""
+Collections stored as a directory of partitioned JSON lines files, so that
+Spark can write and read them in parallel without the data ever passing
+through the driver. The directory contains one ``part-*`` file per partition,
+as written by ``RDD.saveAsTextFile``, and a ``_manifest.json`` describing them.
+
+Collections in the ``jsonlines.path`` format are JSON lines files that already
+exist, given by a path, glob or URI that ``SparkContext.textFile`` accepts,
+such as a directory, ``/data/*.jsonl`` or an ``hdfs://`` URI.
+"""
+import girder_worker
+import json
+import os
+import tempfile
+
+from ConfigParser import NoOptionError, NoSectionError
+
+MANIFEST = '_manifest.json'
+
+
+def is_partitioned(path):
+    """
+    Whether ``path`` is a directory of partitioned files with a manifest.
+    """
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def output_path():
+    """
+    Returns a new path to write partitioned files to, in a directory created
+    for it under the ``output_dir`` option of the spark config section, or
+    else the system's temporary directory. Unlike the temporary directory of
+    a task, it is not deleted when the task returns, so the caller owns the
+    parent directory of the path and must remove it once done.
+    """
+    try:
+        parent = girder_worker.config.get('spark', 'output_dir')
+    except (NoOptionError, NoSectionError):
+        parent = None
+
+    if parent and not os.path.isdir(parent):
+        os.makedirs(parent)
+
+    return os.path.join(
+        tempfile.mkdtemp(prefix='girder_worker_spark_', dir=parent or None),
+        'rdd')
+
+
+def write_rdd(rdd, path):
+    """
+    Write each element of an RDD as a JSON line into the directory ``path``,
+    which must not exist yet.
+
+    :returns: ``path``
+    """
+    rdd.map(json.dumps).saveAsTextFile(path)
+
+    partitions = sorted(
+        f for f in os.listdir(path) if f.startswith('part-'))
+    with open(os.path.join(path, MANIFEST), 'w') as f:
+        json.dump({'format': 'jsonlines', 'partitions': partitions}, f)
+
+    return path
+
+
+def read_rdd(sc, path):
+    """
+    Read a directory written by :py:func:`write_rdd` into an RDD with one
+    partition per file.
+    """
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != 'jsonlines':
+        raise Exception('Unsupported partitioned format: %s' % manifest.get(
+            'format'))
+
+    files = [os.path.join(path, p) for p in manifest['partitions']]
+    if not files:
+        return sc.emptyRDD()
+
+    return read_jsonlines(sc, ','.join(files))
+
+
+def read_jsonlines(sc, path):
+    """
+    Read JSON lines files into an RDD with ``sc.textFile``, so that the lines
+    are read and parsed on the executors rather than the driver. Blank lines
+    are skipped.
+
+    :param path: The path, glob or URI of the files, or a comma separated
+        list of them.
+    """
+    return sc.textFile(path).filter(lambda line: line.strip()).map(
+        json.loads)
@@ -1,9 +1,24 @@
+import atexit
 import girder_worker
 import os
 import sys
+import threading
+import uuid
 
 from ConfigParser import NoOptionError, NoSectionError
 
+# Options in the spark config section that configure the worker rather than
+# Spark itself
+WORKER_OPTIONS = ('spark_home', 'reuse_context', 'output_dir')
+
+_context = None
+_context_conf = None
+_context_lock = threading.Lock()
+
+# Whether SparkContext.isStopped can be called, which is not the case in older
+# Spark versions
+_check_is_stopped = True
+
 
 def setup_spark_env():
     # Setup pyspark
@@ -35,20 +50,175 @@ def setup_spark_env():
     from pyspark import SparkConf, SparkContext  # noqa
 
 
+def _effective_conf(task_spark_conf):
+    """
+    Returns the Spark configuration for a task as a sorted tuple of
+    ``(name, value)`` pairs: the spark config section of the worker, overridden
+    by the task's ``spark_conf``.
+    """
+    conf = {}
+
+    if girder_worker.config.has_section('spark'):
+        for (name, value) in girder_worker.config.items('spark'):
+            if name not in WORKER_OPTIONS:
+                conf[name] = value
+
+    conf.update(task_spark_conf)
+
+    return tuple(sorted(conf.items()))
+
+
 def create_spark_context(task_spark_conf):
     from pyspark import SparkConf, SparkContext
     # Set can spark configuration parameter user has specified
     spark_conf = SparkConf()
 
-    if girder_worker.config.has_section('spark'):
-        for (name, value) in girder_worker.config.items('spark'):
-            spark_conf.set(name, value)
-
-    # Override with any task specific configuration
-    for (name, value) in task_spark_conf.items():
+    # Set the worker configuration, overridden by any task specific one
+    for (name, value) in _effective_conf(task_spark_conf):
         spark_conf.set(name, value)
 
     # Build up the context, using the master URL
     sc = SparkContext(conf=spark_conf)
 
     return sc
+
+
+def reuse_context():
+    """
+    Whether spark.python tasks share a long-lived SparkContext, which is the
+    case unless ``reuse_context`` is disabled in the spark config section.
+    """
+    try:
+        value = girder_worker.config.get('spark', 'reuse_context')
+    except (NoOptionError, NoSectionError):
+        return True
+    return str(value).lower() not in ('0', 'false', 'no', 'off')
+
+
+def _is_stopped(sc):
+    """
+    Whether a SparkContext has been stopped, or its JVM is gone. Python's
+    ``SparkContext.stop`` clears ``_jsc``, and ``isStopped`` catches a context
+    stopped on the JVM side, e.g. after a failure. Spark versions that do not
+    have ``isStopped`` fall back on the ``_jsc`` check alone.
+    """
+    global _check_is_stopped
+    from py4j.protocol import Py4JError, Py4JNetworkError
+
+    if sc._jsc is None:
+        return True
+    if not _check_is_stopped:
+        return False
+    try:
+        return sc._jsc.sc().isStopped()
+    except Py4JNetworkError:
+        # The gateway to the JVM is dead
+        return True
+    except Py4JError as e:
+        print('SparkContext.isStopped is not available, only contexts '
+              'stopped from Python will be detected: %s' % e)
+        _check_is_stopped = False
+        return False
+
+
+def stop_spark_context():
+    """
+    Stop the shared SparkContext, if there is one.
+    """
+    global _context, _context_conf
+
+    with _context_lock:
+        if _context is not None:
+            try:
+                _context.stop()
+            finally:
+                _context = _context_conf = None
+
+atexit.register(stop_spark_context)
+
+
+def get_spark_context(task_spark_conf):
+    """
+    Returns the SparkContext shared by the tasks run in this worker process.
+    PySpark only allows one active context per process, so the context is
+    restarted whenever a task's effective configuration differs from the one
+    it was created with, or when it has been stopped (e.g. by a failure).
+    """
+    global _context, _context_conf
+
+    conf = _effective_conf(task_spark_conf)
+
+    with _context_lock:
+        if _context is not None and (
+                conf != _context_conf or _is_stopped(_context)):
+            try:
+                _context.stop()
+            except Exception:
+                pass
+            _context = _context_conf = None
+
+        if _context is None:
+            _context = create_spark_context(task_spark_conf)
+            _context_conf = conf
+
+        return _context
+
+
+def _temp_views(sc):
+    """
+    Returns the names of the temporary views of the active SparkSession, or
+    None if Spark SQL is not in use.
+    """
+    try:
+        from pyspark.sql import SparkSession
+    except ImportError:
+        return None
+
+    session = SparkSession._instantiatedSession
+    if session is None or session.sparkContext is not sc:
+        return None
+    return {t.name for t in session.catalog.listTables() if t.isTemporary}
+
+
+def begin_task(sc):
+    """
+    Prepare the shared context for running a task. The task's jobs are put in
+    a job group of their own, and the cached RDDs and temporary views that
+    exist before the task are recorded so that the ones it leaves behind can
+    be released by :py:func:`end_task`.
+
+    :returns: The state to pass to :py:func:`end_task`.
+    """
+    group = 'girder_worker-' + uuid.uuid4().hex
+    sc.setJobGroup(group, 'girder_worker task', True)
+
+    return {
+        'group': group,
+        'rdds': set(sc._jsc.getPersistentRDDs().keys()),
+        'views': _temp_views(sc)
+    }
+
+
+def end_task(sc, state):
+    """
+    Release what a task left behind in the shared context: cancel any of its
+    jobs that are still running, unpersist the RDDs it cached, and drop the
+    temporary views it created.
+    """
+    if _is_stopped(sc):
+        return
+
+    sc.cancelJobGroup(state['group'])
+    sc._jsc.clearJobGroup()
+
+    rdds = sc._jsc.getPersistentRDDs()
+    for id in rdds.keys():
+        if id not in state['rdds']:
+            rdds[id].unpersist(False)
+
+    views = _temp_views(sc)
+    if views:
+        from pyspark.sql import SparkSession
+        catalog = SparkSession._instantiatedSession.catalog
+        for name in views - (state['views'] or set()):
+            catalog.dropTempView(name)
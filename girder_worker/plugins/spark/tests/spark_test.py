@@ -1,6 +1,9 @@
 from girder_worker.tasks import run
+import json
 import unittest
 import os
+import shutil
+import tempfile
 
 
 class TestSpark(unittest.TestCase):
@@ -76,5 +79,131 @@ class TestSpark(unittest.TestCase):
         }
         self.assertEqual(outputs, expected)
 
+    def testPartitionedFiles(self):
+        analysis = {
+            'name': 'partitions',
+            'inputs': [
+                {'name': 'a', 'type': 'collection', 'format': 'spark.rdd'}
+            ],
+            'outputs': [
+                {'name': 'b', 'type': 'collection', 'format': 'spark.rdd'}
+            ],
+            'mode': 'spark.python',
+            'script': 'b = a.repartition(3).map(lambda x: {"x": x * x})',
+            'spark_conf': {
+                'spark.app.name': 'test_partitioned',
+                'spark.master': os.environ['SPARK_TEST_MASTER_URL']
+            }
+        }
+
+        outputs = run(analysis,
+                      {'a': {'format': 'jsonlines', 'data': '1\n2\n\n3\n'}},
+                      {'b': {'format': 'spark.partitioned'}})
+        path = outputs['b']['data']
+        try:
+            # The files outlive the task's temporary directory
+            with open(os.path.join(path, '_manifest.json')) as f:
+                manifest = json.load(f)
+            self.assertEqual(manifest['format'], 'jsonlines')
+            self.assertEqual(len(manifest['partitions']), 3)
+
+            outputs = run(dict(analysis, script='b = a'),
+                          {'a': {'format': 'spark.partitioned', 'data': path}},
+                          {'b': {'format': 'jsonlines'}})
+            self.assertEqual(
+                sorted(json.loads(l)['x'] for l in
+                       outputs['b']['data'].split('\n')),
+                [1, 4, 9])
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+
+    def testJsonlinesPath(self):
+        analysis = {
+            'name': 'jsonlines_path',
+            'inputs': [
+                {'name': 'a', 'type': 'collection', 'format': 'spark.rdd'}
+            ],
+            'outputs': [
+                {'name': 'b', 'type': 'number', 'format': 'number'}
+            ],
+            'mode': 'spark.python',
+            'script': 'b = a.map(lambda x: x["x"]).sum()',
+            'spark_conf': {
+                'spark.app.name': 'test_jsonlines_path',
+                'spark.master': os.environ['SPARK_TEST_MASTER_URL']
+            }
+        }
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for i, data in enumerate(('{"x": 1}\n{"x": 2}\n', '\n{"x": 3}')):
+                with open(os.path.join(tmpdir, '%d.jsonl' % i), 'w') as f:
+                    f.write(data)
+
+            outputs = run(analysis, {'a': {
+                'format': 'jsonlines.path',
+                'data': os.path.join(tmpdir, '*.jsonl')
+            }})
+            self.assertEqual(outputs['b']['data'], 6)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def testSparkDataFrame(self):
+        analysis = {
+            'name': 'dataframe',
+            'inputs': [
+                {'name': 'a', 'type': 'table', 'format': 'spark.dataframe'}
+            ],
+            'outputs': [
+                {'name': 'b', 'type': 'table', 'format': 'spark.dataframe'}
+            ],
+            'mode': 'spark.python',
+            'script': 'b = a.filter(a.x > 1).select("y", "x")',
+            'spark_conf': {
+                'spark.app.name': 'test_dataframe',
+                'spark.master': os.environ['SPARK_TEST_MASTER_URL']
+            }
+        }
+
+        outputs = run(analysis, {
+            'a': {'format': 'rows', 'data': {
+                'fields': ['x', 'y'],
+                'rows': [{'x': 1, 'y': 'a'}, {'x': 2, 'y': 'b'}]
+            }}
+        }, {'b': {'format': 'rows'}})
+        self.assertEqual(outputs['b']['data'], {
+            'fields': ['y', 'x'], 'rows': [{'x': 2, 'y': 'b'}]})
+
+    def testSharedContext(self):
+        analysis = {
+            'name': 'context',
+            'inputs': [],
+            'outputs': [
+                {'name': 'app', 'type': 'string', 'format': 'text'},
+                {'name': 'cached', 'type': 'number', 'format': 'number'}
+            ],
+            'mode': 'spark.python',
+            'script': (
+                'app = sc.applicationId\n'
+                'cached = len(sc._jsc.getPersistentRDDs())\n'
+                'sc.parallelize(range(10)).cache().count()\n'),
+            'spark_conf': {
+                'spark.app.name': 'test_shared',
+                'spark.master': os.environ['SPARK_TEST_MASTER_URL']
+            }
+        }
+
+        first = run(analysis)
+        second = run(analysis)
+
+        # The context is kept, but the RDD cached by the first task is not
+        self.assertEqual(first['app']['data'], second['app']['data'])
+        self.assertEqual(second['cached']['data'], 0)
+
+        # A different configuration gets a new context
+        analysis['spark_conf']['spark.app.name'] = 'test_shared_other'
+        third = run(analysis)
+        self.assertNotEqual(first['app']['data'], third['app']['data'])
+
     def tearDown(self):
         os.chdir(self.prevdir)
@@ -1,43 +1,46 @@
 import os
 
 
+def _variant_to_value(variant_value):
+    if variant_value.IsInt():
+        return variant_value.ToInt()
+    elif variant_value.IsLong():
+        return variant_value.ToLong()
+    elif variant_value.IsDouble() or variant_value.IsFloat():
+        return variant_value.ToDouble()
+    else:
+        return variant_value.ToString()
+
+
 def vtkrow_to_dict(attributes, i):
     row = {}
     for c in range(attributes.GetNumberOfArrays()):
         arr = attributes.GetAbstractArray(c)
-        values = []
         comp = arr.GetNumberOfComponents()
-        for c in range(comp):
-            variant_value = arr.GetVariantValue(i*comp + c)
-            if variant_value.IsInt():
-                value = variant_value.ToInt()
-            elif variant_value.IsLong():
-                value = variant_value.ToLong()
-            elif variant_value.IsDouble() or variant_value.IsFloat():
-                value = variant_value.ToDouble()
-            else:
-                value = variant_value.ToString()
-            values.append(value)
+        values = [_variant_to_value(arr.GetVariantValue(i*comp + k))
+                  for k in range(comp)]
         row[arr.GetName()] = values[0] if len(values) == 1 else values
     return row
 
 
-def dict_to_vtkarrays(row, fields, attributes):
+def _vtk_array_class(value):
     import vtk
+    if isinstance(value, (int, long, float)):
+        return vtk.vtkDoubleArray
+    elif isinstance(value, unicode):
+        return vtk.vtkUnicodeStringArray
+    else:
+        return vtk.vtkStringArray
+
+
+def dict_to_vtkarrays(row, fields, attributes):
     for key in fields:
         value = row[key]
         comp = 1
         if isinstance(value, list):
             comp = len(value)
             value = value[0]
-        if isinstance(value, (int, long, float)):
-            arr = vtk.vtkDoubleArray()
-        elif isinstance(value, str):
-            arr = vtk.vtkStringArray()
-        elif isinstance(value, unicode):
-            arr = vtk.vtkUnicodeStringArray()
-        else:
-            arr = vtk.vtkStringArray()
+        arr = _vtk_array_class(value)()
         arr.SetName(key)
         arr.SetNumberOfComponents(comp)
         attributes.AddArray(arr)
@@ -48,19 +51,238 @@ def dict_to_vtkrow(row, attributes):
         value = row[key]
         if not isinstance(value, (list, int, long, float, str, unicode)):
             value = str(value)
-        found = False
-        for i in range(attributes.GetNumberOfArrays()):
-            arr = attributes.GetAbstractArray(i)
-            if arr.GetName() == key:
-                if isinstance(value, list):
-                    for v in value:
-                        arr.InsertNextValue(v)
-                else:
-                    arr.InsertNextValue(value)
-                found = True
-                break
-        if not found:
+        arr = attributes.GetAbstractArray(key)
+        if arr is None:
             raise Exception('[dict_to_vtkrow] Unexpected key: ' + key)
+        if isinstance(value, list):
+            for v in value:
+                arr.InsertNextValue(v)
+        else:
+            arr.InsertNextValue(value)
+
+
+def values_to_vtkarray(name, values):
+    """
+    Create the VTK array of a column from the list of its values, of the type
+    that :py:func:`dict_to_vtkarrays` chooses for the first value. Numbers are
+    copied into a ``vtkDoubleArray`` at once from a NumPy array, and strings
+    are set in a single pass over the values.
+    """
+    import numpy
+    import vtk
+    from vtk.util import numpy_support
+
+    first = values[0]
+    comp = 1
+    if isinstance(first, list):
+        comp = len(first)
+        first = first[0]
+    cls = _vtk_array_class(first)
+
+    if cls is vtk.vtkDoubleArray:
+        data = numpy.array(values, dtype=numpy.float64)
+        arr = numpy_support.numpy_to_vtk(
+            data, deep=True, array_type=vtk.VTK_DOUBLE)
+    else:
+        arr = cls()
+        arr.SetNumberOfComponents(comp)
+        arr.SetNumberOfTuples(len(values))
+        i = 0
+        for value in values:
+            for v in (value if isinstance(value, list) else (value,)):
+                if not isinstance(v, (str, unicode)):
+                    v = str(v)
+                arr.SetValue(i, v)
+                i += 1
+    arr.SetName(name)
+    return arr
+
+
+# Data types of the arrays that vtkarray_to_values reads through NumPy
+_NUMPY_TYPES = ('VTK_INT', 'VTK_LONG', 'VTK_LONG_LONG', 'VTK_ID_TYPE',
+                'VTK_FLOAT', 'VTK_DOUBLE')
+
+
+def vtkarray_to_values(arr):
+    """
+    Returns the list of values of a VTK array, as :py:func:`vtkrow_to_dict`
+    reads them for each row. Integer and floating point arrays are copied at
+    once into a NumPy array, and other arrays are read in a single pass.
+    """
+    import vtk
+    from vtk.util import numpy_support
+
+    comp = arr.GetNumberOfComponents()
+    if isinstance(arr, vtk.vtkDataArray) and arr.GetDataType() in [
+            getattr(vtk, t) for t in _NUMPY_TYPES]:
+        # Multiple components give a two-dimensional array, so a list of
+        # lists like vtkrow_to_dict
+        return numpy_support.vtk_to_numpy(arr).tolist()
+
+    if isinstance(arr, vtk.vtkStringArray):
+        values = [arr.GetValue(i) for i in range(arr.GetNumberOfValues())]
+    else:
+        values = [_variant_to_value(arr.GetVariantValue(i))
+                  for i in range(arr.GetNumberOfTuples() * comp)]
+    if comp == 1:
+        return values
+    return [values[i:i + comp] for i in range(0, len(values), comp)]
+
+
+def parent_index_to_vtktree(tree):
+    """
+    Build a ``vtkTree`` from a tree in the ``tree/parent_index`` format, with
+    vertex ``i`` for node ``i``, adding the edges in node order and the
+    attribute arrays a whole column at a time.
+    """
+    import numpy
+    import vtk
+
+    parents = tree['parents']
+    nonroot = numpy.flatnonzero(parents >= 0)
+    builder = vtk.vtkMutableDirectedGraph()
+    for _ in range(len(parents)):
+        builder.AddVertex()
+    for child, parent in zip(nonroot.tolist(), parents[nonroot].tolist()):
+        builder.AddGraphEdge(parent, child)
+
+    for fields, columns, rows, attributes in (
+            (tree['node_fields'], tree['node_data'], None,
+             builder.GetVertexData()),
+            (tree['edge_fields'], tree['edge_data'], nonroot,
+             builder.GetEdgeData())):
+        for field in fields:
+            if field not in columns:
+                continue
+            column = columns[field]
+            values = (column if rows is None else column[rows]).tolist()
+            if values:
+                attributes.AddArray(values_to_vtkarray(field, values))
+
+    output = vtk.vtkTree()
+    output.ShallowCopy(builder)
+    return output
+
+
+def vtktree_to_parent_index(tree):
+    """
+    Convert a ``vtkTree`` to the ``tree/parent_index`` format, numbering its
+    vertices in depth-first order with an explicit stack, and reading each
+    attribute array at once.
+    """
+    import numpy
+    from girder_worker.core.format.columns import to_array
+
+    # Vertices in depth-first order, and the index of each vertex's parent
+    order, parents = [], []
+    stack = [(tree.GetRoot(), -1)]
+    while stack:
+        vertex, parent = stack.pop()
+        index = len(order)
+        order.append(vertex)
+        parents.append(parent)
+        stack.extend(
+            (tree.GetChild(vertex, c), index)
+            for c in reversed(range(tree.GetNumberOfChildren(vertex))))
+
+    # The edge from the parent of each vertex, after the root
+    edges = [tree.GetParentEdge(v) for v in order[1:]]
+
+    output = {
+        'parents': numpy.array(parents, dtype=numpy.int64),
+        'node_fields': [], 'edge_fields': [],
+        'node_data': {}, 'edge_data': {}
+    }
+    for scope, attributes, rows, prefix in (
+            ('node', tree.GetVertexData(), order, []),
+            ('edge', tree.GetEdgeData(), edges, [None])):
+        for c in range(attributes.GetNumberOfArrays()):
+            arr = attributes.GetAbstractArray(c)
+            values = vtkarray_to_values(arr)
+            output[scope + '_fields'].append(arr.GetName())
+            output[scope + '_data'][arr.GetName()] = to_array(
+                prefix + [values[row] for row in rows])
+    return output
+
+
+def write_binary(writer, data):
+    """
+    Serialize a data object with a legacy VTK writer, such as
+    ``vtkPolyDataWriter``, in the binary rather than ASCII file type.
+    """
+    writer.SetFileTypeToBinary()
+    writer.WriteToOutputStringOn()
+    writer.SetInputData(data)
+    writer.Update()
+    # Unlike GetOutputString, this is not cut off at the first null byte
+    return writer.GetOutputStdString()
+
+
+def read_binary(reader, data=None, path=None):
+    """
+    Read a data object with a legacy VTK reader, such as
+    ``vtkPolyDataReader``, from a string or any buffer, such as a memory-mapped
+    file, without copying it, or from a file.
+
+    :param reader: The reader to use.
+    :param data: The serialized data object.
+    :param path: The path of a file to read instead of ``data``.
+    :type path: str
+    """
+    import numpy
+    import vtk
+    from vtk.util import numpy_support
+
+    if path is not None:
+        reader.SetFileName(path)
+    else:
+        # A vtkCharArray that refers to the memory of the buffer
+        array = numpy_support.numpy_to_vtk(
+            numpy.frombuffer(data, dtype=numpy.int8), deep=False,
+            array_type=vtk.VTK_CHAR)
+        reader.ReadFromInputStringOn()
+        reader.SetInputArray(array)
+    reader.Update()
+    return reader.GetOutput()
+
+
+def write_xml(writer, data):
+    """
+    Serialize a data object with a VTK XML writer, such as
+    ``vtkXMLPolyDataWriter``, with its arrays appended as raw binary data
+    compressed with zlib.
+    """
+    import vtk
+    writer.SetDataModeToAppended()
+    writer.EncodeAppendedDataOff()
+    writer.SetCompressor(vtk.vtkZLibDataCompressor())
+    writer.WriteToOutputStringOn()
+    writer.SetInputData(data)
+    writer.Write()
+    return writer.GetOutputString()
+
+
+def read_xml(reader, data=None, path=None):
+    """
+    Read a data object with a VTK XML reader, such as ``vtkXMLPolyDataReader``,
+    from a string, or from a file.
+
+    :param reader: The reader to use.
+    :param data: The serialized data object.
+    :param path: The path of a file to read instead of ``data``.
+    :type path: str
+    """
+    import numpy
+
+    if path is not None:
+        reader.SetFileName(path)
+    else:
+        if not isinstance(data, bytes):
+            data = numpy.frombuffer(data, dtype=numpy.int8).tobytes()
+        reader.ReadFromInputStringOn()
+        reader.SetInputString(data)
+    reader.Update()
+    return reader.GetOutput()
 
 
 def load(params):
@@ -0,0 +1,4 @@
+from girder_worker.plugins.vtk import write_binary
+import vtk
+
+output = write_binary(vtk.vtkPolyDataWriter(), input)
@@ -0,0 +1,4 @@
+from girder_worker.plugins.vtk import write_xml
+import vtk
+
+output = write_xml(vtk.vtkXMLPolyDataWriter(), input)
@@ -0,0 +1,4 @@
+from girder_worker.plugins.vtk import read_xml
+import vtk
+
+output = read_xml(vtk.vtkXMLPolyDataReader(), input)
@@ -0,0 +1,20 @@
+from vtk.util import numpy_support
+import numpy
+import vtk
+
+output = vtk.vtkTable()
+for field in input['fields']:
+    column = input['columns'][field]
+    if column.dtype.kind in 'biuf':
+        # Numbers are stored as doubles, like in the rows to vtkTable converter
+        arr = numpy_support.numpy_to_vtk(
+            column.astype(numpy.float64), deep=True)
+    else:
+        arr = vtk.vtkStringArray()
+        arr.SetNumberOfValues(len(column))
+        for i, value in enumerate(column):
+            if not isinstance(value, str):
+                value = unicode(value).encode('utf8')
+            arr.SetValue(i, value)
+    arr.SetName(field)
+    output.AddColumn(arr)
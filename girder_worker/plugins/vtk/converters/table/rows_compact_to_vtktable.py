@@ -0,0 +1,8 @@
+from girder_worker.plugins.vtk import values_to_vtkarray
+import vtk
+
+output = vtk.vtkTable()
+rows = input['rows']
+if len(rows) > 0:
+    for field in input['fields']:
+        output.AddColumn(values_to_vtkarray(field, rows.column(field)))
@@ -1,8 +1,10 @@
-from girder_worker.plugins.vtk import dict_to_vtkarrays, dict_to_vtkrow
+from girder_worker.plugins.vtk import values_to_vtkarray
 import vtk
 
 output = vtk.vtkTable()
-if len(input['rows']) > 0:
-    dict_to_vtkarrays(input['rows'][0], input['fields'], output.GetRowData())
-    for d in input['rows']:
-        dict_to_vtkrow(d, output.GetRowData())
+rows = input['rows']
+if len(rows) > 0:
+    # Build each column at once rather than inserting the values row by row
+    for field in input['fields']:
+        output.AddColumn(
+            values_to_vtkarray(field, [row[field] for row in rows]))
@@ -0,0 +1,4 @@
+from girder_worker.plugins.vtk import read_binary
+import vtk
+
+output = read_binary(vtk.vtkTableReader(), input)
@@ -0,0 +1,18 @@
+from girder_worker.core.format.columns import to_array
+from vtk.util import numpy_support
+import vtk
+
+output = {'fields': [], 'columns': {}}
+for c in range(input.GetNumberOfColumns()):
+    name = input.GetColumnName(c)
+    arr = input.GetColumn(c)
+    if isinstance(arr, vtk.vtkDataArray):
+        # Copy the data, which is otherwise owned by the table
+        column = numpy_support.vtk_to_numpy(arr).copy()
+        if column.ndim > 1:
+            column = to_array(column.tolist())
+    else:
+        column = to_array([
+            arr.GetValue(i) for i in range(arr.GetNumberOfTuples())])
+    output['fields'].append(name)
+    output['columns'][name] = column
@@ -1,7 +1,9 @@
-from girder_worker.plugins.vtk import vtkrow_to_dict
+from girder_worker.plugins.vtk import vtkarray_to_values
 
-output = {'fields': [], 'rows': []}
-for c in range(input.GetNumberOfColumns()):
-    output['fields'].append(input.GetColumnName(c))
-for r in range(input.GetNumberOfRows()):
-    output['rows'].append(vtkrow_to_dict(input.GetRowData(), r))
+fields = [input.GetColumnName(c) for c in range(input.GetNumberOfColumns())]
+columns = [vtkarray_to_values(input.GetColumn(c))
+           for c in range(input.GetNumberOfColumns())]
+output = {
+    'fields': fields,
+    'rows': [dict(zip(fields, values)) for values in zip(*columns)]
+}
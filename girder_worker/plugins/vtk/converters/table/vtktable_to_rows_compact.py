@@ -0,0 +1,9 @@
+from girder_worker.core.format.compact import CompactRows
+from girder_worker.plugins.vtk import vtkarray_to_values
+
+columns = [vtkarray_to_values(input.GetColumn(c))
+           for c in range(input.GetNumberOfColumns())]
+rows = CompactRows([input.GetColumnName(c)
+                    for c in range(input.GetNumberOfColumns())],
+                   zip(*columns))
+output = {'fields': rows.fields, 'rows': rows}
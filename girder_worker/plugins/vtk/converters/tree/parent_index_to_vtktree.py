@@ -0,0 +1,3 @@
+from girder_worker.plugins.vtk import parent_index_to_vtktree
+
+output = parent_index_to_vtktree(input)
@@ -0,0 +1,3 @@
+from girder_worker.plugins.vtk import vtktree_to_parent_index
+
+output = vtktree_to_parent_index(input)
@@ -71,5 +71,30 @@ class TestGeometry(unittest.TestCase):
         self.assertEqual(converted.GetNumberOfCells(), 101)
         self.assertEqual(converted.GetNumberOfPoints(), 101)
 
+    def test_convert_binary(self):
+        cone = run(
+            self.cone,
+            inputs={
+                'resolution': {'format': 'number', 'data': 10000},
+                'radius': {'format': 'number', 'data': 1}
+            })['cone']
+        serialized = convert(
+            'geometry', cone, {'format': 'vtkpolydata.serialized'})['data']
+
+        for format in ('vtkpolydata.binary', 'vtkpolydata.xml'):
+            output = convert('geometry', cone, {'format': format})
+            self.assertTrue(isinstance(output['data'], str))
+            self.assertLess(len(output['data']), len(serialized))
+
+            # Read from a buffer as well as a string
+            for data in (output['data'], bytearray(output['data'])):
+                converted = convert(
+                    'geometry',
+                    {'format': format, 'data': data},
+                    {'format': 'vtkpolydata'}
+                )['data']
+                self.assertEqual(converted.GetNumberOfCells(), 10001)
+                self.assertEqual(converted.GetNumberOfPoints(), 10001)
+
 if __name__ == '__main__':
     unittest.main()
@@ -120,5 +120,15 @@ class TestGraph(unittest.TestCase):
                           (0, 2, {'Weights': 2.0}),
                           (1, 2, {'Weights': 1.0})])
 
+    def test_vtkgraph_binary(self):
+        binary = convert(
+            'graph', self.test_input['distances'],
+            {'format': 'vtkgraph.binary'})
+        output = convert('graph', binary, {'format': 'networkx'})['data']
+        self.assertEqual(len(output.nodes()), 4)
+        self.assertEqual(sorted(d['distance'] for _, _, d in
+                                output.edges(data=True)),
+                         [4242, 6303, 9429, 9443])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,92 @@
+import bson
+import collections
+import six
+import unittest
+
+from bson.errors import InvalidBSON
+from bson.objectid import ObjectId
+from girder_worker.core import bson_codec
+from girder_worker.core.format import iterators
+from girder_worker.tasks import convert
+
+
+class TestBsonCodec(unittest.TestCase):
+    def setUp(self):
+        self.objects = [collections.OrderedDict([
+            ('_id', ObjectId('57a0e0a1ec8b2f3dbb9e7a%02d' % (i % 100))),
+            ('id', i), ('name', 'item %d' % i), ('nested', {'value': i * 0.5})
+        ]) for i in range(300)]
+        self.data = b''.join(bson.BSON.encode(obj) for obj in self.objects)
+
+    def tearDown(self):
+        bson_codec.CHUNK_SIZE = 65536
+
+    def testDecode(self):
+        bson_codec.CHUNK_SIZE = 1000
+        for input in (self.data, bytearray(self.data), memoryview(self.data),
+                      six.BytesIO(self.data)):
+            documents = list(bson_codec.iter_decode(input))
+            self.assertEqual(documents, self.objects)
+            self.assertIsInstance(documents[0], collections.OrderedDict)
+
+        # Each batch holds whole documents
+        batches = list(bson_codec.iter_batches(memoryview(self.data)))
+        self.assertGreater(len(batches), 10)
+        self.assertEqual(b''.join(batches), self.data)
+        self.assertEqual(sum(len(bson.decode_all(b)) for b in batches),
+                         len(self.objects))
+
+        for input in (b'', six.BytesIO()):
+            self.assertEqual(list(bson_codec.iter_decode(input)), [])
+
+    def testTruncated(self):
+        for data in (self.data[:-1], self.data + b'\x05\x00',
+                     b'\x02\x00\x00\x00\x00'):
+            for input in (data, six.BytesIO(data)):
+                with self.assertRaises(InvalidBSON):
+                    list(bson_codec.iter_decode(input))
+
+        # Offsets after each complete document only
+        ends = list(bson_codec.document_ends(self.data[:-1]))
+        self.assertEqual(len(ends), len(self.objects) - 1)
+        self.assertEqual(ends[0], len(bson.BSON.encode(self.objects[0])))
+
+    def testEncode(self):
+        bson_codec.CHUNK_SIZE = 1000
+        chunks = list(bson_codec.iter_encode(iter(self.objects)))
+        self.assertGreater(len(chunks), 10)
+        self.assertEqual(b''.join(chunks), self.data)
+        self.assertEqual(list(bson_codec.iter_encode([])), [])
+
+    def testConverters(self):
+        output = convert('table', {'format': 'objectlist.bson',
+                                   'data': self.data},
+                         {'format': 'objectlist'})
+        self.assertEqual(output['data'], self.objects)
+
+        output = convert('table', {'format': 'objectlist.bson',
+                                   'data': self.data},
+                         {'format': 'objectlist.iter'})
+        self.assertEqual(next(output['data']), self.objects[0])
+
+        output = convert('table', {'format': 'objectlist.iter',
+                                   'data': iter(self.objects)},
+                         {'format': 'objectlist.bson'})
+        self.assertEqual(output['data'], self.data)
+
+        output = convert('table', {'format': 'objectlist',
+                                   'data': self.objects},
+                         {'format': 'objectlist.bson'})
+        self.assertEqual(output['data'], self.data)
+
+        # Streamed inputs and outputs
+        objects = iterators.decode_stream('table', 'objectlist.bson',
+                                          'objectlist.iter',
+                                          six.BytesIO(self.data))
+        self.assertEqual(b''.join(iterators.encode_stream(
+            'table', 'objectlist.iter', 'objectlist.bson', objects)),
+            self.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import numpy
+import unittest
+
+from girder_worker.core import format, isvalid
+from girder_worker.tasks import convert
+
+
+class TestColumns(unittest.TestCase):
+    def setUp(self):
+        self.csv = 'a,b,c,d\r\n1,2.5,x,1\r\n2,3,y,\r\n3,4,z,nan\r\n'
+        self.rows = {
+            'fields': ['a', 'b', 'c', 'd'],
+            'rows': [
+                {'a': 1, 'b': 2.5, 'c': 'x', 'd': '1'},
+                {'a': 2, 'b': 3.0, 'c': 'y', 'd': ''},
+                {'a': 3, 'b': 4.0, 'c': 'z', 'd': 'nan'}
+            ]
+        }
+
+    def testCsv(self):
+        output = convert('table', {'format': 'csv', 'data': self.csv},
+                         {'format': 'columns'})
+        table = output['data']
+        self.assertEqual(table['fields'], ['a', 'b', 'c', 'd'])
+        self.assertEqual(table['columns']['a'].dtype, numpy.int64)
+        self.assertEqual(table['columns']['b'].dtype, numpy.float64)
+        self.assertEqual(table['columns']['c'].dtype, object)
+        self.assertEqual(table['columns']['d'].dtype, object)
+        self.assertEqual(table['columns']['a'].tolist(), [1, 2, 3])
+        self.assertEqual(table['columns']['b'].tolist(), [2.5, 3, 4])
+        self.assertEqual(table['columns']['d'].tolist(), ['1', '', 'nan'])
+
+        output = convert('table', output, {'format': 'csv'})
+        self.assertEqual(output['data'], self.csv.replace(',3,', ',3.0,')
+                         .replace(',4,', ',4.0,'))
+
+        output = convert('table', output, {'format': 'tsv'})
+        self.assertEqual(output['data'].splitlines()[1], '1\t2.5\tx\t1')
+
+        output = convert('table', {'format': 'csv', 'data': 'a,b\r\n'},
+                         {'format': 'columns'})
+        self.assertEqual(output['data']['columns']['a'].tolist(), [])
+
+    def testRows(self):
+        output = convert('table', {'format': 'rows', 'data': self.rows},
+                         {'format': 'columns'})
+        self.assertEqual(output['data']['columns']['a'].dtype, numpy.int64)
+        self.assertEqual(output['data']['columns']['c'].dtype, object)
+
+        output = convert('table', output, {'format': 'rows'})
+        self.assertEqual(output['data'], self.rows)
+
+        output = convert('table', {'format': 'rows', 'data': self.rows},
+                         {'format': 'column.names'})
+        self.assertEqual(output['data'], ['a', 'b', 'c', 'd'])
+
+    def testValidator(self):
+        table = {'fields': ['a', 'b'], 'columns': {
+            'a': numpy.arange(3), 'b': numpy.zeros(3)}}
+        self.assertTrue(isvalid('table', {'format': 'columns', 'data': table}))
+
+        table['columns']['b'] = numpy.zeros(2)
+        self.assertFalse(isvalid('table', {'format': 'columns', 'data': table}))
+        table['columns']['b'] = [0, 0, 0]
+        self.assertFalse(isvalid('table', {'format': 'columns', 'data': table}))
+        del table['columns']['b']
+        self.assertFalse(isvalid('table', {'format': 'columns', 'data': table}))
+        self.assertFalse(isvalid('table', {'format': 'columns', 'data': {}}))
+
+    def testConverterPath(self):
+        # Other table conversions do not go through the columns format
+        path = format.converter_path(format.Validator('table', 'tsv'),
+                                     format.Validator('table', 'csv'))
+        self.assertEqual([c['outputs'][0]['format'] for c in path],
+                         ['rows', 'csv'])
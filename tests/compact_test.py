@@ -0,0 +1,85 @@
+import pickle
+import unittest
+
+from girder_worker.core import format, isvalid
+from girder_worker.core.format import compact
+from girder_worker.tasks import convert
+
+
+class TestCompact(unittest.TestCase):
+    def setUp(self):
+        self.csv = 'a,b,c\r\n1,x,2.5\r\n2,y,3.5\r\n3,x,\r\n'
+        self.rows = {
+            'fields': ['a', 'b', 'c'],
+            'rows': [{'a': 1, 'b': 'x', 'c': 2.5},
+                     {'a': 2, 'b': 'y', 'c': 3.5},
+                     {'a': 3, 'b': 'x', 'c': ''}]
+        }
+
+    def testConvert(self):
+        output = convert('table', {'format': 'csv', 'data': self.csv},
+                         {'format': 'rows.compact'})
+        table = output['data']
+        self.assertTrue(isvalid('table', output))
+        self.assertIsInstance(table['rows'], compact.CompactRows)
+        self.assertEqual(table['rows'].records, [
+            (1, 'x', 2.5), (2, 'y', 3.5), (3, 'x', '')])
+
+        # Repeated strings of a column are stored once
+        self.assertIs(table['rows'].records[0][1],
+                      table['rows'].records[2][1])
+
+        output = convert('table', output, {'format': 'rows'})
+        self.assertEqual(output['data'], self.rows)
+        self.assertIsInstance(output['data']['rows'][0], dict)
+
+        output = convert('table', {'format': 'rows', 'data': self.rows},
+                         {'format': 'rows.compact'})
+        self.assertEqual(
+            convert('table', output, {'format': 'csv'})['data'], self.csv)
+        self.assertEqual(
+            convert('table', output, {'format': 'tsv'})['data'],
+            self.csv.replace(',', '\t'))
+        self.assertEqual(
+            convert('table', output,
+                    {'format': 'column.names.discrete'})['data'], ['b'])
+
+    def testBehavesLikeRows(self):
+        rows = compact.rows_to_compact(self.rows)['rows']
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(list(rows), self.rows['rows'])
+        self.assertEqual(rows[1], {'a': 2, 'b': 'y', 'c': 3.5})
+        self.assertEqual(rows[-1]['a'], 3)
+        self.assertEqual(rows[1:], self.rows['rows'][1:])
+        self.assertEqual(rows[0].get('d', 'missing'), 'missing')
+        self.assertEqual(list(rows[0]), ['a', 'b', 'c'])
+        self.assertEqual(dict(rows[0].items()), self.rows['rows'][0])
+        self.assertIn('b', rows[0])
+        self.assertEqual(rows.column('a'), [1, 2, 3])
+        with self.assertRaises(KeyError):
+            rows[0]['d']
+
+        rows.append({'a': 4, 'd': 5})
+        self.assertEqual(rows.records[-1], (4, None, None))
+
+        copy = pickle.loads(pickle.dumps(rows, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(copy.records, rows.records)
+        self.assertEqual(copy[0], rows[0])
+
+    def testDistinctStrings(self):
+        rows = compact.CompactRows(['id', 'kind'])
+        rows.extend(('id%d' % i, 'kind%d' % (i % 3)) for i in range(5000))
+        self.assertIsNone(rows._strings[0])
+        self.assertEqual(len(rows._strings[1]), 3)
+        self.assertEqual(rows[4999], {'id': 'id4999', 'kind': 'kind1'})
+
+    def testPathsUnchanged(self):
+        path = format.converter_path(
+            format.Validator('table', 'tsv'),
+            format.Validator('table', 'csv'))
+        self.assertEqual(
+            [step['outputs'][0]['format'] for step in path], ['rows', 'csv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
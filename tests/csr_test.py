@@ -0,0 +1,141 @@
+import json
+import networkx as nx
+import numpy
+import os
+import unittest
+
+from girder_worker.core.format import csr
+from girder_worker.tasks import convert
+
+
+class TestCsr(unittest.TestCase):
+    def setUp(self):
+        self.graph = nx.DiGraph()
+        self.graph.add_node('a', name='A')
+        self.graph.add_node('b', name='B', size=2)
+        self.graph.add_node('c')
+        self.graph.add_edge('a', 'b', weight=1.5)
+        self.graph.add_edge('a', 'c', weight=2.5)
+        self.graph.add_edge('c', 'a')
+        self.graph.add_edge('c', 'c', weight=0.5)
+
+        with open(os.path.join('tests', 'data', 'clique.json'), 'rb') as f:
+            self.clique = f.read()
+
+    def assertSameGraph(self, expected, actual):
+        self.assertIsInstance(actual, type(expected))
+        self.assertEqual(dict(actual.nodes(data=True)),
+                         dict(expected.nodes(data=True)))
+        self.assertEqual(sorted(actual.edges(data=True)),
+                         sorted(expected.edges(data=True)))
+
+    def testNetworkx(self):
+        graph = csr.networkx_to_csr(self.graph)
+        self.assertTrue(csr.is_csr(graph))
+        self.assertEqual(graph['indptr'].dtype, numpy.int64)
+        self.assertEqual(len(graph['indices']), 4)
+        self.assertEqual(set(graph['edge_data']), {'weight'})
+        self.assertSameGraph(self.graph, csr.csr_to_networkx(graph))
+
+        undirected = self.graph.to_undirected()
+        graph = csr.networkx_to_csr(undirected)
+        self.assertEqual(len(graph['indices']), 3)
+        self.assertSameGraph(undirected, csr.csr_to_networkx(graph))
+
+        multigraph = nx.MultiGraph(self.graph)
+        multigraph.add_edge('a', 'b', weight=3.5)
+        self.assertSameGraph(
+            multigraph, csr.csr_to_networkx(csr.networkx_to_csr(multigraph)))
+
+        self.assertFalse(csr.is_csr(self.graph))
+
+    def testView(self):
+        for graph in (self.graph, self.graph.to_undirected(),
+                      nx.MultiDiGraph(self.graph)):
+            view = csr.networkx_view(csr.networkx_to_csr(graph))
+            self.assertSameGraph(graph, view)
+            self.assertEqual(view.number_of_edges(), graph.number_of_edges())
+            self.assertEqual(dict(view.degree()), dict(graph.degree()))
+            self.assertEqual(view.node['b'], {'name': 'B', 'size': 2})
+            self.assertIn('c', view['a'])
+            self.assertNotIn('b', view['c'])
+            self.assertNotIn('d', view)
+
+        view = csr.networkx_view(csr.networkx_to_csr(self.graph))
+        self.assertEqual(view['a']['b'], {'weight': 1.5})
+        self.assertEqual(sorted(view.predecessors('a')), ['c'])
+        self.assertFalse(nx.has_path(view, 'b', 'a'))
+        self.assertEqual(nx.shortest_path_length(view, 'c', 'b',
+                                                 weight='weight'), 2.5)
+        with self.assertRaises(KeyError):
+            view['d']
+        with self.assertRaises(KeyError):
+            view['a']['a']
+
+        multigraph = nx.MultiGraph([('a', 'b'), ('a', 'b'), ('b', 'b')])
+        view = csr.networkx_view(csr.networkx_to_csr(multigraph))
+        self.assertEqual(sorted(view['a']['b']), [0, 1])
+        self.assertEqual(view.degree('b'), multigraph.degree('b'))
+
+    def testText(self):
+        graph = csr.adjacencylist_to_csr(
+            'a b c  # comment\n\n# comment\nb c\nc a\nd')
+        self.assertFalse(graph['directed'])
+        self.assertEqual(graph['nodes'].tolist(), ['a', 'b', 'c', 'd'])
+        # The repeated edge a-c is merged
+        self.assertEqual(len(graph['indices']), 3)
+        self.assertSameGraph(
+            nx.read_adjlist(['a b c', 'b c', 'c a', 'd']),
+            csr.csr_to_networkx(graph))
+        self.assertEqual(csr.csr_to_adjacencylist(graph), 'a b c\nb c\nc\nd')
+
+        graph = csr.edgelist_to_csr('1 2\n2 3\n3 2\n# comment\n1 1')
+        self.assertSameGraph(nx.read_edgelist(['1 2', '2 3', '1 1']),
+                             csr.csr_to_networkx(graph))
+        self.assertEqual(csr.csr_to_edgelist(graph), '1 2\n1 1\n2 3')
+        self.assertEqual(len(csr.edgelist_to_csr('')['nodes']), 0)
+
+        with self.assertRaises(Exception):
+            csr.edgelist_to_csr('1 2 3')
+
+    def testClique(self):
+        graph = csr.clique_json_to_csr(self.clique)
+        self.assertTrue(graph['directed'])
+        self.assertFalse(graph['multigraph'])
+        expected = convert('graph', {'format': 'clique.json',
+                                     'data': self.clique},
+                           {'format': 'networkx'})['data']
+        self.assertSameGraph(expected, csr.csr_to_networkx(graph))
+
+        # Node and edge ids are generated, so compare the structure by name
+        output = json.loads(csr.csr_to_clique_json(graph))
+        names = {item['_id']['$oid']: item['data']['name']
+                 for item in output if item['type'] == 'node'}
+        self.assertEqual(len(names), len(expected))
+        self.assertEqual(
+            sorted((names[item['source']['$oid']],
+                    names[item['target']['$oid']])
+                   for item in output if item['type'] == 'link'),
+            sorted((expected.node[u]['name'], expected.node[v]['name'])
+                   for u, v in expected.edges()))
+
+        ids = csr._object_ids(100)
+        self.assertEqual(len(set(ids)), 100)
+        self.assertTrue(all(len(oid) == 24 for oid in ids))
+
+    def testConvert(self):
+        output = convert('graph', {'format': 'adjacencylist',
+                                   'data': 'a b c\nb c'},
+                         {'format': 'csr'})
+        self.assertEqual(len(output['data']['indices']), 3)
+
+        output = convert('graph', output, {'format': 'edgelist'})
+        self.assertEqual(output['data'], 'a b\na c\nb c')
+
+        output = convert('graph', output, {'format': 'networkx'})
+        self.assertSameGraph(nx.read_adjlist(['a b c', 'b c']),
+                             output['data'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+from girder_worker.core import format, utils
+from girder_worker.core.format import columns, csv_engine
+
+
+class TestCsvEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        lines = ['id,name,value,note']
+        for i in range(500):
+            note = '"multi\nline, %d"' % i if i % 7 == 0 else 'n%d' % i
+            lines.append('%d,item %d,%s,%s' % (i, i, i * 0.5, note))
+        self.csv = '\r\n'.join(lines) + '\r\n'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def expected(self, text):
+        reader = csv.DictReader(text.splitlines(),
+                                dialect=format.get_csv_dialect(text))
+        rows = [{k: csv_engine.convert_value(v) for k, v in row.items()}
+                for row in reader]
+        return {'fields': reader.fieldnames, 'rows': rows}
+
+    def testChunks(self):
+        with csv_engine.CsvSource(self.csv, chunk_size=1000) as source:
+            self.assertEqual(source.fields, ['id', 'name', 'value', 'note'])
+            self.assertGreater(len(source.chunks), 10)
+            self.assertEqual(source.chunks[0][0], 0)
+            self.assertEqual(source.chunks[-1][1], len(self.csv))
+            for (_, end), (start, _) in zip(source.chunks,
+                                            source.chunks[1:]):
+                self.assertEqual(end, start)
+                # Chunks end on record boundaries, not inside quotes
+                self.assertEqual(self.csv[:end].count('"') % 2, 0)
+                self.assertEqual(self.csv[end - 1], '\n')
+
+    def testReadRows(self):
+        expected = self.expected(self.csv)
+        self.assertEqual(expected['rows'][7]['note'], 'multiline, 7')
+        self.assertEqual(expected['rows'][3]['value'], 1.5)
+
+        for processes in (1, 3):
+            self.assertEqual(csv_engine.read_rows(
+                self.csv, chunk_size=1000, processes=processes), expected)
+
+        path = os.path.join(self.tmp, 'table.csv')
+        with open(path, 'wb') as f:
+            f.write(self.csv)
+        self.assertEqual(csv_engine.read_rows(
+            path=path, chunk_size=1000, processes=2), expected)
+
+    def testPool(self):
+        # The pool is kept between reads, and replaced for a different size
+        expected = self.expected(self.csv)
+        csv_engine.read_rows(self.csv, chunk_size=1000, processes=2)
+        pool = utils._pool
+        self.assertEqual(pool[:2], (os.getpid(), 2))
+        self.assertEqual(csv_engine.read_rows(
+            self.csv, chunk_size=1000, processes=2), expected)
+        self.assertIs(utils._pool, pool)
+        self.assertEqual(csv_engine.read_rows(
+            self.csv, chunk_size=1000, processes=3), expected)
+        self.assertEqual(utils._pool[1], 3)
+
+        # The default is to parse in this process
+        utils._close_pool()
+        utils._pool = None
+        self.assertEqual(csv_engine.read_rows(self.csv, chunk_size=1000),
+                         expected)
+        self.assertIsNone(utils._pool)
+
+    def testRaggedRows(self):
+        text = 'a,b\n' + '1,2\n3,4\n' * 10 + '5\n\n6,7,8\n'
+        output = csv_engine.read_rows(text, chunk_size=4)
+        self.assertEqual(output['fields'], ['a', 'b'])
+        self.assertEqual(output['rows'][-2:], [
+            {'a': 5, 'b': None}, {'a': 6, 'b': 7, None: ['8']}])
+        self.assertEqual(output, self.expected(text))
+
+        self.assertEqual(csv_engine.read_rows(''),
+                         {'fields': None, 'rows': []})
+
+    def testReadColumns(self):
+        # The value column is numeric, and the note column is numeric in the
+        # first chunks only
+        text = 'value,note\n' + ''.join(
+            '%d,%s\n' % (i, i if i < 400 else 'x%d' % i) for i in range(500))
+        for processes in (1, 2):
+            output = columns.read_columns(
+                text, chunk_size=100, processes=processes)
+            self.assertEqual(output['columns']['value'].tolist(), range(500))
+            note = output['columns']['note']
+            self.assertEqual(note.dtype, object)
+            self.assertEqual(note[0], '0')
+            self.assertEqual(note[-1], 'x499')
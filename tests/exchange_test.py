@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from girder_worker.core import exchange
+
+
+class TestExchange(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'array.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def testArrayType(self):
+        self.assertEqual(exchange.array_type([1.5, 2, 3]), b'd')
+        self.assertEqual(exchange.array_type([1, -2, 2 ** 40]), b'q')
+        self.assertEqual(exchange.array_type([True, False]), b'?')
+        self.assertIsNone(exchange.array_type([1, 2 ** 64]))
+        self.assertIsNone(exchange.array_type([]))
+        self.assertIsNone(exchange.array_type([1, True]))
+        self.assertIsNone(exchange.array_type([1, 'a']))
+        self.assertIsNone(exchange.array_type('abc'))
+        self.assertIsNone(exchange.array_type(12))
+
+    def testRoundTrip(self):
+        for value in ([0.5, -1.25, 3], [1, -2, 2 ** 40], [True, False]):
+            exchange.write_array(self.path, value)
+            self.assertEqual(exchange.read_array(self.path), value)
+
+        # Header is the type code and a little-endian 64 bit element count
+        exchange.write_array(self.path, [1, 2], b'q')
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(data[:9], b'q\x02' + b'\x00' * 7)
+        self.assertEqual(len(data), 9 + 16)
+
+    def testErrors(self):
+        with self.assertRaises(Exception):
+            exchange.write_array(self.path, ['a'])
+
+        exchange.write_array(self.path, [1.0, 2.0])
+        with open(self.path, 'rb+') as f:
+            f.truncate(12)
+        with self.assertRaisesRegexp(Exception, 'Truncated'):
+            exchange.read_array(self.path)
+
+        with open(self.path, 'wb') as f:
+            f.write(b'x' + b'\x00' * 8)
+        with self.assertRaisesRegexp(Exception, 'Invalid'):
+            exchange.read_array(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
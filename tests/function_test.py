@@ -0,0 +1,78 @@
+import unittest
+
+from girder_worker.core import format
+from girder_worker.core.executors import python
+from girder_worker.tasks import convert, run
+
+
+def divmod_task(a, b):
+    return {'quotient': a // b, 'remainder': a % b}
+
+
+class Namespace(object):
+    @staticmethod
+    def double(a):
+        return a * 2
+
+
+class TestFunction(unittest.TestCase):
+    def setUp(self):
+        self.task = {
+            'mode': 'python',
+            'function': 'tests.function_test:divmod_task',
+            'inputs': [
+                {'name': 'a', 'type': 'integer', 'format': 'integer'},
+                {'name': 'b', 'type': 'integer', 'format': 'integer'}
+            ],
+            'outputs': [
+                {'name': 'quotient', 'type': 'integer', 'format': 'integer'},
+                {'name': 'remainder', 'type': 'integer', 'format': 'integer'}
+            ]
+        }
+        self.inputs = {
+            'a': {'format': 'integer', 'data': 17},
+            'b': {'format': 'integer', 'data': 5}
+        }
+
+    def testMultipleOutputs(self):
+        outputs = run(self.task, inputs=self.inputs)
+        self.assertEqual(outputs['quotient']['data'], 3)
+        self.assertEqual(outputs['remainder']['data'], 2)
+
+    def testSingleOutput(self):
+        self.task['function'] = 'tests.function_test:Namespace.double'
+        self.task['inputs'] = self.task['inputs'][:1]
+        self.task['outputs'] = [
+            {'name': 'b', 'type': 'integer', 'format': 'integer'}]
+        del self.inputs['b']
+        outputs = run(self.task, inputs=self.inputs, outputs={
+            'b': {'format': 'json'}})
+        self.assertEqual(outputs['b']['data'], '34')
+        self.assertIs(python._functions[self.task['function']],
+                      Namespace.double)
+
+    def testErrors(self):
+        self.task['function'] = 'tests.function_test'
+        with self.assertRaisesRegexp(Exception, 'module:callable'):
+            run(self.task, inputs=self.inputs)
+
+        self.task['function'] = 'tests.function_test:Namespace.double'
+        self.task['inputs'] = self.task['inputs'][:1]
+        del self.inputs['b']
+        with self.assertRaisesRegexp(Exception, 'must return a dict'):
+            run(self.task, inputs=self.inputs)
+
+    def testBuiltinConverters(self):
+        analysis = format.get_validator_analysis(
+            format.Validator('number', 'json'))
+        self.assertEqual(analysis['function'],
+                         'girder_worker.core.format.builtin:is_string')
+        self.assertNotIn('script', analysis)
+
+        output = convert('number_list', {'format': 'number_list',
+                                         'data': [1, 2.5]}, {'format': 'json'})
+        self.assertEqual(output['data'], '[1, 2.5]')
+        output = convert('python', {'format': 'object', 'data': {'a': 1}},
+                         {'format': 'pickle.base64'})
+        output = convert('python', output, {'format': 'object'})
+        self.assertEqual(output['data'], {'a': 1})
@@ -0,0 +1,139 @@
+import collections
+import six
+import types
+import unittest
+
+from girder_worker.core import format, isvalid
+from girder_worker.core.format import iterators
+from girder_worker.tasks import convert
+
+
+class TestIterators(unittest.TestCase):
+    def setUp(self):
+        self.jsonlines = '{"a": 1, "b": {"c": "x"}}\n{"a": 2, "b": {"c": "y"}}\n'
+        self.csv = 'a,b.c\r\n1,x\r\n2,y\r\n'
+
+    def tearDown(self):
+        iterators.FIELDS_HEAD = 1000
+
+    def testConvertLazily(self):
+        output = convert('table', {'format': 'jsonlines',
+                                   'data': self.jsonlines},
+                         {'format': 'rows.iter'})
+        table = output['data']
+        self.assertEqual(table['fields'], ['a', 'b.c'])
+        self.assertIsInstance(table['rows'], collections.Iterator)
+        self.assertEqual(
+            [dict(row) for row in table['rows']],
+            [{'a': 1, 'b.c': 'x'}, {'a': 2, 'b.c': 'y'}])
+
+        output = convert('table', {'format': 'jsonlines',
+                                   'data': self.jsonlines},
+                         {'format': 'csv'})
+        self.assertEqual(output['data'], self.csv)
+
+        output = convert('table', {'format': 'csv', 'data': self.csv},
+                         {'format': 'objectlist.iter'})
+        self.assertIsInstance(output['data'], collections.Iterator)
+        self.assertEqual(list(output['data']), [
+            {'a': 1, 'b': {'c': 'x'}}, {'a': 2, 'b': {'c': 'y'}}])
+
+    def testStages(self):
+        consumed = []
+
+        def objects():
+            for i in range(3):
+                consumed.append(i)
+                yield {'a': i}
+
+        iterators.FIELDS_HEAD = 1
+        table = iterators.objectlist_to_rows(objects())
+        chunks = iterators.rows_to_csv_chunks(table)
+        self.assertEqual(consumed, [0])  # the first object gives the fields
+        self.assertEqual(''.join(chunks), 'a\r\n0\r\n1\r\n2\r\n')
+        self.assertEqual(consumed, [0, 1, 2])
+
+    def testFields(self):
+        # Fields are collected from the head of the objects
+        objects = [{'a': 1}, {'a': 2, 'b': {'c': 3}}]
+        output = convert('table', {'format': 'objectlist.iter',
+                                   'data': iter(objects)},
+                         {'format': 'csv'})
+        self.assertEqual(output['data'], 'a,b.c\r\n1,\r\n2,3\r\n')
+
+        # A field found after it fails before its row is written
+        iterators.FIELDS_HEAD = 2
+        table = iterators.objectlist_to_rows(iter(objects + [{'d': 4}]))
+        self.assertEqual(table['fields'], ['a', 'b.c'])
+        chunks = []
+        with six.assertRaisesRegex(
+                self, Exception, 'Object 3 has the field "d", which is not '
+                'in the first 2 objects'):
+            for chunk in iterators.rows_to_csv_chunks(table):
+                chunks.append(chunk)
+        self.assertEqual(chunks, [])
+
+    def testMaterialize(self):
+        output = convert('table', {'format': 'csv', 'data': self.csv},
+                         {'format': 'rows.iter'})
+        output = convert('table', output, {'format': 'rows'})
+        self.assertEqual(output['data'], {
+            'fields': ['a', 'b.c'],
+            'rows': [{'a': 1, 'b.c': 'x'}, {'a': 2, 'b.c': 'y'}]})
+        self.assertTrue(isvalid('table', output))
+
+        output = convert('table', {'format': 'objectlist',
+                                   'data': [{'a': 1}, {'a': 2}]},
+                         {'format': 'objectlist.iter'})
+        output = convert('table', output, {'format': 'objectlist'})
+        self.assertEqual(output['data'], [{'a': 1}, {'a': 2}])
+
+    def testReadLines(self):
+        lines = ['a\tb\n'] + ['%d\t%d\n' % (i, i * 2) for i in range(10000)]
+        table = iterators.tsv_to_rows(iter(lines))
+        self.assertEqual(table['fields'], ['a', 'b'])
+        rows = list(table['rows'])
+        self.assertEqual(len(rows), 10000)
+        self.assertEqual(rows[-1], {'a': 9999, 'b': 19998})
+
+        text = iterators.objectlist_to_jsonlines(
+            iterators.jsonlines_to_objectlist(six.StringIO(self.jsonlines)))
+        self.assertEqual(text, self.jsonlines)
+
+        table = iterators.csv_to_rows('')
+        self.assertEqual(table['fields'], [])
+        self.assertEqual(list(table['rows']), [])
+
+    def testValidate(self):
+        self.assertTrue(isvalid('table', {
+            'format': 'objectlist.iter', 'data': iter([{'a': 1}])}))
+        self.assertFalse(isvalid('table', {
+            'format': 'objectlist.iter', 'data': '{"a": 1}'}))
+        self.assertTrue(isvalid('table', {
+            'format': 'rows.iter',
+            'data': {'fields': ['a'], 'rows': iter([{'a': 1}])}}))
+        self.assertFalse(isvalid('table', {
+            'format': 'rows.iter', 'data': {'fields': ['a']}}))
+
+    def testStreams(self):
+        rows = iterators.decode_stream(
+            'table', 'jsonlines', 'rows.iter', six.StringIO(self.jsonlines))
+        chunks = iterators.encode_stream('table', 'rows.iter', 'tsv', rows)
+        self.assertIsInstance(chunks, types.GeneratorType)
+        self.assertEqual(''.join(chunks), 'a\tb.c\r\n1\tx\r\n2\ty\r\n')
+
+        with self.assertRaisesRegexp(Exception, 'Cannot read'):
+            iterators.decode_stream('table', 'rows', 'rows.iter', [])
+
+    def testPathsUnchanged(self):
+        # The materialized formats still convert without iterator stages
+        path = format.converter_path(
+            format.Validator('table', 'jsonlines'),
+            format.Validator('table', 'csv'))
+        self.assertEqual(
+            [step['outputs'][0]['format'] for step in path],
+            ['objectlist', 'rows', 'csv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
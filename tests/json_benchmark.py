@@ -0,0 +1,99 @@
+"""
+Time the functions of the JSON format converters, which use
+:py:mod:`girder_worker.core.json_codec`, against the ``json`` and
+``bson.json_util`` calls that the converters made before, and decoding a
+large array all at once against decoding it lazily. JSON lines are parsed
+with :py:mod:`girder_worker.core.format.jsonlines_engine` in one process and
+against decoding each line with ``bson.json_util``.
+
+Run with ``python -m tests.json_benchmark [rows]`` from the repository root.
+Install ``ujson`` or ``simplejson`` to compare their speed with the standard
+library's.
+"""
+import bson.json_util
+import gc
+import json
+import random
+import sys
+import time
+
+from girder_worker.core import json_codec
+from girder_worker.core.format import builtin, jsonlines_engine
+
+
+def _objects(n):
+    rng = random.Random(0)
+    return [{
+        'id': i,
+        'count': rng.randint(0, 1000),
+        'value': rng.random(),
+        'label': rng.choice(['a', 'b', 'c', 'd']),
+        'nested': {'tags': ['x', 'y'], 'flag': i % 2 == 0}
+    } for i in range(n)]
+
+
+def _cases(n):
+    objects = _objects(n)
+    rows = {'fields': ['id', 'count', 'value', 'label'], 'rows': [
+        {k: o[k] for k in ('id', 'count', 'value', 'label')}
+        for o in objects]}
+    tree = {'node_fields': ['id'], 'edge_fields': [],
+            'node_data': {'id': 0}, 'children': [
+                {'node_data': {'id': i}, 'edge_data': {}}
+                for i in range(1, n)]}
+    numbers = [o['value'] for o in objects]
+
+    plain = (builtin.json_loads, builtin.json_dumps, json.loads, json.dumps)
+    extended = (builtin.extended_json_loads, builtin.extended_json_dumps,
+                bson.json_util.loads, bson.json_util.dumps)
+
+    # Converted format, data, new decoder and encoder, previous ones
+    return [
+        ('number_list/json', numbers) + plain,
+        ('integer_list/json', [o['id'] for o in objects]) + plain,
+        ('string_list/json', [o['label'] for o in objects]) + plain,
+        ('table/rows.json', rows) + extended,
+        ('table/objectlist.json', objects) + extended,
+        ('tree/nested.json', tree) + extended,
+    ]
+
+
+def _timed(fn):
+    gc.collect()
+    start = time.time()
+    result = fn()
+    return time.time() - start, result
+
+
+def main(n):
+    print('JSON backends: %s to decode, %s to encode' % (
+        json_codec.decoder().__name__, json_codec.encoder().__name__))
+    print('Converting %d values or rows\n' % n)
+    print('%-30s %10s %10s %10s %10s' % (
+        '', 'decode', 'was', 'encode', 'was'))
+
+    for name, data, loads, dumps, old_loads, old_dumps in _cases(n):
+        t_encode, text = _timed(lambda: dumps(data))
+        t_decode, _ = _timed(lambda: loads(text))
+        t_old_encode, _ = _timed(lambda: old_dumps(data))
+        t_old_decode, _ = _timed(lambda: old_loads(text))
+        print('%-30s %9.3fs %9.3fs %9.3fs %9.3fs' % (
+            name, t_decode, t_old_decode, t_encode, t_old_encode))
+
+    text = json_codec.dumps(_objects(n), extended=True)
+    t, _ = _timed(lambda: json_codec.loads(text, extended=True))
+    print('\nobjectlist.json, all at once: %8.3fs' % t)
+    t, _ = _timed(lambda: sum(
+        1 for _ in json_codec.iter_array(text, extended=True)))
+    print('objectlist.json, lazily:      %8.3fs' % t)
+
+    text = '\n'.join(json_codec.dumps(o) for o in _objects(n))
+    t, _ = _timed(lambda: jsonlines_engine.read_objects(text, processes=1))
+    print('\njsonlines, by chunks:         %8.3fs' % t)
+    t, _ = _timed(lambda: [bson.json_util.loads(line)
+                           for line in text.splitlines()])
+    print('jsonlines, by lines:          %8.3fs' % t)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
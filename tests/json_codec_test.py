@@ -0,0 +1,141 @@
+import bson.json_util
+import datetime
+import girder_worker
+import json
+import random
+import six
+import unittest
+
+from bson.binary import Binary
+from bson.objectid import ObjectId
+from bson.tz_util import utc
+from girder_worker.core import json_codec
+from girder_worker.tasks import convert
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class TestJsonCodec(unittest.TestCase):
+    def setUp(self):
+        self.objects = [{
+            '_id': ObjectId('57a0e0a1ec8b2f3dbb9e7a40'),
+            'date': datetime.datetime(2016, 8, 2, 12, 30, tzinfo=utc),
+            'data': Binary(b'\x00\x01\xff', 0),
+            'nested': {'list': [1, 2.5, None, True, u'\xe9'], 'str': 'text'}
+        }, {
+            '_id': ObjectId('57a0e0a1ec8b2f3dbb9e7a41'),
+            'value': {'$date': {'$numberLong': '-1000'}}
+        }]
+
+    def tearDown(self):
+        json_codec.CHUNK_SIZE = 65536
+        if girder_worker.config.has_section('json'):
+            girder_worker.config.remove_option('json', 'backend')
+        json_codec._backends.clear()
+
+    def testExtended(self):
+        # Same text and values as bson.json_util
+        text = bson.json_util.dumps(self.objects)
+        self.assertEqual(json_codec.dumps(self.objects, extended=True), text)
+        self.assertEqual(json_codec.loads(text, extended=True),
+                         bson.json_util.loads(text))
+
+        plain = {'a': [1, {'b': 'c'}]}
+        self.assertEqual(json_codec.dumps(plain, extended=True),
+                         json.dumps(plain))
+
+    def testPlain(self):
+        self.assertEqual(json_codec.loads('{"a": [1, 2.5]}'), {'a': [1, 2.5]})
+        self.assertEqual(json_codec.dumps({'a': 1}, indent=2, sort_keys=True),
+                         json.dumps({'a': 1}, indent=2, sort_keys=True))
+        self.assertEqual(json_codec.dumps(0.1 + 0.2), repr(0.1 + 0.2))
+        self.assertIn(json_codec.decoder().__name__, json_codec.BACKENDS)
+
+    def assertFloatsRoundTrip(self):
+        rand = random.Random(0)
+        values = [rand.random() * 10 ** rand.randint(-10, 10)
+                  for _ in range(1000)] + [0.000763774618976614]
+        text = json.dumps(values)
+        self.assertEqual(json_codec.loads(text), values)
+        self.assertEqual(json_codec.loads(text, extended=True), values)
+
+    def testFloats(self):
+        self.assertFloatsRoundTrip()
+
+    @unittest.skipIf(ujson is None, 'ujson is not installed')
+    def testUjsonFloats(self):
+        if not girder_worker.config.has_section('json'):
+            girder_worker.config.add_section('json')
+        girder_worker.config.set('json', 'backend', 'ujson')
+        self.assertIs(json_codec.decoder(), ujson)
+        self.assertFloatsRoundTrip()
+
+    def testBackendConfig(self):
+        if not girder_worker.config.has_section('json'):
+            girder_worker.config.add_section('json')
+
+        girder_worker.config.set('json', 'backend', 'json')
+        self.assertIs(json_codec.decoder(), json)
+        self.assertIs(json_codec.encoder(), json)
+
+        json_codec._backends.clear()
+        girder_worker.config.set('json', 'backend', 'yaml')
+        with self.assertRaisesRegexp(Exception, 'Unknown JSON backend'):
+            json_codec.loads('1')
+
+    def testIterArray(self):
+        text = bson.json_util.dumps(self.objects)
+        self.assertEqual(list(json_codec.iter_array(text, extended=True)),
+                         bson.json_util.loads(text))
+
+        # Elements that span chunks, including numbers cut in two
+        json_codec.CHUNK_SIZE = 3
+        values = [12345, 'a string', {'b': [1, 2, 3]}, [], 6.25, 7]
+        text = ' [ %s ] ' % ' ,\n'.join(json.dumps(v) for v in values)
+        self.assertEqual(
+            list(json_codec.iter_array(six.BytesIO(text))), values)
+        self.assertEqual(list(json_codec.iter_array(iter(text))), values)
+        self.assertEqual(list(json_codec.iter_array('[]')), [])
+
+        # Split at every offset, including after the "." or "e" of a number
+        json_codec.CHUNK_SIZE = 1
+        values = [1.5e-07, 12.25, -3.0, 1e+20, 0.000763774618976614, 7,
+                  [2.5e10, {'a': -0.5}], 'x']
+        text = json.dumps(values)
+        for i in range(1, len(text)):
+            self.assertEqual(
+                list(json_codec.iter_array([text[:i], text[i:]])), values)
+
+        for bad in ('{"a": 1}', '[1, 2', '[1 2]'):
+            with self.assertRaises(ValueError):
+                list(json_codec.iter_array(bad))
+
+    def testIterDumpsArray(self):
+        json_codec.CHUNK_SIZE = 10
+        values = [{'a': i} for i in range(20)]
+        chunks = list(json_codec.iter_dumps_array(iter(values)))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks), json.dumps(values))
+        self.assertEqual(''.join(json_codec.iter_dumps_array([])), '[]')
+
+    def testConverters(self):
+        text = bson.json_util.dumps(self.objects)
+        output = convert('table', {'format': 'objectlist.json', 'data': text},
+                         {'format': 'objectlist.iter'})
+        self.assertEqual(list(output['data']), bson.json_util.loads(text))
+
+        output = convert('table', {'format': 'objectlist',
+                                   'data': self.objects},
+                         {'format': 'objectlist.json'})
+        self.assertEqual(output['data'], text)
+
+        output = convert('number_list', {'format': 'json', 'data': '[1, 2.5]'},
+                         {'format': 'number_list'})
+        self.assertEqual(output['data'], [1, 2.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
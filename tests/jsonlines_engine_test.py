@@ -0,0 +1,99 @@
+import bson.json_util
+import os
+import shutil
+import six
+import tempfile
+import unittest
+
+from bson.objectid import ObjectId
+from girder_worker.core import utils
+from girder_worker.core.format import csv_engine, iterators, jsonlines_engine
+from girder_worker.tasks import convert
+
+
+class TestJsonLinesEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.objects = [{'id': i, 'name': 'item %d' % i, 'tags': ['a', 'b'],
+                         'nested': {'value': i * 0.5, 'note': u'\xe9 "$"'}}
+                        for i in range(500)]
+        self.text = '\n'.join(
+            bson.json_util.dumps(obj) for obj in self.objects) + '\n'
+
+    def tearDown(self):
+        jsonlines_engine.BATCH_SIZE = 65536
+        shutil.rmtree(self.tmp)
+
+    def testReadObjects(self):
+        for processes in (1, 3):
+            self.assertEqual(jsonlines_engine.read_objects(
+                self.text, chunk_size=1000, processes=processes),
+                self.objects)
+
+        path = os.path.join(self.tmp, 'table.jsonlines')
+        with open(path, 'wb') as f:
+            f.write(self.text.replace('\n', '\r\n'))
+        self.assertEqual(jsonlines_engine.read_objects(
+            path=path, chunk_size=1000, processes=2), self.objects)
+
+        # The CSV parser's pool of the same size is reused
+        self.assertEqual(utils._pool[:2], (os.getpid(), 2))
+        pool = utils._pool
+        self.assertEqual(csv_engine.read_rows(
+            'a\n' + '1\n' * 1000, chunk_size=100, processes=2)['rows'][-1],
+            {'a': 1})
+        self.assertIs(utils._pool, pool)
+
+        # Chunks end after a line break, or at the end of the input
+        chunks = jsonlines_engine._split(self.text.rstrip(), 1000)
+        self.assertGreater(len(chunks), 10)
+        for start, end in chunks[1:]:
+            self.assertEqual(self.text[start - 1], '\n')
+        self.assertEqual(chunks[-1][1], len(self.text.rstrip()))
+
+        self.assertEqual(jsonlines_engine.read_objects(''), [])
+        with open(path, 'wb'):
+            pass
+        self.assertEqual(jsonlines_engine.read_objects(path=path), [])
+
+    def testExtended(self):
+        objects = [{'_id': ObjectId('57a0e0a1ec8b2f3dbb9e7a40'), 'a': 1},
+                   {'b': {'c': 2}}]
+        text = '\n'.join(bson.json_util.dumps(obj) for obj in objects)
+        self.assertEqual(jsonlines_engine.read_objects(text), objects)
+        self.assertEqual(
+            jsonlines_engine.read_objects(text, extended=False)[0]['_id'],
+            {'$oid': '57a0e0a1ec8b2f3dbb9e7a40'})
+
+    def testInvalidLines(self):
+        for bad in ('{"a": 1}\n\n{"a": 2}', '{"a": 1}, {"a": 2}',
+                    '[1\n2]', '{"a": 1'):
+            with self.assertRaises(ValueError):
+                jsonlines_engine.read_objects(bad)
+
+    def testIterObjects(self):
+        jsonlines_engine.BATCH_SIZE = 100
+        read = []
+        lines = (read.append(line) or line
+                 for line in self.text.splitlines())
+        objects = jsonlines_engine.iter_objects(lines)
+        self.assertEqual(next(objects), self.objects[0])
+        # Only the first batch has been read
+        self.assertLess(len(read), 10)
+        self.assertEqual(list(objects), self.objects[1:])
+
+        objects = iterators.jsonlines_to_objectlist(six.StringIO(self.text))
+        self.assertEqual(list(objects), self.objects)
+
+    def testConverters(self):
+        output = convert('table', {'format': 'jsonlines', 'data': self.text},
+                         {'format': 'objectlist'})
+        self.assertEqual(output['data'], self.objects)
+
+        output = convert('table', {'format': 'jsonlines', 'data': self.text},
+                         {'format': 'rows'})
+        self.assertEqual(output['data']['rows'][3]['nested.value'], 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
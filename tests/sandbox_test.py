@@ -0,0 +1,70 @@
+import girder_worker
+import os
+import unittest
+
+from girder_worker.core.executors import python
+from girder_worker.tasks import run
+
+
+class TestSandbox(unittest.TestCase):
+    def setUp(self):
+        if not girder_worker.config.has_section('python'):
+            girder_worker.config.add_section('python')
+        girder_worker.config.set('python', 'sandbox_preload', 'json, csv')
+        girder_worker.config.set('python', 'sandbox_memory_limit', '512')
+
+        self.task = {
+            'mode': 'python',
+            'sandbox': True,
+            'script': 'import os\nb = a * 2\npid = os.getpid()',
+            'inputs': [{'name': 'a', 'type': 'number', 'format': 'number'}],
+            'outputs': [
+                {'name': 'b', 'type': 'number', 'format': 'number'},
+                {'name': 'pid', 'type': 'number', 'format': 'number'}
+            ]
+        }
+        self.inputs = {'a': {'format': 'number', 'data': 21}}
+
+    def tearDown(self):
+        if python._forkserver is not None:
+            python._forkserver.stop()
+            python._forkserver = None
+        girder_worker.config.remove_option('python', 'sandbox_preload')
+        girder_worker.config.remove_option('python', 'sandbox_memory_limit')
+
+    def testSandbox(self):
+        outputs = run(self.task, inputs=self.inputs)
+        self.assertEqual(outputs['b']['data'], 42)
+        self.assertNotEqual(outputs['pid']['data'], os.getpid())
+
+        server = python._forkserver
+        self.assertEqual(server.preload, ['json', 'csv'])
+        self.assertEqual(server.memory_limit, 512 * 1024 * 1024)
+
+        # Each task runs in a new child of the same server
+        outputs2 = run(self.task, inputs=self.inputs)
+        self.assertNotEqual(outputs2['pid']['data'], outputs['pid']['data'])
+        self.assertIs(python._forkserver, server)
+
+    def testErrors(self):
+        self.task['script'] = 'raise ValueError("bad input")'
+        with self.assertRaisesRegexp(Exception, 'ValueError: bad input'):
+            run(self.task, inputs=self.inputs)
+
+        self.task['script'] = 'import os\nos._exit(1)'
+        with self.assertRaisesRegexp(Exception, 'exited unexpectedly'):
+            run(self.task, inputs=self.inputs)
+
+        self.task['script'] = 'x = " " * (1024 * 1024 * 1024)'
+        with self.assertRaisesRegexp(Exception, 'MemoryError'):
+            run(self.task, inputs=self.inputs)
+
+        # The server survives failed tasks
+        self.task['script'] = 'b = a + 1\npid = 0'
+        outputs = run(self.task, inputs=self.inputs)
+        self.assertEqual(outputs['b']['data'], 22)
+
+    def testStreamsUnsupported(self):
+        self.task['inputs'][0]['stream'] = True
+        with self.assertRaisesRegexp(Exception, 'do not support streams'):
+            run(self.task, inputs=self.inputs)
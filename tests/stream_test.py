@@ -7,6 +7,7 @@ from . import captureOutput
 from girder_worker.core.io import (make_stream_push_adapter,
                                    make_stream_fetch_adapter)
 from girder_worker.core.utils import run_process
+from girder_worker.tasks import run
 from six.moves import BaseHTTPServer, socketserver
 
 _iscript = os.path.join(os.path.dirname(__file__), 'stream_input.py')
@@ -121,3 +122,119 @@ class TestStream(unittest.TestCase):
             print(stdpipes)
             raise
         self.assertEqual(stdpipes, ['olleh\ndlrow\n', ''])
+
+    def testPythonModeStreams(self):
+        task = {
+            'mode': 'python',
+            'script': ('lines = (line[::-1].strip() + "\\n" for line in inp)\n'
+                       'closed = inp.closed\n'),
+            'inputs': [{
+                'id': 'inp',
+                'type': 'string',
+                'format': 'text',
+                'stream': True
+            }],
+            'outputs': [{
+                'id': 'lines',
+                'type': 'string',
+                'format': 'text',
+                'stream': True
+            }, {
+                'id': 'closed',
+                'type': 'boolean',
+                'format': 'boolean'
+            }]
+        }
+
+        @httmock.urlmatch(netloc='^mockedhost$', method='GET')
+        def mock_fetch(url, request):
+            return 'hello\nworld\n'
+
+        del _req_chunks[:]
+        with httmock.HTTMock(mock_fetch):
+            outputs = run(task, inputs={
+                'inp': {'mode': 'http', 'url': 'http://mockedhost'}
+            }, outputs={
+                'lines': {
+                    'mode': 'http',
+                    'method': 'PUT',
+                    'url': 'http://localhost:%d' % _socket_port
+                }
+            })
+
+        self.assertEqual(outputs['closed']['data'], False)
+        self.assertEqual(
+            ''.join(chunk for _, chunk in _req_chunks), 'olleh\ndlrow\n')
+
+    def testPythonModeUnicodeStreams(self):
+        # A unicode value is sent as one UTF-8 chunk, as are unicode chunks
+        task = {
+            'mode': 'python',
+            'script': ('text = u"caf\\xe9\\n"\n'
+                       'lines = (c for c in (u"\\xe9t\\xe9", b"!"))\n'),
+            'outputs': [{
+                'id': 'text',
+                'type': 'string',
+                'format': 'text',
+                'stream': True
+            }, {
+                'id': 'lines',
+                'type': 'string',
+                'format': 'text',
+                'stream': True
+            }]
+        }
+
+        for name, expected in (('text', ['caf\xc3\xa9\n']),
+                               ('lines', ['\xc3\xa9t\xc3\xa9', '!'])):
+            del _req_chunks[:]
+            run(dict(task, outputs=[o for o in task['outputs']
+                                    if o['id'] == name]),
+                outputs={name: {
+                    'mode': 'http',
+                    'method': 'PUT',
+                    'url': 'http://localhost:%d' % _socket_port
+                }})
+            self.assertEqual([chunk for _, chunk in _req_chunks], expected)
+
+    def testPythonModeIteratorStreams(self):
+        # The JSON lines input is parsed and the CSV output generated lazily
+        task = {
+            'mode': 'python',
+            'script': ('output = {"fields": table["fields"] + ["c"], '
+                       '"rows": (dict(row, c=row["a"] * 2) '
+                       'for row in table["rows"])}'),
+            'inputs': [{
+                'id': 'table',
+                'type': 'table',
+                'format': 'rows.iter',
+                'stream': True
+            }],
+            'outputs': [{
+                'id': 'output',
+                'type': 'table',
+                'format': 'rows.iter',
+                'stream': True
+            }]
+        }
+
+        @httmock.urlmatch(netloc='^mockedhost$', method='GET')
+        def mock_fetch(url, request):
+            return '{"a": 1, "b": "x"}\n{"a": 2, "b": "y"}\n'
+
+        del _req_chunks[:]
+        with httmock.HTTMock(mock_fetch):
+            run(task, inputs={
+                'table': {'mode': 'http', 'url': 'http://mockedhost',
+                          'format': 'jsonlines'}
+            }, outputs={
+                'output': {
+                    'mode': 'http',
+                    'method': 'PUT',
+                    'url': 'http://localhost:%d' % _socket_port,
+                    'format': 'csv'
+                }
+            })
+
+        self.assertEqual(''.join(chunk for _, chunk in _req_chunks),
+                         'a,b,c\r\n1,x,2\r\n2,y,4\r\n')
@@ -112,6 +112,28 @@ class TestTable(unittest.TestCase):
         coll = pymongo.MongoClient('mongodb://localhost')['test']['temp']
         self.assertEqual([d for d in coll.find()], [self.aobj, self.bobj])
 
+    def test_bson_stream(self):
+        import pymongo
+        task = {
+            'mode': 'python',
+            'script': ('b = (dict(d, baz=d["foo"] + d["bar"]) '
+                       'for d in a)'),
+            'inputs': [{'name': 'a', 'type': 'table',
+                        'format': 'objectlist.iter', 'stream': True}],
+            'outputs': [{'name': 'b', 'type': 'table',
+                         'format': 'objectlist.iter', 'stream': True}]
+        }
+        run(task, inputs={
+            'a': {'format': 'objectlist.bson', 'mode': 'mongodb',
+                  'db': 'test', 'collection': 'a'}
+        }, outputs={
+            'b': {'format': 'objectlist.bson', 'mode': 'mongodb',
+                  'db': 'test', 'collection': 'temp'}
+        })
+        coll = pymongo.MongoClient('mongodb://localhost')['test']['temp']
+        self.assertEqual([d for d in coll.find()],
+                         [dict(self.aobj, baz=3.0)])
+
     def test_file(self):
         tmp = tempfile.mktemp()
         outputs = run(
@@ -469,6 +491,93 @@ class TestTable(unittest.TestCase):
         )['data']
         self.assertEqual(rows2, rows)
 
+    def test_vtktable_array_types(self):
+        rows = {
+            'fields': ['a', 'b', 'c'],
+            'rows': [{'a': i, 'b': u'\xe9%d' % i, 'c': None}
+                     for i in range(1000)]
+        }
+        vtktable = convert(
+            'table',
+            {'format': 'rows', 'data': rows},
+            {'format': 'vtktable'}
+        )['data']
+        self.assertTrue(isinstance(vtktable.GetColumnByName('a'),
+                                   vtk.vtkDoubleArray))
+        self.assertTrue(isinstance(vtktable.GetColumnByName('b'),
+                                   vtk.vtkUnicodeStringArray))
+        self.assertEqual(vtktable.GetColumnByName('a').GetValue(999), 999)
+        self.assertEqual(vtktable.GetColumnByName('c').GetValue(0), 'None')
+
+        # Integer arrays are read back as integers
+        ids = vtk.vtkIdTypeArray()
+        ids.SetName('id')
+        for i in range(3):
+            ids.InsertNextValue(i * 10)
+        table = vtk.vtkTable()
+        table.AddColumn(ids)
+        rows2 = convert(
+            'table',
+            {'format': 'vtktable', 'data': table},
+            {'format': 'rows'}
+        )['data']
+        self.assertEqual(rows2, {'fields': ['id'], 'rows': [
+            {'id': 0}, {'id': 10}, {'id': 20}]})
+        self.assertTrue(isinstance(rows2['rows'][1]['id'], (int, long)))
+
+    def test_columns_vtktable(self):
+        rows = {
+            'fields': ['a', 'b'],
+            'rows': [{'a': 1.5, 'b': 'x'}, {'a': 2, 'b': 'y'}]
+        }
+        columns = convert(
+            'table',
+            {'format': 'rows', 'data': rows},
+            {'format': 'columns'}
+        )
+
+        vtktable = convert('table', columns, {'format': 'vtktable'})['data']
+        self.assertEqual(vtktable.GetNumberOfRows(), 2)
+        self.assertTrue(isinstance(vtktable.GetColumnByName('a'),
+                                   vtk.vtkDoubleArray))
+        self.assertTrue(isinstance(vtktable.GetColumnByName('b'),
+                                   vtk.vtkStringArray))
+
+        columns2 = convert(
+            'table',
+            {'format': 'vtktable', 'data': vtktable},
+            {'format': 'columns'}
+        )['data']
+        self.assertEqual(columns2['fields'], ['a', 'b'])
+        self.assertEqual(columns2['columns']['a'].tolist(), [1.5, 2.0])
+        self.assertEqual(columns2['columns']['b'].tolist(), ['x', 'y'])
+
+    def test_rows_compact_vtktable(self):
+        rows = {
+            'fields': ['a', 'b'],
+            'rows': [{'a': 1.5, 'b': 'x'}, {'a': 2, 'b': 'y'}]
+        }
+        compact = convert(
+            'table',
+            {'format': 'rows', 'data': rows},
+            {'format': 'rows.compact'}
+        )
+
+        vtktable = convert('table', compact, {'format': 'vtktable'})['data']
+        self.assertEqual(vtktable.GetNumberOfRows(), 2)
+        self.assertTrue(isinstance(vtktable.GetColumnByName('a'),
+                                   vtk.vtkDoubleArray))
+        self.assertTrue(isinstance(vtktable.GetColumnByName('b'),
+                                   vtk.vtkStringArray))
+
+        compact2 = convert(
+            'table',
+            {'format': 'vtktable', 'data': vtktable},
+            {'format': 'rows.compact'}
+        )['data']
+        self.assertEqual(compact2['fields'], ['a', 'b'])
+        self.assertEqual(compact2['rows'].records, [(1.5, 'x'), (2.0, 'y')])
+
     def test_objectlist(self):
         rows = {
             'fields': ['a', 'b'],
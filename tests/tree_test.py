@@ -1,5 +1,6 @@
 import bson
 import os
+from girder_worker.core.format.trees import nested_to_newick
 from girder_worker.tasks import run, convert
 import unittest
 
@@ -176,6 +177,7 @@ END;"""
             if 'rooted' in d:
                 root = d
         self.assertNotEqual(root, None)
+        self.assertIsInstance(root['_id'], bson.ObjectId)
         self.assertEqual(len(root['clades']), 1)
 
         def findId(id):
@@ -196,3 +198,27 @@ END;"""
         self.assertEqual(allogus['branch_length'], 1)
         self.assertEqual(rubribarbus['name'], 'rubribarbus')
         self.assertEqual(rubribarbus['branch_length'], 3)
+
+    def test_deep_vtktree(self):
+        # A caterpillar tree deeper than the recursion limit
+        depth = 5000
+        tree = {'node_data': {'node name': 'leaf'}}
+        for i in range(depth):
+            tree = {
+                'node_data': {'node name': 'n%d' % i},
+                'children': [
+                    dict(tree, edge_data={'weight': 1.0}),
+                    {'node_data': {'node name': 't%d' % i},
+                     'edge_data': {'weight': 2.0}}
+                ]
+            }
+        tree['node_fields'] = ['node name']
+        tree['edge_fields'] = ['weight']
+
+        output = convert('tree', {'format': 'nested', 'data': tree},
+                         {'format': 'vtktree'})
+        self.assertEqual(output['data'].GetNumberOfVertices(), 2 * depth + 1)
+        output = convert('tree', output, {'format': 'nested'})
+        # Comparing the nested trees themselves would recurse
+        self.assertEqual(nested_to_newick(output['data']),
+                         nested_to_newick(tree))
@@ -0,0 +1,147 @@
+import numpy
+import subprocess
+import sys
+import unittest
+
+from ete3 import Tree
+from girder_worker.core.format import trees
+from girder_worker.tasks import convert
+
+
+def caterpillar(depth):
+    """
+    Returns a nested tree whose internal nodes each have a leaf and one
+    internal node as children, down to the given depth.
+    """
+    tree = {'node_data': {'node name': 'leaf'}}
+    for i in range(depth):
+        tree = {
+            'node_data': {'node name': 'n%d' % i},
+            'children': [
+                {'node_data': {'node name': 't%d' % i},
+                 'edge_data': {'weight': 0.5}},
+                dict(tree, edge_data={'weight': i})
+            ]
+        }
+    tree['node_fields'] = ['node name']
+    tree['edge_fields'] = ['weight']
+    return tree
+
+
+def ete3_newick(tree):
+    # The recursive conversion that nested_to_newick replaces
+    def populate(node, children):
+        for c in children:
+            name = c.get('node_data', {}).get('node name', '')
+            dist = c.get('edge_data', {}).get('weight')
+            populate(node.add_child(name=name, dist=dist),
+                     c.get('children', []))
+
+    root = Tree()
+    populate(root, tree.get('children', []))
+    return root.write(format=1)
+
+
+class TestTrees(unittest.TestCase):
+    def setUp(self):
+        self.newick = '((ahli:0,allogus:1):2,rubribarbus:3);'
+        self.tree = {
+            'node_fields': ['node name'],
+            'edge_fields': ['weight'],
+            'node_data': {'node name': 'root'},
+            'children': [
+                {
+                    'node_data': {'node name': 'in(ternal)'},
+                    'edge_data': {'weight': 2.0},
+                    'children': [
+                        {'node_data': {'node name': 'ahli'},
+                         'edge_data': {'weight': 1.0 / 3}},
+                        {'node_data': {'node name': 'allogus'}}
+                    ]
+                },
+                {'node_data': {'node name': 7},
+                 'edge_data': {'weight': '1.5'}},
+                {'node_data': {}, 'edge_data': {'weight': 1e-9}}
+            ]
+        }
+
+    def testNewick(self):
+        for tree in (self.tree, caterpillar(20), {'node_data': {}}):
+            self.assertEqual(trees.nested_to_newick(tree), ete3_newick(tree))
+            self.assertEqual(
+                trees.parent_index_to_newick(
+                    trees.nested_to_parent_index(tree)),
+                ete3_newick(tree))
+
+        output = convert('tree', {'format': 'nested', 'data': self.tree},
+                         {'format': 'newick'})
+        self.assertEqual(output['data'], ete3_newick(self.tree))
+
+    def testWithoutNumpy(self):
+        # Writing nested trees as newick does not need NumPy
+        script = (
+            'import sys\n'
+            'sys.modules["numpy"] = None\n'
+            'from girder_worker.tasks import convert\n'
+            'print(convert("tree", {"format": "nested", "data": '
+            '{"children": [{"node_data": {"node name": "a"}}]}}, '
+            '{"format": "newick"})["data"])\n')
+        output = subprocess.check_output([sys.executable, '-c', script])
+        self.assertEqual(output.strip().splitlines()[-1], '(a:1);')
+
+    def testDeep(self):
+        depth = sys.getrecursionlimit() * 5
+        tree = caterpillar(depth)
+
+        trees.CHUNK_SIZE = 1024
+        try:
+            chunks = list(trees.iter_newick(tree))
+        finally:
+            trees.CHUNK_SIZE = 65536
+        self.assertGreater(len(chunks), 1)
+        newick = ''.join(chunks)
+        self.assertTrue(newick.startswith('(t%d:0.5,(' % (depth - 1)))
+        self.assertIn('(t0:0.5,leaf:0)n0:1)n1:2)', newick)
+        self.assertTrue(newick.endswith('n%d:%d);' % (depth - 2, depth - 1)))
+
+        index = trees.nested_to_parent_index(tree)
+        self.assertEqual(len(index['parents']), 2 * depth + 1)
+        self.assertEqual(trees.parent_index_to_newick(index), newick)
+        # Comparing the nested trees themselves would recurse
+        self.assertEqual(
+            trees.nested_to_newick(trees.parent_index_to_nested(index)),
+            newick)
+
+    def testParentIndex(self):
+        index = trees.nested_to_parent_index(self.tree)
+        self.assertTrue(trees.is_parent_index(index))
+        self.assertEqual(index['parents'].tolist(), [-1, 0, 1, 1, 0, 0])
+        self.assertEqual(index['node_fields'], ['node name'])
+        self.assertEqual(index['edge_fields'], ['weight'])
+        self.assertEqual(index['node_data']['node name'].tolist(),
+                         ['root', 'in(ternal)', 'ahli', 'allogus', 7, None])
+        self.assertEqual(index['edge_data']['weight'].tolist(),
+                         [None, 2.0, 1.0 / 3, None, '1.5', 1e-9])
+        self.assertEqual(trees.parent_index_to_nested(index), self.tree)
+
+        # Children follow the order of their indices in any node order
+        index = {
+            'parents': numpy.array([2, 2, -1, 0, 0]),
+            'node_fields': ['node name'], 'edge_fields': [],
+            'node_data': {'node name': numpy.array(list('abcde'))},
+            'edge_data': {}
+        }
+        indptr, indices = trees.children(index)
+        self.assertEqual(indptr.tolist(), [0, 2, 2, 4, 4, 4])
+        self.assertEqual(indices.tolist(), [3, 4, 0, 1])
+        self.assertEqual(trees.parent_index_to_newick(index),
+                         '((d:1,e:1)a:1,b:1);')
+        nested = convert('tree', {'format': 'parent_index', 'data': index},
+                         {'format': 'nested'})['data']
+        self.assertEqual(nested['node_data'], {'node name': 'c'})
+        self.assertEqual([c['node_data']['node name']
+                          for c in nested['children']], ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+import bson
+import itertools
+import mock
+import networkx as nx
+import os
+import shutil
+import six
+import tempfile
+import unittest
+
+from bson.objectid import ObjectId
+from girder_worker.core.format import xml_engine
+from girder_worker.tasks import convert
+from networkx.readwrite.graphml import write_graphml
+
+PHYLOXML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<phyloxml xmlns="http://www.phyloxml.org">
+  <phylogeny rooted="true">
+    <name>example</name>
+    <clade>
+      <clade branch_length="2.0">
+        <name>internal</name>
+        <confidence type="bootstrap">89</confidence>
+        <clade>
+          <name>ahli</name>
+          <branch_length>0</branch_length>
+          <taxonomy>
+            <scientific_name>Anolis ahli</scientific_name>
+          </taxonomy>
+        </clade>
+        <clade>
+          <name>allogus</name>
+          <branch_length>1</branch_length>
+        </clade>
+      </clade>
+      <clade>
+        <name>rubribarbus</name>
+        <branch_length>3</branch_length>
+      </clade>
+    </clade>
+  </phylogeny>
+</phyloxml>
+"""
+
+
+class TestXmlEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.graph = nx.MultiDiGraph(name='example')
+        self.graph.add_node('a', label=u'caf\xe9 <1>', size=1.5, seen=True)
+        self.graph.add_node('b', rank=3)
+        self.graph.add_edge('a', 'b', weight=2)
+        self.graph.add_edge('a', 'b', weight=4)
+        self.graph.add_edge('b', 'a')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def assertSameGraph(self, expected, actual):
+        self.assertEqual(type(actual), type(expected))
+        self.assertEqual(actual.graph, expected.graph)
+        self.assertEqual(sorted(actual.nodes(data=True)),
+                         sorted(expected.nodes(data=True)))
+        self.assertEqual(sorted(actual.edges(data=True)),
+                         sorted(expected.edges(data=True)))
+
+    def testReadGraphml(self):
+        data = six.BytesIO()
+        write_graphml(self.graph, data)
+        data = data.getvalue()
+        expected = nx.read_graphml(six.BytesIO(data))
+
+        path = os.path.join(self.tmpdir, 'graph.graphml')
+        with open(path, 'wb') as f:
+            f.write(data)
+        for graph in (xml_engine.read_graphml(data),
+                      xml_engine.read_graphml(six.BytesIO(data)),
+                      xml_engine.read_graphml(path=path)):
+            self.assertSameGraph(expected, graph)
+
+        # Graphs without parallel edges are not multigraphs
+        simple = nx.Graph([('a', 'b', {'weight': 1.5})])
+        data = six.BytesIO()
+        write_graphml(simple, data)
+        self.assertSameGraph(nx.read_graphml(six.BytesIO(data.getvalue())),
+                             xml_engine.read_graphml(data.getvalue()))
+
+        with self.assertRaises(Exception):
+            xml_engine.read_graphml(
+                b'<graphml xmlns="http://graphml.graphdrawing.org/xmlns"/>')
+
+    def testWriteGraphml(self):
+        xml_engine.CHUNK_SIZE = 64
+        try:
+            chunks = list(xml_engine.iter_graphml(self.graph))
+        finally:
+            xml_engine.CHUNK_SIZE = 65536
+        self.assertGreater(len(chunks), 1)
+
+        # Written like networkx, which reads it back the same
+        data = b''.join(chunks)
+        expected = six.BytesIO()
+        write_graphml(self.graph, expected)
+        self.assertSameGraph(
+            nx.read_graphml(six.BytesIO(expected.getvalue())),
+            nx.read_graphml(six.BytesIO(data)))
+
+        with self.assertRaises(nx.NetworkXError):
+            xml_engine.networkx_to_graphml(nx.Graph([(1, 2, {'x': [1]})]))
+
+    def testTreestore(self):
+        documents = list(xml_engine.iter_treestore(PHYLOXML))
+        self.assertEqual(len(documents), 6)
+        by_name = {d.get('name'): d for d in documents}
+        ids = {d['_id']: d for d in documents}
+
+        root = by_name['example']
+        self.assertIsInstance(root['_id'], ObjectId)
+        self.assertTrue(root['rooted'])
+        self.assertEqual(documents[-1], root)
+        top = ids[root['clades'][0]]
+        internal, rubribarbus = [ids[i] for i in top['clades']]
+        self.assertEqual(internal['name'], 'internal')
+        self.assertEqual(internal['branch_length'], 2)
+        self.assertEqual(internal['confidence'],
+                         {'type': 'bootstrap', 'value': 89})
+        self.assertEqual([ids[i]['name'] for i in internal['clades']],
+                         ['ahli', 'allogus'])
+        self.assertEqual(rubribarbus['branch_length'], 3)
+        self.assertEqual(rubribarbus['clades'], [])
+        self.assertEqual(by_name['ahli']['taxonomy'],
+                         {'scientific_name': 'Anolis ahli'})
+
+        output = convert('tree', {'format': 'phyloxml', 'data': PHYLOXML},
+                         {'format': 'treestore'})
+        self.assertEqual(len(bson.decode_all(output['data'])), 6)
+
+        # Deeper than the recursion limit
+        depth = 5000
+        data = (b'<phyloxml><phylogeny rooted="false">' +
+                b'<clade><name>n</name>' * depth +
+                b'</clade>' * depth + b'</phylogeny></phyloxml>')
+        documents = list(xml_engine.iter_treestore(data))
+        self.assertEqual(len(documents), depth + 1)
+        self.assertFalse(documents[-1]['rooted'])
+        self.assertEqual(documents[1]['clades'], [documents[0]['_id']])
+
+    def testTreestoreMemory(self):
+        # Record the elements of a wide phylogeny as they are parsed
+        elements = []
+        iterparse = xml_engine.ElementTree.iterparse
+
+        def recording_iterparse(*args, **kwargs):
+            for event, element in iterparse(*args, **kwargs):
+                if event == 'start':
+                    elements.append(element)
+                yield event, element
+
+        width = 2000
+        data = (b'<phyloxml><phylogeny><clade><name>top</name>' +
+                b'<clade><name>n</name><branch_length>1</branch_length>'
+                b'</clade>' * width +
+                b'</clade></phylogeny><phylogeny><clade/></phylogeny>'
+                b'</phyloxml>')
+        with mock.patch.object(xml_engine.ElementTree, 'iterparse',
+                               recording_iterparse):
+            documents = xml_engine.iter_treestore(data)
+            for document in itertools.islice(documents, width):
+                # The finished clades are dropped from the top clade, which
+                # only holds the ones that iterparse has read ahead
+                self.assertLess(len(elements[2]), width / 4)
+            documents = list(documents)
+
+        # The top clade, and the phylogenies after it
+        self.assertEqual(len(documents), 4)
+        self.assertEqual(documents[0]['name'], 'top')
+        self.assertEqual(len(documents[0]['clades']), width)
+        # The finished phylogenies are dropped from the document
+        self.assertEqual(len(elements[0]), 0)
+
+    def testConvert(self):
+        output = convert('graph', {'format': 'networkx', 'data': self.graph},
+                         {'format': 'graphml'})
+        output = convert('graph', output, {'format': 'networkx'})
+        self.assertEqual(sorted(output['data'].edges(data='weight')),
+                         [('a', 'b', 2), ('a', 'b', 4), ('b', 'a', None)])
+
+
+if __name__ == '__main__':
+    unittest.main()